@@ -0,0 +1,67 @@
+"""Сравнение HTTP-движков нагрузочного теста (requests и fasthttp).
+
+Поднимает заглушку API из stub_server.py, по очереди запускает load_testing_API.py
+в headless-режиме с API_CLIENT=requests и API_CLIENT=fasthttp без пауз
+между задачами и выводит число запросов на секунду процессорного времени
+генератора (запросов/с на ядро).
+
+    python bench_engines.py --users 50 --duration 30
+"""
+import argparse
+import csv
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import stub_server
+
+LOCUSTFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "load_testing_API.py")
+ENGINES = ("requests", "fasthttp")
+
+def run_engine(engine, host, args, workdir):
+    """Прогон locust с указанным движком, возвращает (запросы, ошибки, CPU-секунды)"""
+    prefix = os.path.join(workdir, engine)
+    env = {**os.environ, "API_CLIENT": engine, "API_HOST": host, "WAIT_MIN": "0", "WAIT_MAX": "0"}
+    command = [
+        sys.executable, "-m", "locust", "-f", LOCUSTFILE, "--headless",
+        "-u", str(args.users), "-r", str(args.users), "-t", f"{args.duration}s",
+        "--host", host, "--csv", prefix, "--only-summary"
+    ]
+    before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    subprocess.run(command, env=env, check=False, stdout=subprocess.DEVNULL)
+    after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+
+    with open(f"{prefix}_stats.csv", newline="") as stats:
+        total = next(row for row in csv.DictReader(stats) if row["Name"] == "Aggregated")
+    return int(total["Request Count"]), int(total["Failure Count"]), cpu
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--duration", type=int, default=30)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--host", help="Готовый сервер вместо встроенной заглушки")
+    parser.add_argument("--seed-dishes", type=int, default=200)
+    parser.add_argument("--seed-reviews", type=int, default=1000)
+    args = parser.parse_args()
+
+    host = args.host
+    if host is None:
+        store = stub_server.RestaurantStore()
+        store.seed(dishes=args.seed_dishes, users=50, reviews=args.seed_reviews)
+        host = stub_server.serve_in_thread(port=args.port, store=store)
+    print(f"Сервер: {host}, пользователей: {args.users}, длительность: {args.duration} с")
+    print(f"{'движок':<10}{'запросов':>12}{'ошибок':>10}{'CPU, с':>10}{'RPS':>10}{'RPS/ядро':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for engine in ENGINES:
+            requests_total, failures, cpu = run_engine(engine, host, args, workdir)
+            print(
+                f"{engine:<10}{requests_total:>12}{failures:>10}{cpu:>10.1f}"
+                f"{requests_total / args.duration:>10.0f}{requests_total / max(cpu, 1e-9):>12.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""Сравнение нагрузочных прогонов по эндпоинтам и поиск регрессий.
+
+Первый прогон - базовый, остальные сравниваются с ним. Источники данных
+прогона (тип определяется по имени файла):
+
+    PREFIX или PREFIX_stats_history.csv  история locust (--csv, лучше с --csv-full-history)
+    PREFIX_stats.csv                     итоговая статистика locust
+    *.json                               вывод locust --json-file
+    *.rsts                               временные ряды load_testing_API.py --metrics-file
+    *.hlog                               журнал HDR-гистограмм --hdr-log (нужен пакет hdrh)
+
+Файлы читаются потоково, по каждому эндпоинту хранится не больше
+--max-intervals интервалов (соседние интервалы при переполнении
+объединяются). Имена приводятся к шаблону маршрута (/users/42/feed ->
+/users/[id]/feed, параметры запроса отбрасываются). Для каждого показателя
+(частота запросов, доля ошибок, p50/p95/p99) считается разница с базовым
+прогоном и bootstrap-интервал по интервалам прогонов; регрессия - если
+интервал целиком на "плохой" стороне и изменение больше порога. При
+регрессиях код выхода 1.
+
+    python compare_runs.py baseline/run today/run --skip 30 --report report.md
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import re
+import sys
+from array import array
+from collections import defaultdict
+
+import metrics_file
+
+try:
+    from hdrh.histogram import HdrHistogram
+except ImportError:
+    HdrHistogram = None
+
+# Числовые сегменты пути заменяются на [id], как в load_testing_API.route_template
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+PERCENTILES = ("p50", "p95", "p99")
+HTTP_METHODS = ("GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS")
+
+def endpoint_key(method, name):
+    """Ключ сравнения: метод и шаблон маршрута без параметров запроса"""
+    if name == "Aggregated":
+        return "Aggregated"
+    path = ID_SEGMENT.sub("/[id]", name.split("?", 1)[0])
+    return f"{method} {path}".strip()
+
+def _number(value):
+    try:
+        result = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return result
+
+class Series:
+    """Интервальные наблюдения одного эндпоинта в прогоне с ограничением памяти.
+
+    Наблюдение - длительность интервала, число запросов и ошибок и
+    перцентили за интервал. При достижении limit соседние наблюдения
+    сливаются попарно (перцентили усредняются с весом числа запросов).
+    """
+
+    COLUMNS = ("seconds", "requests", "failures", *PERCENTILES)
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.columns = {name: array("d") for name in self.COLUMNS}
+
+    def __len__(self):
+        return len(self.columns["seconds"])
+
+    def add(self, seconds, requests, failures, percentiles):
+        columns = self.columns
+        columns["seconds"].append(seconds)
+        columns["requests"].append(requests)
+        columns["failures"].append(failures)
+        for name in PERCENTILES:
+            columns[name].append(percentiles.get(name, math.nan))
+        if len(self) >= self.limit:
+            self._compact()
+
+    def _compact(self):
+        old = self.columns
+        new = {name: array("d") for name in self.COLUMNS}
+        for i in range(0, len(old["seconds"]) - 1, 2):
+            requests = old["requests"][i] + old["requests"][i + 1]
+            new["seconds"].append(old["seconds"][i] + old["seconds"][i + 1])
+            new["requests"].append(requests)
+            new["failures"].append(old["failures"][i] + old["failures"][i + 1])
+            for name in PERCENTILES:
+                first, second = old[name][i], old[name][i + 1]
+                if math.isnan(first) or math.isnan(second) or not requests:
+                    value = second if math.isnan(first) else first
+                else:
+                    value = (first * old["requests"][i] + second * old["requests"][i + 1]) / requests
+                new[name].append(value)
+        if len(old["seconds"]) % 2:
+            for name in self.COLUMNS:
+                new[name].append(old[name][-1])
+        self.columns = new
+
+class Run:
+    """Наблюдения прогона по эндпоинтам"""
+
+    def __init__(self, label, limit):
+        self.label = label
+        self.limit = limit
+        self.series = {}
+
+    def add(self, key, seconds, requests, failures, percentiles):
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = Series(self.limit)
+        series.add(seconds, requests, failures, percentiles)
+
+# Чтение источников
+
+def read_locust_history(path, run, skip):
+    """История locust: накопительные счетчики превращаются в интервальные"""
+    previous = {}
+    started = None
+    with open(path, newline="", encoding="utf-8") as source:
+        for row in csv.DictReader(source):
+            timestamp = _number(row["Timestamp"])
+            if started is None:
+                started = timestamp
+            key = endpoint_key(row.get("Type", ""), row["Name"])
+            total = _number(row["Total Request Count"])
+            failures = _number(row["Total Failure Count"])
+            last = previous.get(key)
+            previous[key] = (timestamp, total, failures)
+            if last is None or timestamp - started < skip or timestamp <= last[0]:
+                continue
+            requests = total - last[1]
+            if requests <= 0:
+                continue
+            percentiles = {
+                name: _number(row.get(column))
+                for name, column in (("p50", "50%"), ("p95", "95%"), ("p99", "99%"))
+            }
+            run.add(key, timestamp - last[0], requests, failures - last[2], percentiles)
+
+def read_locust_stats(path, run, skip):
+    """Итоговая статистика locust: одно наблюдение на эндпоинт, без интервала"""
+    with open(path, newline="", encoding="utf-8") as source:
+        for row in csv.DictReader(source):
+            requests = _number(row["Request Count"])
+            if not requests:
+                continue
+            rate = _number(row.get("Requests/s"))
+            seconds = requests / rate if rate else math.nan
+            percentiles = {name: _number(row.get(column)) for name, column in (("p50", "50%"), ("p95", "95%"), ("p99", "99%"))}
+            run.add(endpoint_key(row.get("Type", ""), row["Name"]), seconds, requests, _number(row["Failure Count"]), percentiles)
+
+def _bucket_percentile(buckets, total, fraction):
+    target = total * fraction
+    seen = 0
+    for value, count in sorted(buckets.items()):
+        seen += count
+        if seen >= target:
+            return value
+    return math.nan
+
+def read_locust_json(path, run, skip):
+    """Вывод locust --json-file: перцентили по гистограмме response_times"""
+    with open(path, encoding="utf-8") as source:
+        entries = json.load(source)
+    for entry in entries:
+        requests = entry["num_requests"]
+        if not requests:
+            continue
+        buckets = {float(value): count for value, count in entry["response_times"].items()}
+        seconds = entry["last_request_timestamp"] - entry["start_time"]
+        percentiles = {name: _bucket_percentile(buckets, requests, float(name[1:]) / 100) for name in PERCENTILES}
+        run.add(endpoint_key(entry["method"], entry["name"]), seconds, requests, entry["num_failures"], percentiles)
+
+def read_metrics_series(path, run, skip):
+    """Колоночный файл load_testing_API.py --metrics-file"""
+    header, columns = metrics_file.read_columns(path, {"time", "series", "count", "failures", *PERCENTILES})
+    names = header["series"]
+    previous = {}
+    for time, series, count, failures, *percentiles in zip(
+        columns["time"], columns["series"], columns["count"], columns["failures"], *(columns[name] for name in PERCENTILES)
+    ):
+        name = names[series]
+        if name == "users" or name.startswith("business:") or " code=" in name:
+            continue
+        method, _, path_name = name.partition(" ")
+        key = endpoint_key(method, path_name)
+        last = previous.get(key)
+        previous[key] = (time, count, failures)
+        if last is None or time < skip or count <= last[1]:
+            continue
+        run.add(key, time - last[0], count - last[1], failures - last[2], dict(zip(PERCENTILES, percentiles)))
+
+def read_hdr_log(path, run, skip):
+    """Журнал HDR-гистограмм: каждая строка - интервал одного эндпоинта"""
+    if HdrHistogram is None:
+        raise RuntimeError(f"Для чтения {path} нужен пакет hdrh")
+    with open(path, encoding="utf-8") as source:
+        for line in source:
+            if line.startswith(("#", '"')) or not line.strip():
+                continue
+            tag = "Aggregated"
+            if line.startswith("Tag="):
+                tag, line = line[4:].split(",", 1)
+                method, _, name = tag.partition("_")
+                tag = f"{method} {name}" if method in HTTP_METHODS else tag
+            start, length, _, payload = line.strip().split(",", 3)
+            if float(start) < skip:
+                continue
+            histogram = HdrHistogram.decode(payload)
+            requests = histogram.get_total_count()
+            percentiles = {name: histogram.get_value_at_percentile(float(name[1:])) / 1000 for name in PERCENTILES}
+            method, _, name = tag.partition(" ")
+            run.add(endpoint_key(method, name) if name else tag, float(length), requests, 0, percentiles)
+
+def load_run(spec, limit, skip):
+    """Прогон по пути или префиксу locust --csv, метка задается как label=path"""
+    label, _, path = spec.rpartition("=")
+    path = path or spec
+    if not os.path.exists(path):
+        for suffix in ("_stats_history.csv", "_stats.csv"):
+            if os.path.exists(path + suffix):
+                path += suffix
+                break
+        else:
+            raise FileNotFoundError(f"Нет данных прогона: {spec}")
+    run = Run(label or path, limit)
+    if path.endswith("_stats_history.csv"):
+        read_locust_history(path, run, skip)
+    elif path.endswith(".csv"):
+        read_locust_stats(path, run, skip)
+    elif path.endswith(".json"):
+        read_locust_json(path, run, skip)
+    elif path.endswith(".rsts"):
+        read_metrics_series(path, run, skip)
+    elif path.endswith(".hlog"):
+        read_hdr_log(path, run, skip)
+    else:
+        raise ValueError(f"Неизвестный формат данных прогона: {path}")
+    return run
+
+# Статистика
+
+def _statistics(columns, indices):
+    """Частота, доля ошибок и взвешенные по числу запросов перцентили выборки интервалов"""
+    pick = indices.__iter__
+    requests_column = columns["requests"]
+    requests = sum(map(requests_column.__getitem__, pick()))
+    seconds = sum(map(columns["seconds"].__getitem__, pick()))
+    failures = sum(map(columns["failures"].__getitem__, pick()))
+    result = {
+        "rate": requests / seconds if seconds > 0 else math.nan,
+        "error_rate": failures / requests if requests else math.nan
+    }
+    for name in PERCENTILES:
+        values = columns[name]
+        weighted = [(values[i], requests_column[i]) for i in indices if not math.isnan(values[i])]
+        weight = sum(count for _, count in weighted)
+        result[name] = sum(value * count for value, count in weighted) / weight if weight else math.nan
+    return result
+
+def bootstrap(series, iterations, rng):
+    """Точечные оценки и bootstrap-выборки показателей (пересэмплирование интервалов)"""
+    size = len(series)
+    columns = series.columns
+    point = _statistics(columns, range(size))
+    if size < 2:
+        return point, None
+    population = range(size)
+    samples = [_statistics(columns, rng.choices(population, k=size)) for _ in range(iterations)]
+    return point, samples
+
+# Для латентности и ошибок рост - ухудшение, для частоты запросов - падение
+WORSE_WHEN_HIGHER = {"rate": False, "error_rate": True, "p50": True, "p95": True, "p99": True}
+
+def compare(base, other, metric, threshold, confidence):
+    """Изменение показателя, доверительный интервал разницы и признак регрессии"""
+    base_point, base_samples = base
+    other_point, other_samples = other
+    before, after = base_point[metric], other_point[metric]
+    delta = after - before
+    relative = delta / before if before else math.nan
+    low = high = math.nan
+    if base_samples and other_samples:
+        differences = sorted(
+            second[metric] - first[metric]
+            for first, second in zip(base_samples, other_samples)
+            if not math.isnan(second[metric] - first[metric])
+        )
+        if differences:
+            tail = (1 - confidence) / 2
+            low = differences[int(tail * (len(differences) - 1))]
+            high = differences[int((1 - tail) * (len(differences) - 1))]
+    if metric == "error_rate":
+        significant_change = abs(delta) >= threshold["error_rate"]
+    else:
+        significant_change = not math.isnan(relative) and abs(relative) >= threshold["relative"]
+        if metric in PERCENTILES:
+            # Гистограмма locust округляет время, изменения на 1-2 мс - шум корзин
+            significant_change = significant_change and abs(delta) >= threshold["latency"]
+    worse = delta > 0 if WORSE_WHEN_HIGHER[metric] else delta < 0
+    if math.isnan(low):
+        # Без интервалов (итоговая статистика) решает только порог
+        regression = worse and significant_change
+    else:
+        outside = low > 0 if WORSE_WHEN_HIGHER[metric] else high < 0
+        regression = worse and significant_change and outside
+    return {"before": before, "after": after, "delta": delta, "relative": relative, "low": low, "high": high, "regression": regression}
+
+def _format(value, metric):
+    if math.isnan(value):
+        return "-"
+    if metric == "error_rate":
+        return f"{value * 100:.2f}%"
+    return f"{value:.1f}"
+
+def render(results, runs, confidence):
+    """Отчет в Markdown"""
+    lines = [f"# Сравнение прогонов: база {runs[0].label}", ""]
+    for run in runs[1:]:
+        lines.append(f"## {run.label}")
+        lines.append("")
+        lines.append(f"| Эндпоинт | Показатель | База | Прогон | Изменение | {confidence:.0%} ДИ | |")
+        lines.append("|---|---|---:|---:|---:|---|---|")
+        for key, metric, result in results[run.label]:
+            interval = "-" if math.isnan(result["low"]) else f"[{_format(result['low'], metric)}; {_format(result['high'], metric)}]"
+            relative = "" if math.isnan(result["relative"]) else f" ({result['relative']:+.1%})"
+            lines.append(
+                f"| {key} | {metric} | {_format(result['before'], metric)} | {_format(result['after'], metric)} | "
+                f"{_format(result['delta'], metric)}{relative} | {interval} | {'РЕГРЕССИЯ' if result['regression'] else ''} |"
+            )
+        lines.append("")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("runs", nargs="+", help="Прогоны (первый - базовый): путь, префикс --csv или label=path")
+    parser.add_argument("--skip", type=float, default=0, help="Пропустить первые N секунд каждого прогона (прогрев)")
+    parser.add_argument("--endpoint", help="Регулярное выражение для отбора эндпоинтов")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Минимальное относительное изменение для регрессии")
+    parser.add_argument("--min-delta", type=float, default=2.0, help="Минимальное изменение перцентиля для регрессии, мс")
+    parser.add_argument("--error-threshold", type=float, default=0.01, help="Минимальный рост доли ошибок для регрессии")
+    parser.add_argument("--min-requests", type=int, default=100, help="Эндпоинты с меньшим числом запросов не сравниваются")
+    parser.add_argument("--bootstrap", type=int, default=500, help="Число bootstrap-выборок")
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--max-intervals", type=int, default=1024, help="Интервалов в памяти на эндпоинт")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", help="Записать отчет в Markdown в файл")
+    parser.add_argument("--json", help="Записать результаты в JSON")
+    args = parser.parse_args()
+    if len(args.runs) < 2:
+        parser.error("Нужно как минимум два прогона")
+
+    try:
+        runs = [load_run(spec, args.max_intervals, args.skip) for spec in args.runs]
+    except (OSError, ValueError, RuntimeError, KeyError) as error:
+        print(f"Ошибка чтения прогона: {error}", file=sys.stderr)
+        sys.exit(2)
+
+    endpoint_filter = re.compile(args.endpoint) if args.endpoint else None
+    thresholds = {"relative": args.threshold, "latency": args.min_delta, "error_rate": args.error_threshold}
+    results = defaultdict(list)
+    regressions = []
+    base = runs[0]
+    for key in sorted(base.series):
+        if endpoint_filter and not endpoint_filter.search(key):
+            continue
+        rng = random.Random(f"{args.seed}:{key}")
+        base_series = base.series[key]
+        if sum(base_series.columns["requests"]) < args.min_requests:
+            continue
+        base_stats = bootstrap(base_series, args.bootstrap, rng)
+        for run in runs[1:]:
+            series = run.series.get(key)
+            if series is None or sum(series.columns["requests"]) < args.min_requests:
+                continue
+            run_stats = bootstrap(series, args.bootstrap, rng)
+            for metric in ("rate", "error_rate", *PERCENTILES):
+                result = compare(base_stats, run_stats, metric, thresholds, args.confidence)
+                results[run.label].append((key, metric, result))
+                if result["regression"]:
+                    regressions.append(f"{run.label}: {key} {metric} {_format(result['before'], metric)} -> {_format(result['after'], metric)}")
+
+    report = render(results, runs, args.confidence)
+    print(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as output:
+            output.write(report + "\n")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(
+                {label: [{"endpoint": key, "metric": metric, **result} for key, metric, result in rows] for label, rows in results.items()},
+                output, ensure_ascii=False, indent=2
+            )
+    missing = sorted(set().union(*(run.series for run in runs[1:])) - set(base.series))
+    if missing:
+        print(f"\nНет в базовом прогоне: {', '.join(missing)}")
+    if regressions:
+        print(f"\nРегрессии ({len(regressions)}):\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+    print("\nРегрессий не найдено")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""Генератор больших наборов данных и кривые масштабирования эндпоинтов.
+
+Наполняет API детерминированными (--seed) данными: авторы, пользователи,
+блюда с ценовой категорией, категориями и авторами, отзывы и лайки.
+Сущности генерируются потоково и отправляются окнами по --batch запросов,
+которые выполняются параллельно в --concurrency keep-alive соединениях
+http.client: без накладных расходов requests на каждый запрос поток
+создания сущностей упирается в сервер, а не в клиента; в памяти остаются
+только идентификаторы. Набор растет
+ступенями --sizes (число блюд, остальные сущности пропорционально), после каждой ступени
+замеряется время ответа эндпоинтов. По точкам всех ступеней методом
+наименьших квадратов оценивается показатель степени роста задержки
+(latency ~ n^k) за вычетом постоянных накладных расходов (время GET
+/pricing/1); эндпоинты с k больше --max-exponent отмечаются, код выхода 1.
+
+    python dataset_builder.py --sizes 1000,10000,100000 --csv scaling.csv
+    python dataset_builder.py --host http://localhost:8080 --sizes 10000,100000,1000000 --concurrency 64
+
+Без --host используется заглушка из stub_server.py в том же процессе.
+"""
+import argparse
+import csv
+import http.client
+import json
+import math
+import random
+import statistics
+import sys
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import stub_server
+
+WORDS = (
+    "борщ", "пельмени", "солянка", "блины", "окрошка", "уха", "котлета", "жаркое", "сырник", "вареники",
+    "щи", "плов", "шашлык", "пирог", "рагу", "оладьи", "холодец", "рассольник", "винегрет", "запеканка"
+)
+
+# Замеряемые эндпоинты: имя -> (путь, параметры) по набору и генератору случайных чисел
+ENDPOINTS = {
+    "GET /dishes/popular": lambda data, rng: ("/dishes/popular", {"count": 10}),
+    "GET /dishes/author/[id]": lambda data, rng: (f"/dishes/author/{rng.choice(data.authors)}", {"sortBy": "likes"}),
+    "GET /reviews?dishId": lambda data, rng: ("/reviews", {"dishId": rng.choice(data.dishes), "count": 10}),
+    "GET /users/[id]/recommendations": lambda data, rng: (f"/users/{rng.choice(data.users)}/recommendations", None),
+    "GET /dishes/search": lambda data, rng: ("/dishes/search", {"query": rng.choice(WORDS), "by": "title"}),
+}
+OVERHEAD_ENDPOINT = "/pricing/1"
+
+class DatasetBuilder:
+    """Потоковая загрузка сущностей в API конкурентными окнами запросов"""
+
+    def __init__(self, host, concurrency, batch, seed):
+        self.host = host
+        self.batch = batch
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        self._local = threading.local()
+        self._connections = []
+        self.authors = array("q")
+        self.users = array("q")
+        self.dishes = array("q")
+        self.reviews = array("q")
+        self.likes = 0
+        self.errors = 0
+        self._errors_lock = threading.Lock()
+        self.pricing = [item["id"] for item in self.call("GET", "/pricing")[1]]
+        self.categories = [item["id"] for item in self.call("GET", "/categories")[1]]
+
+    def close(self):
+        self.executor.shutdown()
+        for connection in self._connections:
+            connection.close()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            url = urlsplit(self.host)
+            factory = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+            connection = self._local.connection = factory(url.netloc, timeout=60)
+            self._connections.append(connection)
+        return connection
+
+    def call(self, method, path, body=None):
+        """Запрос в keep-alive соединении потока, возвращает (статус, JSON или None)"""
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Content-Type": "application/json"} if payload is not None else {}
+        for attempt in range(2):
+            connection = self._connection()
+            try:
+                connection.request(method, path, payload, headers)
+                response = connection.getresponse()
+                data = response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # Сервер закрыл keep-alive соединение: одна повторная попытка в новом
+                connection.close()
+                self._local.connection = None
+                if attempt:
+                    raise
+        return response.status, json.loads(data) if data else None
+
+    def _error(self):
+        # Счетчик увеличивается из потоков пула
+        with self._errors_lock:
+            self.errors += 1
+
+    def _send(self, request):
+        method, path, body, key = request
+        try:
+            status, data = self.call(method, path, body)
+        except (http.client.HTTPException, OSError, ValueError):
+            self._error()
+            return None
+        if status >= 400:
+            self._error()
+            return None
+        if not key:
+            return True
+        if not isinstance(data, dict) or key not in data:
+            # 2xx без JSON или без поля идентификатора не должен обрывать окно
+            self._error()
+            return None
+        return data[key]
+
+    def stream(self, requests_iter, ids=None):
+        """Отправка потока запросов окнами по batch, идентификаторы - в массив ids"""
+        sent = 0
+        while True:
+            window = [request for _, request in zip(range(self.batch), requests_iter)]
+            if not window:
+                return sent
+            for result in self.executor.map(self._send, window):
+                if ids is not None and isinstance(result, int):
+                    ids.append(result)
+            sent += len(window)
+
+    def _authors(self, count):
+        for index in range(len(self.authors), count):
+            yield "POST", "/authors", {"name": f"Автор {self.seed}-{index}"}, "id"
+
+    def _users(self, count):
+        rng = self.rng
+        for index in range(len(self.users), count):
+            yield "POST", "/users", {
+                "email": f"user{self.seed}_{index}@example.com",
+                "login": f"u{self.seed}_{index}",
+                "name": f"{rng.choice(WORDS).title()} {index}",
+                "birthday": f"{rng.randint(1950, 2005)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+            }, "id"
+
+    def _dishes(self, count):
+        rng = self.rng
+        for index in range(len(self.dishes), count):
+            yield "POST", "/dishes", {
+                "name": f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {index}",
+                "description": " ".join(rng.choices(WORDS, k=8)),
+                "releaseDate": f"{rng.randint(1990, 2024)}-{rng.randint(1, 12):02d}-01",
+                "weight": rng.randint(50, 1000),
+                "pricing": {"id": rng.choice(self.pricing)},
+                "categories": [{"id": category} for category in rng.sample(self.categories, k=min(2, len(self.categories)))],
+                "authors": [{"id": rng.choice(self.authors)}] if self.authors else []
+            }, "id"
+
+    def _reviews(self, count):
+        rng = self.rng
+        for _ in range(len(self.reviews), count):
+            yield "POST", "/reviews", {
+                "content": " ".join(rng.choices(WORDS, k=12)),
+                "isPositive": rng.random() < 0.7,
+                "userId": rng.choice(self.users),
+                "dishId": rng.choice(self.dishes)
+            }, "reviewId"
+
+    def _likes(self, count):
+        rng = self.rng
+        for _ in range(self.likes, count):
+            # Популярность блюд неравномерна: чаще лайкают блюда из начала списка
+            dish = self.dishes[min(int(rng.paretovariate(1.2)) - 1, len(self.dishes) - 1)] if rng.random() < 0.5 else rng.choice(self.dishes)
+            yield "PUT", f"/dishes/{dish}/like/{rng.choice(self.users)}", None, None
+
+    def grow(self, size, ratios):
+        """Дополнение набора до size блюд и пропорционального числа остальных сущностей"""
+        started = time.perf_counter()
+        sent = self.stream(self._authors(max(int(ratios["authors"]), 1)), self.authors)
+        sent += self.stream(self._users(max(int(size * ratios["users"]), 2)), self.users)
+        sent += self.stream(self._dishes(size), self.dishes)
+        sent += self.stream(self._reviews(int(size * ratios["reviews"])), self.reviews)
+        likes = int(size * ratios["likes"])
+        sent += self.stream(self._likes(likes))
+        self.likes = max(self.likes, likes)
+        return sent, time.perf_counter() - started
+
+    def measure(self, targets, warmup):
+        """Медиана и p95 времени ответа в мс по списку (путь, параметры), первые warmup - прогрев"""
+        timings = []
+        for index, (path, params) in enumerate(targets):
+            target = f"{path}?{urlencode(params)}" if params else path
+            started = time.perf_counter()
+            self.call("GET", target)
+            if index >= warmup:
+                timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+
+def scaling_exponent(sizes, latencies, overhead):
+    """Наклон прямой log(latency - overhead) от log(n) методом наименьших квадратов"""
+    points = [(math.log(size), math.log(max(latency - base, 0.01))) for size, latency, base in zip(sizes, latencies, overhead)]
+    if len(points) < 2:
+        return math.nan
+    mean_x = statistics.fmean(x for x, _ in points)
+    mean_y = statistics.fmean(y for _, y in points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread if spread else math.nan
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", help="Сервер API вместо встроенной заглушки")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--sizes", default="1000,3000,10000", help="Ступени числа блюд через запятую")
+    parser.add_argument("--users-ratio", type=float, default=0.2, help="Пользователей на блюдо")
+    parser.add_argument("--reviews-ratio", type=float, default=1.0, help="Отзывов на блюдо")
+    parser.add_argument("--likes-ratio", type=float, default=2.0, help="Лайков на блюдо")
+    parser.add_argument("--authors", type=int, default=50, help="Число авторов (постоянное)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=500, help="Запросов в окне отправки")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--max-exponent", type=float, default=1.5, help="Порог показателя роста задержки")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--csv", help="Записать точки кривых в CSV")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+    ratios = {"authors": args.authors, "users": args.users_ratio, "reviews": args.reviews_ratio, "likes": args.likes_ratio}
+
+    host = args.host
+    if host is None:
+        host = stub_server.serve_in_thread(port=args.port, store=stub_server.RestaurantStore())
+    print(f"Сервер: {host}, ступени: {', '.join(map(str, sizes))} блюд")
+    builder = DatasetBuilder(host, args.concurrency, args.batch, args.seed)
+    rows = []
+    overhead = []
+    try:
+        for size in sizes:
+            sent, elapsed = builder.grow(size, ratios)
+            print(
+                f"n={size}: отправлено {sent} запросов за {elapsed:.1f} с ({sent / max(elapsed, 1e-9):.0f}/с), "
+                f"ошибок {builder.errors}; блюд {len(builder.dishes)}, пользователей {len(builder.users)}, "
+                f"отзывов {len(builder.reviews)}, лайков {builder.likes}"
+            )
+            calls = args.warmup + args.repeat
+            base, _ = builder.measure([(OVERHEAD_ENDPOINT, None)] * calls, args.warmup)
+            overhead.append(base)
+            for name, target in ENDPOINTS.items():
+                # Новый ID на каждый вызов, чтобы не мерить один закешированный объект
+                rng = random.Random(f"{args.seed}:{name}:{size}")
+                median, tail = builder.measure([target(builder, rng) for _ in range(calls)], args.warmup)
+                rows.append((size, name, median, tail))
+    finally:
+        builder.close()
+
+    print(f"\n{'эндпоинт':<34}" + "".join(f"{'n=' + str(size):>12}" for size in sizes) + f"{'k':>8}")
+    print(f"{'(накладные, GET ' + OVERHEAD_ENDPOINT + ')':<34}" + "".join(f"{base:>10.2f}мс" for base in overhead))
+    flagged = []
+    for name in ENDPOINTS:
+        latencies = [median for size, endpoint, median, _ in rows if endpoint == name]
+        exponent = scaling_exponent(sizes, latencies, overhead)
+        mark = ""
+        if exponent > args.max_exponent:
+            mark = "  !!"
+            flagged.append(f"{name}: k={exponent:.2f}")
+        print(f"{name:<34}" + "".join(f"{latency:>10.2f}мс" for latency in latencies) + f"{exponent:>8.2f}{mark}")
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as output:
+            writer = csv.writer(output)
+            writer.writerow(["size", "endpoint", "median_ms", "p95_ms", "overhead_ms"])
+            for size, name, median, tail in rows:
+                writer.writerow([size, name, f"{median:.3f}", f"{tail:.3f}", f"{overhead[sizes.index(size)]:.3f}"])
+    if flagged:
+        print(f"\nРост задержки быстрее n^{args.max_exponent}:\n  " + "\n  ".join(flagged))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,93 @@
 import os
 import logging
 import sys
+import csv
+import gzip
+import heapq
+import json
+import math
 import random
-from locust import HttpUser, task, between, TaskSet, events
+import re
+import socket
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from itertools import accumulate
+from urllib.parse import urlencode
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import resource_tracker, shared_memory
+
+# locust выполняет monkey-patching gevent при импорте, поэтому импортируется первым
+from locust import HttpUser, task, between, constant, TaskSet, events, LoadTestShape
+from locust.exception import StopUser
+from locust.contrib.fasthttp import FastHttpUser
+from locust.runners import MasterRunner, WorkerRunner
+from locust.stats import StatsEntry, calculate_response_time_percentile
+import gevent
+from gevent.monkey import get_original
+from gevent.event import Event
+from gevent.lock import Semaphore
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+import requests
+from requests.adapters import HTTPAdapter
 from faker import Faker
 
+import metrics_file
+from dataset_builder import DatasetBuilder
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from hdrh.histogram import HdrHistogram
+except ImportError:
+    HdrHistogram = None
+
+API_HOST = os.getenv("API_HOST", "http://localhost:8080")
+
+# HTTP-клиент виртуальных пользователей: requests (HttpUser) или fasthttp (FastHttpUser)
+API_CLIENT = os.getenv("API_CLIENT", "requests")
+if API_CLIENT not in ("requests", "fasthttp"):
+    raise ValueError(f"Неизвестный API_CLIENT: {API_CLIENT}, допустимо requests или fasthttp")
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "5"))
+WAIT_MIN = float(os.getenv("WAIT_MIN", "0.5"))
+WAIT_MAX = float(os.getenv("WAIT_MAX", "2.5"))
+
+# Параметры постраничной загрузки начальных данных
+SEED_PAGE_SIZE = int(os.getenv("SEED_PAGE_SIZE", "1000"))
+SEED_CONCURRENCY = int(os.getenv("SEED_CONCURRENCY", "8"))
+SEED_PAGE_PARAM = os.getenv("SEED_PAGE_PARAM", "page")
+SEED_TIMEOUT = float(os.getenv("SEED_TIMEOUT", "10"))
+
+# Декларативный профиль нагрузки (YAML/JSON): веса задач, вероятности веток, паузы, этапы
+WORKLOAD_FILE = os.getenv("WORKLOAD_FILE")
+
+# Воспроизведение access-лога: путь к логу и ускорение; в распределенном режиме
+# лог делится между воркерами, подключенными к старту теста
+REPLAY_LOG = os.getenv("REPLAY_LOG")
+REPLAY_SPEEDUP = float(os.getenv("REPLAY_SPEEDUP", "1"))
+# Отставание от расписания (с), с которого запрос считается опоздавшим
+REPLAY_LATE_THRESHOLD = float(os.getenv("REPLAY_LATE_THRESHOLD", "0.1"))
+
+# Параметры пулов идентификаторов: запас емкости сверх начальных ID, политика вытеснения
+# (fifo или lru) и период отправки новых ID воркерами в распределенном режиме
+ID_POOL_HEADROOM = int(os.getenv("ID_POOL_HEADROOM", "100000"))
+ID_POOL_EVICTION = os.getenv("ID_POOL_EVICTION", "fifo")
+ID_POOL_FLUSH_INTERVAL = float(os.getenv("ID_POOL_FLUSH_INTERVAL", "1"))
+
 # Настройка логирования
 logger = logging.getLogger("load_test")
 logger.setLevel(logging.INFO)
@@ -12,54 +95,1916 @@ handler = logging.StreamHandler(sys.stdout)
 handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
 logger.addHandler(handler)
 
-fake = Faker("ru_RU")
+class RateLimitFilter(logging.Filter):
+    """Ограничение повторяющихся предупреждений.
+
+    Сообщения уровня WARNING и выше группируются по шаблону (record.msg до
+    подстановки аргументов): в каждом окне window секунд пропускается не
+    более burst сообщений одного шаблона, остальные только подсчитываются.
+    """
+
+    def __init__(self, burst, window):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.suppressed = Counter()
+        self._windows = {}
+
+    def filter(self, record):
+        if record.levelno < logging.WARNING:
+            return True
+        key = (record.levelname, record.msg)
+        now = time.monotonic()
+        started, count = self._windows.get(key, (now, 0))
+        if now - started >= self.window:
+            started, count = now, 0
+        self._windows[key] = (started, count + 1)
+        if count < self.burst:
+            return True
+        self.suppressed[key] += 1
+        return False
+
+    def summary(self, limit=20):
+        """Строки отчета о подавленных сообщениях, самые частые первыми"""
+        return [
+            f"{count} x {level}: {template}"
+            for (level, template), count in self.suppressed.most_common(limit)
+        ]
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler без форматирования в потоке задачи.
+
+    Запись уходит в очередь как есть, сообщение собирается уже в
+    QueueListener; аргументы логов здесь неизменяемые (числа и строки).
+    """
+
+    def prepare(self, record):
+        return record
+
+class ThreadPoolQueueListener(QueueListener):
+    """QueueListener в настоящем потоке ОС из пула потоков gevent.
+
+    После monkey-patching threading.Thread - это greenlet в потоке хаба, и
+    медленный вывод обработчика задерживал бы запросы. Поэтому очередь -
+    исходная _queue.SimpleQueue с блокировками ОС, а цикл разбора очереди
+    выполняется в gevent threadpool.
+    """
+
+    def start(self):
+        self._thread = gevent.get_hub().threadpool.spawn(self._monitor)
+
+    def stop(self):
+        self.enqueue_sentinel()
+        self._thread.get()
+        self._thread = None
+
+log_state = {"listener": None, "rate_limit": None}
+
+def configure_logging(options):
+    """Настройка логгера по опциям командной строки locust"""
+    mode = getattr(options, "api_log_mode", "sync")
+    logger.setLevel(getattr(options, "api_log_level", "INFO"))
+    rate_limit = None
+    if getattr(options, "api_log_burst", 0) > 0:
+        rate_limit = RateLimitFilter(options.api_log_burst, options.api_log_window)
+    if mode == "queue":
+        log_queue = get_original("_queue", "SimpleQueue")()
+        queue_handler = DeferredQueueHandler(log_queue)
+        if rate_limit:
+            queue_handler.addFilter(rate_limit)
+        logger.removeHandler(handler)
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+        # Обработчик пишет только из потока слушателя: блокировка ОС вместо gevent
+        handler.lock = get_original("_thread", "RLock")()
+        listener = ThreadPoolQueueListener(log_queue, handler, respect_handler_level=True)
+        listener.start()
+        log_state["listener"] = listener
+    elif rate_limit:
+        handler.addFilter(rate_limit)
+    log_state["rate_limit"] = rate_limit
+
+@events.init_command_line_parser.add_listener
+def on_command_line_parser(parser):
+    group = parser.add_argument_group("restarate")
+    group.add_argument(
+        "--api-log-mode", choices=["sync", "queue"], default="sync", env_var="LOCUST_API_LOG_MODE",
+        help="sync - запись в stdout в потоке задачи, queue - через QueueHandler/QueueListener"
+    )
+    group.add_argument(
+        "--api-log-level", choices=["DEBUG", "INFO", "WARNING", "ERROR"], default="INFO",
+        env_var="LOCUST_API_LOG_LEVEL", help="Уровень логгера load_test"
+    )
+    group.add_argument(
+        "--api-log-burst", type=int, default=0, env_var="LOCUST_API_LOG_BURST",
+        help="Сколько одинаковых предупреждений пропускать за окно (0 - без ограничения)"
+    )
+    group.add_argument(
+        "--payload-pool-size", type=int, default=10000, env_var="LOCUST_PAYLOAD_POOL_SIZE",
+        help="Размер кольцевых буферов тестовых данных"
+    )
+    group.add_argument(
+        "--payload-warm", type=int, default=500, env_var="LOCUST_PAYLOAD_WARM",
+        help="Сколько записей сгенерировать до старта, остальное заполняется в фоне"
+    )
+    group.add_argument(
+        "--payload-seed", type=int, default=0, env_var="LOCUST_PAYLOAD_SEED",
+        help="Seed генератора тестовых данных (к нему добавляется номер воркера)"
+    )
+    group.add_argument(
+        "--slo-config", default=None, env_var="LOCUST_SLO_CONFIG",
+        help="JSON/YAML файл с порогами задержки и доли ошибок по эндпоинтам"
+    )
+    group.add_argument(
+        "--api-log-window", type=float, default=10.0, env_var="LOCUST_API_LOG_WINDOW",
+        help="Окно ограничения предупреждений, с"
+    )
+    group.add_argument(
+        "--metrics-port", type=int, default=0, env_var="LOCUST_METRICS_PORT",
+        help="Порт страницы метрик OpenMetrics (0 - не запускать)"
+    )
+    group.add_argument(
+        "--metrics-interval", type=float, default=5.0, env_var="LOCUST_METRICS_INTERVAL",
+        help="Интервал агрегации метрик, с"
+    )
+    group.add_argument(
+        "--metrics-file", default=None, env_var="LOCUST_METRICS_FILE",
+        help="Колоночный файл временных рядов метрик, записывается в конце прогона"
+    )
+    group.add_argument(
+        "--hdr-log", default=None, env_var="LOCUST_HDR_LOG",
+        help="Файл журнала HDR-гистограмм задержек по эндпоинтам (нужен пакет hdrh)"
+    )
+    group.add_argument(
+        "--hdr-interval", type=float, default=5.0, env_var="LOCUST_HDR_INTERVAL",
+        help="Интервал записи гистограмм в журнал, с"
+    )
+    group.add_argument(
+        "--hdr-digits", type=int, default=3, env_var="LOCUST_HDR_DIGITS",
+        help="Число значащих цифр HDR-гистограмм"
+    )
+    group.add_argument(
+        "--hdr-max-latency", type=float, default=60000, env_var="LOCUST_HDR_MAX_LATENCY",
+        help="Максимальная записываемая задержка, мс"
+    )
+
+class PayloadRing:
+    """Кольцевой буфер заранее сгенерированных значений, выдача за O(1)"""
+
+    __slots__ = ("items", "_position")
+
+    def __init__(self):
+        self.items = []
+        self._position = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def next(self):
+        items = self.items
+        position = self._position
+        if position >= len(items):
+            position = 0
+        self._position = position + 1
+        return items[position]
+
+class PayloadFactory:
+    """Тестовые данные Faker, сгенерированные заранее.
+
+    Кольцевые буферы пользователей, отзывов, обновлений профиля и слов для
+    поиска заполняются при старте (первые warm записей сразу, остальное при
+    необходимости в фоновом greenlet). Одинаковый seed дает одинаковые
+    данные; задачи получают готовые объекты без вызовов Faker. Буфер
+    повторяется по кругу, поэтому user() и profile() добавляют к login и
+    email суффикс из PID процесса и счетчика: сервер с уникальными login и
+    email не получит повторов ни от пользователей процесса, ни от воркеров.
+    """
+
+    def __init__(self):
+        self.users = PayloadRing()
+        self.reviews = PayloadRing()
+        self.profiles = PayloadRing()
+        self.words = PayloadRing()
+        self.size = 0
+        self._faker = None
+        self._random = None
+        self._issued = 0
+
+    def configure(self, size, seed, locale="ru_RU"):
+        self.size = size
+        self._faker = Faker(locale)
+        self._faker.seed_instance(seed)
+        self._random = random.Random(seed)
+
+    def fill(self, count):
+        fake = self._faker
+        for _ in range(min(count, self.size - len(self.words))):
+            self.users.items.append({
+                "email": fake.email(),
+                "login": fake.user_name(),
+                "name": fake.name(),
+                "birthday": fake.date_of_birth().isoformat()
+            })
+            self.reviews.items.append({
+                "content": fake.text(max_nb_chars=150),
+                "isPositive": self._random.random() < 0.5
+            })
+            self.profiles.items.append({"name": fake.name(), "email": fake.email()})
+            self.words.items.append(fake.word())
+
+    def user(self):
+        """Данные регистрации с уникальными login и email"""
+        return self._unique(self.users.next())
+
+    def profile(self):
+        """Обновление профиля с уникальным email"""
+        return self._unique(self.profiles.next())
+
+    def _unique(self, item):
+        self._issued += 1
+        suffix = f"{os.getpid()}_{self._issued}"
+        local, _, domain = item["email"].partition("@")
+        item = {**item, "email": f"{local}.{suffix}@{domain}"}
+        if "login" in item:
+            item["login"] = f"{item['login']}_{suffix}"
+        return item
+
+    def fill_background(self, chunk=20):
+        def run():
+            while len(self.words) < self.size:
+                self.fill(chunk)
+                # idle, а не sleep(0): следующая порция только когда в цикле gevent нет других событий
+                gevent.idle()
+        return gevent.spawn(run)
+
+payloads = PayloadFactory()
 
-# Глобальные списки для начальных данных
+class IdPool:
+    """Ограниченный пул идентификаторов int64 с выборкой по индексу за O(1).
+
+    Идентификаторы лежат в кольцевом буфере (заголовок [count, capacity,
+    next] и данные) емкостью "начальные ID + ID_POOL_HEADROOM". Когда буфер
+    заполнен, новый ID вытесняет самый старый (fifo) или первый ID, который
+    не выбирался с прошлого обхода (lru, алгоритм CLOCK). discard удаляет
+    ID, на который сервер ответил 404: на его место переносится самый
+    старый. Слот ID находится по индексу с открытой адресацией (линейное
+    пробирование, номера слотов в array("i") вдвое больше емкости, 8-16
+    байт на ID вместо словаря). Операции не переключают greenlet и поэтому атомарны для
+    пользователей процесса, изменения из других потоков защищены
+    блокировкой.
+
+    В распределенном режиме мастер переносит буфер в разделяемую память,
+    воркеры на том же хосте подключаются к сегменту по имени и только
+    читают его. Новые и удаленные идентификаторы воркер копит в pending и
+    discarded и пачками отправляет мастеру. Обращений воркеров мастер не
+    видит, поэтому там lru работает как fifo.
+    """
+
+    HEADER = 3
+    # Мультипликативное хеширование Фибоначчи для индекса слотов
+    HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+    HASH_MASK = (1 << 64) - 1
+
+    def __init__(self, policy="fifo"):
+        if policy not in ("fifo", "lru"):
+            raise ValueError(f"Неизвестная политика вытеснения: {policy}, допустимо fifo или lru")
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._shm = None
+        self._owner = True
+        self.pending = array("q")
+        self.discarded = array("q")
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self.load(())
+
+    def __len__(self):
+        return self._view[0]
+
+    def __getitem__(self, index):
+        view = self._view
+        count, capacity, next_slot = view[0], view[1], view[2]
+        if index < 0:
+            index += count
+        if not 0 <= index < count:
+            raise IndexError("IdPool index out of range")
+        slot = (next_slot - count + index) % capacity
+        if self._ref is not None:
+            self._ref[slot] = 1
+        return view[self.HEADER + slot]
+
+    @property
+    def shared(self):
+        return self._shm is not None
+
+    def load(self, ids, headroom=ID_POOL_HEADROOM):
+        """Замена содержимого пула, емкость - len(ids) + headroom"""
+        ids = array("q", ids)
+        capacity = max(len(ids) + headroom, 1)
+        self._view = array("q", bytes(8 * (self.HEADER + capacity)))
+        self._view[0:self.HEADER] = array("q", (len(ids), capacity, len(ids) % capacity))
+        self._view[self.HEADER:self.HEADER + len(ids)] = ids
+        bits = max(2 * capacity - 1, 1).bit_length()
+        self._shift = 64 - bits
+        self._index = array("i", bytes(4 << bits))
+        for slot, value in enumerate(ids):
+            position = self._find(value)
+            if not self._index[position]:
+                self._index[position] = slot + 1
+        self._ref = bytearray(capacity) if self.policy == "lru" else None
+
+    def _home(self, value):
+        return ((value * self.HASH_MULTIPLIER) & self.HASH_MASK) >> self._shift
+
+    def _find(self, value):
+        """Позиция value в индексе или пустая позиция, куда его можно вставить"""
+        index, view, mask = self._index, self._view, len(self._index) - 1
+        position = self._home(value)
+        while True:
+            slot = index[position]
+            if not slot or view[self.HEADER + slot - 1] == value:
+                return position
+            position = (position + 1) & mask
+
+    def _unindex(self, position):
+        """Удаление позиции индекса со сдвигом следующих записей цепочки назад"""
+        index, view, mask = self._index, self._view, len(self._index) - 1
+        hole = position
+        position = (position + 1) & mask
+        while index[position]:
+            home = self._home(view[self.HEADER + index[position] - 1])
+            # Запись можно перенести в дыру, если дыра лежит между ее домашней позицией и текущей
+            if (position - home) & mask >= (position - hole) & mask:
+                index[hole] = index[position]
+                hole = position
+            position = (position + 1) & mask
+        index[hole] = 0
+
+    def append(self, value):
+        if not self._owner:
+            self.pending.append(value)
+            return
+        with self._lock:
+            self._write(value)
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def discard(self, value):
+        """Удаление ID, которого больше нет на сервере"""
+        if not self._owner:
+            self.discarded.append(value)
+            return
+        with self._lock:
+            position = self._find(value)
+            slot = self._index[position] - 1
+            if slot < 0:
+                return
+            self._unindex(position)
+            view = self._view
+            count, capacity, next_slot = view[0], view[1], view[2]
+            oldest = (next_slot - count) % capacity
+            if slot != oldest:
+                moved = view[self.HEADER + oldest]
+                self._index[self._find(moved)] = slot + 1
+                view[self.HEADER + slot] = moved
+                if self._ref is not None:
+                    self._ref[slot] = self._ref[oldest]
+            view[0] = count - 1
+
+    def record(self, value, found):
+        """Учет ответа на запрос к ID из пула: при 404 ID удаляется"""
+        if found:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.discard(value)
+
+    def stats(self):
+        return {
+            "size": len(self), "capacity": self._view[1],
+            "hits": self.hits, "misses": self.misses, "evicted": self.evicted
+        }
+
+    def drain(self):
+        """Забрать накопленные воркером новые и удаленные идентификаторы"""
+        added, self.pending = self.pending, array("q")
+        discarded, self.discarded = self.discarded, array("q")
+        return added, discarded
+
+    def _write(self, value):
+        if self._index[self._find(value)]:
+            return
+        view, ref = self._view, self._ref
+        count, capacity, next_slot = view[0], view[1], view[2]
+        if count == capacity:
+            if ref is not None:
+                # CLOCK: ID, выбранные с прошлого обхода, получают второй шанс
+                while ref[next_slot]:
+                    ref[next_slot] = 0
+                    next_slot = (next_slot + 1) % capacity
+            self._unindex(self._find(view[self.HEADER + next_slot]))
+            self.evicted += 1
+        else:
+            view[0] = count + 1
+        view[self.HEADER + next_slot] = value
+        self._index[self._find(value)] = next_slot + 1
+        view[2] = (next_slot + 1) % capacity
+
+    def share(self, name):
+        """Перенос пула в новый сегмент разделяемой памяти (мастер)"""
+        local = self._view
+        self._shm = shared_memory.SharedMemory(name=name, create=True, size=len(local) * 8)
+        self._view = self._shm.buf.cast("q")
+        self._view[:] = local
+        self._ref = None
+
+    def attach(self, name):
+        """Подключение к сегменту мастера (воркер на том же хосте)"""
+        shm = shared_memory.SharedMemory(name=name)
+        # Сегментом владеет мастер: воркер не должен удалять его при выходе
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        self._shm = shm
+        self._view = shm.buf.cast("q")
+        self._owner = False
+        self._index = array("i")
+        self._ref = None
+
+    def close(self):
+        if self._shm is None:
+            return
+        owner = self._owner
+        self._view.release()
+        self._shm.close()
+        if owner:
+            self._shm.unlink()
+        self._shm = None
+        self._owner = True
+        self.load(())
+
+# Глобальные пулы идентификаторов начальных данных
 global_data = {
-    "dish_ids": [],
-    "review_ids": []
+    "dish_ids": IdPool(ID_POOL_EVICTION),
+    "review_ids": IdPool(ID_POOL_EVICTION)
 }
 
-@events.init.add_listener
-def on_locust_init(environment, **kwargs):
-    """Централизованная загрузка начальных данных"""
-    logger.info("### Начало нагрузочного тестирования ###")
-    logger.info(f"Целевой сервер: {environment.host}")
+# Бизнес-счетчики процесса
+business_counters = Counter()
+
+json_loads = orjson.loads if orjson is not None else json.loads
+_UNPARSED = object()
+_ID_FIELDS = {}
+
+def response_json(response):
+    """Тело ответа в JSON: разбирается один раз и кешируется на объекте ответа"""
+    parsed = getattr(response, "_parsed_json", _UNPARSED)
+    if parsed is _UNPARSED:
+        body = response.content
+        parsed = json_loads(body) if body else None
+        response._parsed_json = parsed
+    return parsed
+
+def extract_ids(response, key):
+    """Значения целочисленного поля key элементов списка в теле ответа.
+
+    Без orjson плоский список (одна пара скобок [], по одному полю key на
+    объект) разбирается регулярным выражением по байтам тела без построения
+    объектов - это вдвое быстрее модуля json. orjson разбирает тело целиком
+    быстрее регулярного выражения, поэтому при нем, как и для списков с
+    вложенными объектами (авторы блюд), используется response_json.
+    """
+    if orjson is None and getattr(response, "_parsed_json", _UNPARSED) is _UNPARSED:
+        body = response.content or b""
+        if body.count(b"[") == 1:
+            pattern = _ID_FIELDS.get(key)
+            if pattern is None:
+                pattern = _ID_FIELDS[key] = re.compile(rb'"' + re.escape(key.encode()) + rb'"\s*:\s*(-?\d+)')
+            values = pattern.findall(body)
+            if body.count(b"{") == len(values):
+                return [int(value) for value in values]
+    return [item[key] for item in response_json(response)]
+
+def _fetch_page(session, url, key, page):
+    """Загрузка одной страницы коллекции, возвращает идентификаторы"""
+    response = session.get(
+        url,
+        params={"count": SEED_PAGE_SIZE, SEED_PAGE_PARAM: page},
+        timeout=SEED_TIMEOUT
+    )
+    response.raise_for_status()
+    return extract_ids(response, key)
+
+def seed_ids(session, url, key, executor):
+    """Постраничная загрузка идентификаторов коллекции в компактный массив.
+
+    Страницы запрашиваются пачками по SEED_CONCURRENCY штук; загрузка
+    заканчивается на первой неполной странице. Если сервер игнорирует
+    параметр страницы и повторяет первую страницу, берется только она.
+    """
+    ids = array("q")
+    first_id = None
+    page = 0
+    while True:
+        pages = range(page, page + SEED_CONCURRENCY)
+        for number, page_ids in zip(pages, executor.map(lambda p: _fetch_page(session, url, key, p), pages)):
+            if number == 0 and page_ids:
+                first_id = page_ids[0]
+            elif page_ids and page_ids[0] == first_id:
+                logger.warning("Сервер не поддерживает параметр '%s', загружена только первая страница %s", SEED_PAGE_PARAM, url)
+                return ids
+            ids.extend(page_ids)
+            if len(page_ids) < SEED_PAGE_SIZE:
+                return ids
+        page += SEED_CONCURRENCY
+
+def seed_pools(host):
+    """Загрузка начальных данных с сервера в пулы global_data"""
     logger.info("Загрузка начальных данных...")
-    
+    started = time.perf_counter()
+    session = requests.Session()
+    session.mount(host, HTTPAdapter(pool_connections=1, pool_maxsize=SEED_CONCURRENCY))
     try:
-        with environment.client.get("/dishes", timeout=5) as response:
-            if response.status_code == 200:
-                global_data["dish_ids"] = [dish["id"] for dish in response.json()]
-                logger.info(f"Загружено {len(global_data['dish_ids'])} блюд")
+        with ThreadPoolExecutor(max_workers=SEED_CONCURRENCY) as executor:
+            for name, path, key in (("dish_ids", "/dishes", "id"), ("review_ids", "/reviews", "reviewId")):
+                try:
+                    global_data[name].load(seed_ids(session, f"{host}{path}", key, executor))
+                except Exception as e:
+                    logger.error("Ошибка загрузки %s: %s", path, e)
+    finally:
+        session.close()
+
+    logger.info(
+        "Начальные данные загружены за %.2f с: %s блюд, %s отзывов",
+        time.perf_counter() - started, len(global_data["dish_ids"]), len(global_data["review_ids"])
+    )
+
+class SocialGraph:
+    """Граф друзей со степенным распределением числа друзей (секция graph профиля).
+
+    Число друзей обычного пользователя берется из усеченного степенного
+    распределения (exponent, min_degree, max_degree), первые celebrities
+    пользователей получают по celebrity_degree друзей. Друзья выбираются
+    пропорционально собственному числу друзей, поэтому знаменитостей чаще
+    добавляют в друзья и остальные. Граф однозначно задается seed: мастер
+    создает пользователей и ребра на сервере, воркеры строят тот же индекс
+    по seed и списку ID от мастера. Индекс смежности хранится в CSR
+    (offsets и номера узлов friends в массивах array), узлы разложены по
+    корзинам числа друзей (buckets) для целенаправленного выбора в задачах.
+    """
+
+    def __init__(self, config):
+        self.size = config.get("users", 1000)
+        self.exponent = config.get("exponent", 2.5)
+        self.min_degree = config.get("min_degree", 1)
+        self.max_degree = config.get("max_degree", 100)
+        self.celebrities = config.get("celebrities", 0)
+        self.celebrity_degree = config.get("celebrity_degree", 10000)
+        self.seed = config.get("seed", 0)
+        self.activity = config.get("activity", 1)
+        self.concurrency = config.get("concurrency", 32)
+        self.cleanup = config.get("cleanup", True)
+        self.bounds = config.get("buckets", [10, 100, 1000])
+        self.bucket_weights = config.get("bucket_weights", {})
+        self.user_ids = array("q")
+        self.offsets = array("q", [0])
+        self.friends = array("i")
+        self.buckets = {}
+        self._choice = None
+
+    @staticmethod
+    def bucket_labels(bounds):
+        """Подписи корзин числа друзей по границам: 0-9, 10-99, ..., 1000+"""
+        lows = [0, *bounds]
+        return [f"{low}-{high - 1}" for low, high in zip(lows, bounds)] + [f"{lows[-1]}+"]
+
+    def _degrees(self, rng):
+        """Целевое число друзей каждого узла"""
+        shape = self.exponent - 1
+        top = 1 - (self.min_degree / (self.max_degree + 1)) ** shape
+        degrees = array("i", [self.celebrity_degree] * self.celebrities)
+        for _ in range(self.size - self.celebrities):
+            degrees.append(int(self.min_degree * (1 - rng.random() * top) ** (-1 / shape)))
+        return degrees
+
+    def build(self):
+        """Генерация ребер по seed и построение индекса смежности"""
+        rng = random.Random(self.seed)
+        degrees = self._degrees(rng)
+        nodes = range(self.size)
+        cumulative = list(accumulate(degrees))
+        self.offsets = array("q", [0])
+        self.friends = array("i")
+        for node, degree in enumerate(degrees):
+            if degree > self.size // 4:
+                picked = [other + (other >= node) for other in rng.sample(range(self.size - 1), degree)]
             else:
-                logger.warning(f"Ошибка загрузки блюд: {response.status_code}")
-                
-        with environment.client.get("/reviews", timeout=5) as response:
-            if response.status_code == 200:
-                global_data["review_ids"] = [review["reviewId"] for review in response.json()]
-                logger.info(f"Загружено {len(global_data['review_ids'])} отзывов")
+                picked = set()
+                while len(picked) < degree:
+                    picked.update(rng.choices(nodes, cum_weights=cumulative, k=degree - len(picked)))
+                    picked.discard(node)
+            self.friends.extend(sorted(picked))
+            self.offsets.append(len(self.friends))
+
+        labels = self.bucket_labels(self.bounds)
+        buckets = {label: array("i") for label in labels}
+        for node, degree in enumerate(degrees):
+            buckets[labels[bisect_right(self.bounds, degree)]].append(node)
+        self.buckets = {label: members for label, members in buckets.items() if members}
+        self._choice = AliasTable(list(self.buckets), [self.bucket_weights.get(label, 1) for label in self.buckets])
+
+    def degree(self, node):
+        return self.offsets[node + 1] - self.offsets[node]
+
+    def neighbors(self, node):
+        return self.friends[self.offsets[node]:self.offsets[node + 1]]
+
+    def edges(self):
+        for node in range(self.size):
+            for index in range(self.offsets[node], self.offsets[node + 1]):
+                yield node, self.friends[index]
+
+    def pick(self, bucket=None):
+        """Случайный узел корзины (без корзины - по весам bucket_weights), возвращает (корзина, узел)"""
+        if bucket is None:
+            bucket = self._choice.sample()
+        return bucket, random.choice(self.buckets[bucket])
+
+    def provision(self, host, dish_ids):
+        """Создание пользователей, друзей и лайков (activity на пользователя) на сервере.
+
+        Запросы отправляются окнами DatasetBuilder в keep-alive соединениях
+        http.client: для сотен тысяч ребер requests заметно медленнее.
+        """
+        started = time.perf_counter()
+        tag = f"graph{os.getpid()}"
+        builder = DatasetBuilder(host, self.concurrency, self.concurrency * 16, self.seed)
+        failures = Counter()
+        try:
+            builder.stream((
+                ("POST", "/users", {
+                    "email": f"{tag}_{index}@example.com", "login": f"{tag}_{index}",
+                    "name": f"Graph {index}", "birthday": "1990-01-01"
+                }, "id")
+                for index in range(self.size)
+            ), self.user_ids)
+            if len(self.user_ids) < self.size:
+                raise RuntimeError(f"не созданы пользователи графа: {self.size - len(self.user_ids)} из {self.size}")
+            ids = self.user_ids
+            linked = time.perf_counter()
+            errors = builder.errors
+            builder.stream(("PUT", f"/users/{ids[node]}/friends/{ids[friend]}", None, None) for node, friend in self.edges())
+            failures["friends"] = builder.errors - errors
+            linked = time.perf_counter() - linked
+            if dish_ids and self.activity:
+                rng = random.Random(self.seed)
+                errors = builder.errors
+                builder.stream(
+                    ("PUT", f"/dishes/{dish_ids[rng.randrange(len(dish_ids))]}/like/{user_id}", None, None)
+                    for user_id in ids for _ in range(self.activity)
+                )
+                failures["likes"] = builder.errors - errors
+        finally:
+            builder.close()
+
+        degrees = sorted(self.degree(node) for node in range(self.size))
+        logger.info(
+            "Граф друзей создан за %.2f с: %s пользователей, %s ребер (%.0f ребер/с), "
+            "друзей: среднее %.1f, медиана %s, максимум %s; узлов по корзинам: %s",
+            time.perf_counter() - started, self.size, len(self.friends), len(self.friends) / max(linked, 1e-9),
+            len(self.friends) / self.size, degrees[self.size // 2], degrees[-1],
+            {label: len(members) for label, members in self.buckets.items()}
+        )
+        failures = +failures
+        if failures:
+            logger.warning("Ошибки создания графа друзей: %s", dict(failures))
+
+    def remove(self, host):
+        """Удаление пользователей графа (вместе с их друзьями и лайками)"""
+        builder = DatasetBuilder(host, self.concurrency, self.concurrency * 16, self.seed)
+        try:
+            removed = builder.stream(("DELETE", f"/users/{user_id}", None, None) for user_id in self.user_ids)
+        finally:
+            builder.close()
+        logger.info("Удалено пользователей графа друзей: %s, ошибок: %s", removed - builder.errors, builder.errors)
+
+graph_state = {"graph": None, "ready": Event()}
+
+def setup_graph(host):
+    """Мастер или единственный процесс: построение и создание графа друзей"""
+    try:
+        if not workload.graph:
+            return
+        graph = SocialGraph(workload.graph)
+        started = time.perf_counter()
+        graph.build()
+        logger.info("Индекс графа друзей построен за %.2f с", time.perf_counter() - started)
+        graph_state["graph"] = graph
+        try:
+            graph.provision(host, global_data["dish_ids"])
+        except Exception as e:
+            logger.error("Ошибка создания графа друзей: %s", e)
+            graph_state["graph"] = None
+            graph.remove(host)
+    finally:
+        graph_state["ready"].set()
+
+def attach_graph(user_ids):
+    """Воркер: тот же индекс по seed профиля и ID пользователей от мастера"""
+    graph = SocialGraph(workload.graph)
+    graph.build()
+    graph.user_ids = array("q", user_ids)
+    graph_state["graph"] = graph
+    logger.info("Подключен граф друзей: %s пользователей, %s ребер", graph.size, len(graph.friends))
+
+def finish_graph(host):
+    graph = graph_state["graph"]
+    graph_state["graph"] = None
+    if graph and graph.cleanup:
+        graph.remove(host)
+
+def _share_pools(environment):
+    """Мастер: публикация пулов в разделяемой памяти и прием новых ID"""
+    segments = {}
+    for name, pool in global_data.items():
+        segment = f"restarate_{os.getpid()}_{name}"
+        try:
+            pool.share(segment)
+            segments[name] = segment
+        except Exception as e:
+            logger.error("Ошибка создания общего пула %s: %s", name, e)
+
+    def on_pool_request(environment, msg, **kwargs):
+        # Ответ после создания графа друзей: воркерам нужны ID его пользователей
+        def reply():
+            graph_state["ready"].wait()
+            graph = graph_state["graph"]
+            environment.runner.send_message(
+                "id_pool_attach",
+                {"host": socket.gethostname(), "segments": segments, "graph": graph.user_ids.tolist() if graph else None},
+                client_id=msg.node_id
+            )
+        gevent.spawn(reply)
+
+    def on_pool_ids(environment, msg, **kwargs):
+        for name, changes in msg.data.items():
+            pool = global_data[name]
+            pool.extend(changes["added"])
+            for value in changes["discarded"]:
+                pool.discard(value)
+
+    environment.runner.register_message("id_pool_request", on_pool_request)
+    environment.runner.register_message("id_pool_ids", on_pool_ids)
+
+def _attach_pools(environment, host):
+    """Воркер: подключение к пулам мастера или локальная загрузка"""
+    def on_pool_attach(environment, msg, **kwargs):
+        if msg.data.get("graph"):
+            attach_graph(msg.data["graph"])
+        segments = msg.data["segments"]
+        if msg.data["host"] == socket.gethostname() and set(segments) == set(global_data):
+            try:
+                for name, segment in segments.items():
+                    global_data[name].attach(segment)
+                logger.info(
+                    "Подключены общие пулы: %s блюд, %s отзывов",
+                    len(global_data["dish_ids"]), len(global_data["review_ids"])
+                )
+                return
+            except FileNotFoundError as e:
+                logger.warning("Общий пул недоступен: %s", e)
+        # Воркер на другом хосте загружает данные самостоятельно
+        seed_pools(host)
+
+    def flush_pools():
+        while True:
+            gevent.sleep(ID_POOL_FLUSH_INTERVAL)
+            batch = {}
+            for name, pool in global_data.items():
+                if pool.shared and (pool.pending or pool.discarded):
+                    added, discarded = pool.drain()
+                    batch[name] = {"added": added.tolist(), "discarded": discarded.tolist()}
+            if batch:
+                environment.runner.send_message("id_pool_ids", batch)
+
+    environment.runner.register_message("id_pool_attach", on_pool_attach)
+    environment.runner.send_message("id_pool_request")
+    gevent.spawn(flush_pools)
+
+def setup_payloads(environment):
+    """Заполнение буферов тестовых данных по опциям командной строки"""
+    options = environment.parsed_options
+    size = getattr(options, "payload_pool_size", 10000)
+    warm = getattr(options, "payload_warm", 500)
+    seed = getattr(options, "payload_seed", 0) + getattr(environment.runner, "worker_index", 0)
+    started = time.perf_counter()
+    payloads.configure(size, seed)
+    payloads.fill(max(warm, 1))
+    logger.info("Сгенерировано %s наборов тестовых данных за %.2f с", len(payloads.words), time.perf_counter() - started)
+    if len(payloads.words) < size:
+        payloads.fill_background()
+
+def load_config_file(path):
+    """Чтение конфигурации из YAML (.yaml/.yml) или JSON"""
+    with open(path, encoding="utf-8") as config_file:
+        if path.endswith((".yaml", ".yml")):
+            if yaml is None:
+                raise RuntimeError(f"Для YAML-конфигурации {path} нужен пакет PyYAML")
+            return yaml.safe_load(config_file)
+        return json.load(config_file)
+
+class SloRule:
+    """Порог для одного шаблона эндпоинта.
+
+    name - шаблон из статистики locust, где [id] и любые [..] совпадают с
+    одним сегментом пути, либо Aggregated для суммарной строки. Пороги:
+    pNN (мс, например p95, p99.9), avg (мс) и error_rate (доля от 0 до 1).
+    """
+
+    def __init__(self, config):
+        self.name = config["name"]
+        self.method = config.get("method")
+        self.min_requests = config.get("min_requests", 20)
+        self.pattern = re.compile("^" + re.sub(r"\\\[\w+\\\]", "[^/]+", re.escape(self.name)) + "$")
+        self.thresholds = {key: value for key, value in config.items() if key == "avg" or key == "error_rate" or key.startswith("p")}
+
+    @property
+    def label(self):
+        return f"{self.method} {self.name}" if self.method else self.name
+
+    def select(self, stats):
+        """Сводная запись статистики по всем подходящим строкам"""
+        if self.name == "Aggregated":
+            return stats.total
+        merged = StatsEntry(stats, self.name, self.method or "")
+        for (name, method), entry in stats.entries.items():
+            if (self.method is None or method == self.method) and self.pattern.match(name):
+                merged.extend(entry)
+        return merged
+
+    def check(self, response_times, num_requests, num_failures, total_response_time):
+        """Список нарушений для набора измерений"""
+        if num_requests < self.min_requests:
+            return []
+        violations = []
+        for key, limit in self.thresholds.items():
+            if key == "error_rate":
+                value = num_failures / num_requests
+            elif key == "avg":
+                value = total_response_time / num_requests
             else:
-                logger.warning(f"Ошибка загрузки отзывов: {response.status_code}")
-                
-    except Exception as e:
-        logger.error(f"Ошибка загрузки начальных данных: {str(e)}")
+                value = calculate_response_time_percentile(response_times, num_requests, float(key[1:]) / 100)
+            if value > limit:
+                violations.append(f"{self.label}: {key}={value:.4g} > {limit}")
+        return violations
+
+class SloWindow:
+    """Скользящее окно измерений одного правила по снимкам StatsEntry"""
+
+    def __init__(self, rule, length):
+        self.rule = rule
+        self.length = length
+        self.snapshots = deque()
+
+    def sample(self, stats, now):
+        entry = self.rule.select(stats)
+        self.snapshots.append((
+            now, dict(entry.response_times), entry.num_requests, entry.num_failures, entry.total_response_time
+        ))
+        while len(self.snapshots) > 2 and now - self.snapshots[1][0] >= self.length:
+            self.snapshots.popleft()
+
+    def check(self):
+        if len(self.snapshots) < 2:
+            return []
+        _, old_times, old_requests, old_failures, old_total = self.snapshots[0]
+        _, new_times, new_requests, new_failures, new_total = self.snapshots[-1]
+        response_times = {
+            bucket: count - old_times.get(bucket, 0)
+            for bucket, count in new_times.items()
+            if count > old_times.get(bucket, 0)
+        }
+        return self.rule.check(
+            response_times, new_requests - old_requests, new_failures - old_failures, new_total - old_total
+        )
+
+class SloEngine:
+    """Проверка SLO по статистике locust.
+
+    В конце теста проверяются итоговые значения за весь прогон. Если в
+    конфигурации задан window (с), пороги дополнительно проверяются каждые
+    check_interval секунд на скользящем окне, и любое нарушение в окне
+    также проваливает прогон (stop_on_failure останавливает его сразу).
+    """
+
+    def __init__(self, config):
+        self.rules = [SloRule(rule) for rule in config["rules"]]
+        self.window = config.get("window", 0)
+        self.check_interval = config.get("check_interval", 5)
+        self.stop_on_failure = config.get("stop_on_failure", False)
+        self.violations = []
+        self._greenlet = None
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_config_file(path))
+
+    def start(self, environment):
+        if self.window > 0:
+            self._greenlet = gevent.spawn(self._watch, environment)
+
+    def stop(self):
+        if self._greenlet:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def _watch(self, environment):
+        windows = [SloWindow(rule, self.window) for rule in self.rules]
+        while True:
+            gevent.sleep(self.check_interval)
+            now = time.monotonic()
+            for window in windows:
+                window.sample(environment.stats, now)
+                for violation in window.check():
+                    logger.warning("Нарушение SLO в окне %s с: %s", self.window, violation)
+                    self.violations.append(f"[окно] {violation}")
+                    if self.stop_on_failure and environment.runner:
+                        environment.runner.quit()
+
+    def evaluate(self, stats):
+        """Итоговая проверка, возвращает все нарушения за прогон"""
+        for rule in self.rules:
+            entry = rule.select(stats)
+            self.violations.extend(rule.check(
+                entry.response_times, entry.num_requests, entry.num_failures, entry.total_response_time
+            ))
+        return self.violations
+
+slo_state = {"engine": None}
+
+class AliasTable:
+    """Выбор элемента с заданными весами за O(1) (метод псевдонимов Vose)"""
+
+    def __init__(self, items, weights):
+        total = sum(weights)
+        if not items or total <= 0:
+            raise ValueError("Для выбора с весами нужен хотя бы один положительный вес")
+        size = len(items)
+        scaled = [weight * size / total for weight in weights]
+        self.items = list(items)
+        self.prob = [1.0] * size
+        self.alias = list(range(size))
+        small = [i for i, value in enumerate(scaled) if value < 1]
+        large = [i for i, value in enumerate(scaled) if value >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] += scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+
+    def sample(self):
+        column = int(random.random() * len(self.items))
+        if random.random() >= self.prob[column]:
+            column = self.alias[column]
+        return self.items[column]
+
+def think_time(config):
+    """Функция паузы между задачами (wait_time) по описанию распределения.
+
+    constant: value; uniform: min, max; exponential: mean; lognormal:
+    median, sigma; pareto: min, alpha. Необязательный max ограничивает
+    хвост распределения.
+    """
+    kind = config.get("distribution", "uniform")
+    if kind == "constant":
+        value = config["value"]
+        return lambda user: value
+    if kind == "uniform":
+        return between(config.get("min", WAIT_MIN), config.get("max", WAIT_MAX))
+    if kind == "exponential":
+        rate = 1 / config["mean"]
+        sample = lambda: random.expovariate(rate)
+    elif kind == "lognormal":
+        mu, sigma = math.log(config["median"]), config["sigma"]
+        sample = lambda: random.lognormvariate(mu, sigma)
+    elif kind == "pareto":
+        scale, alpha = config["min"], config["alpha"]
+        sample = lambda: scale * random.paretovariate(alpha)
+    else:
+        raise ValueError(f"Неизвестное распределение паузы: {kind}")
+    limit = config.get("max", math.inf)
+    return lambda user: min(sample(), limit)
+
+class UniformKeys:
+    """Равномерный выбор ключа из пула"""
+
+    def sample(self, pool):
+        return pool[int(random.random() * len(pool))]
+
+class ZipfKeys:
+    """Выбор по закону Ципфа: ключ ранга k с весом 1 / (k + 1) ** exponent.
+
+    Ранг - позиция в пуле (у общих пулов она одинакова во всех воркерах,
+    поэтому горячие ключи общие), при latest ранги отсчитываются от конца
+    пула, и чаще выбираются недавно добавленные ID. Таблица псевдонимов
+    строится на max_keys первых рангов и перестраивается, когда размер
+    пула меняется больше чем на четверть.
+    """
+
+    def __init__(self, exponent=1.0, max_keys=100000, latest=False):
+        self.exponent = exponent
+        self.max_keys = max_keys
+        self.latest = latest
+        self.table = None
+        self.size = 0
+
+    def _rebuild(self, size):
+        ranks = range(min(size, self.max_keys))
+        self.table = AliasTable(ranks, [1 / (rank + 1) ** self.exponent for rank in ranks])
+        self.size = size
+
+    def sample(self, pool):
+        size = len(pool)
+        if self.table is None or not self.size * 0.75 <= size <= self.size * 1.25:
+            self._rebuild(size)
+        rank = self.table.sample()
+        if rank >= size:
+            rank %= size
+        return pool[size - 1 - rank] if self.latest else pool[rank]
+
+class HotspotKeys:
+    """Доля hot_share запросов приходится на первые hot_fraction ключей пула"""
+
+    def __init__(self, hot_fraction=0.01, hot_share=0.9):
+        self.hot_fraction = hot_fraction
+        self.hot_share = hot_share
+
+    def sample(self, pool):
+        size = len(pool)
+        hot = max(1, int(size * self.hot_fraction))
+        if random.random() < self.hot_share or hot >= size:
+            return pool[int(random.random() * hot)]
+        return pool[hot + int(random.random() * (size - hot))]
+
+def key_sampler(config):
+    """Выборщик ключей по описанию: uniform, zipf, hotspot или latest"""
+    options = dict(config)
+    kind = options.pop("distribution", "uniform")
+    if kind == "uniform":
+        return UniformKeys()
+    if kind == "zipf":
+        return ZipfKeys(**options)
+    if kind == "latest":
+        return ZipfKeys(latest=True, **options)
+    if kind == "hotspot":
+        return HotspotKeys(**options)
+    raise ValueError(f"Неизвестное распределение ключей: {kind}")
+
+class KeySamplers:
+    """Выбор ID по эндпоинтам ("PUT /dishes/[id]/like/[id]") с выборщиком default для остальных"""
+
+    def __init__(self, config):
+        config = dict(config)
+        self.default = key_sampler(config.pop("default", {}))
+        self.samplers = {endpoint: key_sampler(options) for endpoint, options in config.items()}
+
+    def pick(self, endpoint, pool, current=None):
+        """ID для запроса к endpoint; без своего выборщика повторно используется current, если он есть"""
+        sampler = self.samplers.get(endpoint)
+        if sampler is None:
+            if current is not None:
+                return current
+            sampler = self.default
+        return sampler.sample(pool)
+
+# Эндпоинты UserBehavior для воспроизведения лога и открытой модели и вид каждого ID в пути
+ENDPOINT_IDS = {
+    ("GET", "/dishes/[id]"): ("dish",),
+    ("PUT", "/dishes/[id]/like/[id]"): ("dish", "user"),
+    ("DELETE", "/dishes/[id]/like/[id]"): ("dish", "user"),
+    ("POST", "/reviews"): (),
+    ("GET", "/reviews/[id]"): ("review",),
+    ("PUT", "/reviews/[id]/like/[id]"): ("review", "user"),
+    ("DELETE", "/reviews/[id]/like/[id]"): ("review", "user"),
+    ("GET", "/users"): (),
+    ("PUT", "/users"): (),
+    ("GET", "/users/[id]/friends"): ("user",),
+    ("PUT", "/users/[id]/friends/[id]"): ("user", "user"),
+    ("DELETE", "/users/[id]/friends/[id]"): ("user", "user"),
+    ("GET", "/users/[id]/recommendations"): ("user",),
+    ("GET", "/users/[id]/feed"): ("user",),
+}
+
+# Зарегистрированные виртуальные пользователи процесса: цель для ID пользователей
+active_users = []
+
+def endpoint_payload(method, template, user_id):
+    """Параметры и тело запроса к эндпоинту из буферов payloads, None если данных нет"""
+    if method == "POST" and template == "/reviews":
+        dish_ids = global_data["dish_ids"]
+        if not dish_ids:
+            return None
+        return {"json": {**payloads.reviews.next(), "userId": user_id, "dishId": workload.keys.pick("POST /reviews", dish_ids)}}
+    if template == "/users":
+        if method == "GET":
+            return {"params": {"query": payloads.words.next(), "by": "login"}}
+        return {"json": {"id": user_id, **payloads.profile()}}
+    return {}
+
+# Вероятности условных веток задач UserBehavior по умолчанию
+FLOW_DEFAULTS = {
+    "dish_like": 0.3,
+    "dish_unlike": 0.1,
+    "review_create": 0.2,
+    "review_like": 0.25,
+    "review_unlike": 0.1,
+    "friend_add": 0.15,
+    "friend_remove": 0.05,
+    "profile_update": 0.1,
+    "graph_friends": 0.3,
+    "graph_common": 0.5,
+    "graph_recommendations": 0.2,
+}
+
+class Workload:
+    """Профиль нагрузки из YAML/JSON.
+
+    tasks - веса задач UserBehavior по имени метода (без секции действуют
+    веса из @task), flows - вероятности веток из FLOW_DEFAULTS, think_time -
+    распределение паузы между задачами, keys - распределение выбираемых ID
+    по эндпоинтам (KeySamplers), stages - этапы нагрузки во времени для
+    WorkloadShape, open_loop - частоты запросов для OpenLoopUser, capacity -
+    поиск предельной нагрузки для CapacityShape, contention - сценарий
+    конкурентных лайков ContentionUser, graph - граф друзей SocialGraph и
+    вес задачи graph_interactions (weight). Веса компилируются в таблицу
+    псевдонимов один раз при загрузке.
+    """
+
+    def __init__(self, config=None):
+        config = config or {}
+        self.config = config
+        unknown = set(config.get("flows", {})) - set(FLOW_DEFAULTS)
+        if unknown:
+            raise ValueError(f"Неизвестные ветки в профиле нагрузки: {', '.join(sorted(unknown))}")
+        self.flows = {**FLOW_DEFAULTS, **config.get("flows", {})}
+        self.wait_time = think_time(config.get("think_time", {}))
+        self.keys = KeySamplers(config.get("keys", {}))
+        self.open_loop = config.get("open_loop") or {}
+        unknown = [
+            endpoint for endpoint in self.open_loop.get("endpoints", {})
+            if tuple(endpoint.split(" ", 1)) not in ENDPOINT_IDS
+        ]
+        if unknown:
+            raise ValueError(f"Неизвестные эндпоинты открытой модели: {', '.join(unknown)}")
+        self.stages = config.get("stages", [])
+        self.capacity = config.get("capacity") or {}
+        self.contention = config.get("contention") or {}
+        self.graph = config.get("graph") or {}
+        if self.graph:
+            self._check_graph(self.graph)
+        if self.stages and self.capacity:
+            raise ValueError("В профиле нагрузки заданы и stages, и capacity: нужна одна форма нагрузки")
+        if self.capacity.get("mode", "step") not in ("step", "binary"):
+            raise ValueError(f"Неизвестный режим поиска предельной нагрузки: {self.capacity['mode']}")
+        self.tasks = None
+
+    @staticmethod
+    def _check_graph(graph):
+        users = graph.get("users", 1000)
+        min_degree, max_degree = graph.get("min_degree", 1), graph.get("max_degree", 100)
+        if graph.get("exponent", 2.5) <= 1:
+            raise ValueError("graph.exponent должен быть больше 1")
+        if not 1 <= min_degree <= max_degree < users:
+            raise ValueError("graph: нужно 1 <= min_degree <= max_degree < users")
+        if graph.get("celebrities", 0) and graph.get("celebrity_degree", 10000) >= users:
+            raise ValueError("graph.celebrity_degree должно быть меньше graph.users")
+        labels = SocialGraph.bucket_labels(graph.get("buckets", [10, 100, 1000]))
+        unknown = set(graph.get("bucket_weights", {})) - set(labels)
+        if unknown:
+            raise ValueError(f"Неизвестные корзины графа: {', '.join(sorted(unknown))} (есть: {', '.join(labels)})")
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(load_config_file(path))
+
+    def compile(self, taskset):
+        """Таблица выбора задач набора по весам профиля"""
+        defaults = Counter(task.__name__ for task in taskset.tasks)
+        if self.graph:
+            defaults["graph_interactions"] = self.graph.get("weight", 2)
+        weights = self.config.get("tasks") or defaults
+        unknown = set(weights) - set(defaults)
+        if unknown:
+            raise ValueError(f"Неизвестные задачи в профиле нагрузки: {', '.join(sorted(unknown))}")
+        names = [name for name, weight in weights.items() if weight > 0]
+        self.tasks = AliasTable([getattr(taskset, name) for name in names], [weights[name] for name in names])
+
+workload = Workload.from_file(WORKLOAD_FILE) if WORKLOAD_FILE else Workload()
+
+class WorkloadShape(LoadTestShape):
+    """Этапы нагрузки из профиля: ramp, hold, spike и diurnal.
+
+    ramp линейно меняет число пользователей от предыдущего этапа до users,
+    hold держит его, spike сразу выставляет users с большой скоростью
+    запуска, diurnal повторяет суточный профиль за period секунд: синусоиду
+    между min_users и max_users либо кусочно-линейную кривую profile
+    (доли от max_users по равным интервалам, например 24 часовых значения).
+    Класс активен, только если в профиле заданы stages.
+    """
+
+    abstract = not workload.stages
+
+    def __init__(self):
+        super().__init__()
+        self.stages = workload.stages
+
+    def tick(self):
+        elapsed = self.get_run_time()
+        users = 0
+        for stage in self.stages:
+            duration = stage["duration"]
+            if elapsed < duration:
+                return self._stage_target(stage, elapsed, users)
+            elapsed -= duration
+            users, _ = self._stage_target(stage, duration, users)
+        return None
+
+    @staticmethod
+    def _stage_target(stage, elapsed, previous):
+        kind = stage["type"]
+        duration = stage["duration"]
+        if kind == "ramp":
+            users = stage["users"]
+            target = previous + (users - previous) * elapsed / duration
+            return round(target), stage.get("spawn_rate", max(abs(users - previous) / duration, 1))
+        if kind == "hold":
+            return stage.get("users", previous), stage.get("spawn_rate", max(previous, 1))
+        if kind == "spike":
+            return stage["users"], stage.get("spawn_rate", max(stage["users"], 1))
+        if kind == "diurnal":
+            period = stage.get("period", duration)
+            phase = (elapsed % period) / period
+            high, low = stage["max_users"], stage.get("min_users", 0)
+            profile = stage.get("profile")
+            if profile:
+                position = phase * len(profile)
+                index = int(position)
+                start, end = profile[index], profile[(index + 1) % len(profile)]
+                level = start + (end - start) * (position - index)
+                target = high * level
+            else:
+                target = low + (high - low) * (1 - math.cos(2 * math.pi * phase)) / 2
+            return round(target), stage.get("spawn_rate", max(high / 10, 1))
+        raise ValueError(f"Неизвестный тип этапа нагрузки: {kind}")
+
+class CapacityShape(LoadTestShape):
+    """Поиск предельной устойчивой нагрузки по секции capacity профиля.
+
+    Число пользователей меняется ступенями: после выхода на ступень
+    выжидается warmup секунд, затем за hold секунд измеряются частота
+    запросов, перцентили и доля ошибок по эндпоинтам и проверяются пороги
+    limits (правила в формате SloRule). Ступень устойчива, если пороги
+    выполнены и прирост частоты запросов составил не меньше min_efficiency
+    от пропорционального приросту пользователей (иначе сервер насыщен -
+    колено кривой).
+
+    mode: step - от start_users с шагом step_users до первой неустойчивой
+    ступени или max_users; binary - удвоение от start_users до первой
+    неустойчивой ступени, затем двоичный поиск, пока граница не уточнится
+    до precision пользователей. Итог - максимальная устойчивая частота
+    запросов при текущем составе задач и кривая задержка-нагрузка в журнале
+    и в CSV-файле output (по строке на ступень и эндпоинт). Длительность
+    определяет сам поиск, -t locust для формы нагрузки не действует.
+    """
+
+    abstract = not workload.capacity
+
+    def __init__(self):
+        super().__init__()
+        config = workload.capacity
+        self.mode = config.get("mode", "step")
+        self.start_users = config.get("start_users", 10)
+        self.step_users = config.get("step_users", self.start_users)
+        self.max_users = config.get("max_users", 1000)
+        self.spawn_rate = config.get("spawn_rate", max(self.step_users, 1))
+        self.warmup = config.get("warmup", 10)
+        self.hold = config.get("hold", 30)
+        self.min_efficiency = config.get("min_efficiency", 0.5)
+        self.precision = config.get("precision", max(self.start_users // 10, 1))
+        self.output = config.get("output")
+        self.rules = [SloRule(rule) for rule in config.get("limits", [{"name": "Aggregated", "p95": 1000, "error_rate": 0.01}])]
+        self.steps = []
+        self.finished = False
+        self._users = self.start_users
+        self._step_started = None
+        self._reached = None
+        self._measure_started = None
+        self._windows = None
+        self._before = None
+        self._bounds = None
+
+    def tick(self):
+        if self.finished:
+            return None
+        now = self.get_run_time()
+        if self._step_started is None:
+            self._step_started = now
+            logger.info("Поиск предельной нагрузки: ступень %s пользователей", self._users)
+        # Прогрев отсчитывается после выхода на ступень (или истечения времени запуска)
+        if self._windows is None:
+            if self._reached is None:
+                spawn_time = abs(self._users - self.get_current_user_count()) / self.spawn_rate
+                if self.get_current_user_count() == self._users or now - self._step_started > spawn_time + self.warmup:
+                    self._reached = now
+            elif now - self._reached >= self.warmup:
+                self._start_measurement(now)
+        elif now - self._measure_started >= self.hold:
+            self._finish_step(now)
+            if self.finished:
+                self.report()
+                return None
+        return self._users, self.spawn_rate
+
+    def _start_measurement(self, now):
+        stats = self.runner.environment.stats
+        self._measure_started = now
+        self._windows = [SloWindow(rule, self.hold) for rule in self.rules]
+        for window in self._windows:
+            window.sample(stats, now)
+        self._before = self._snapshot(stats)
+
+    @staticmethod
+    def _snapshot(stats):
+        return {
+            f"{entry.method} {entry.name}".strip(): (entry.num_requests, entry.num_failures, dict(entry.response_times))
+            for entry in (*stats.entries.values(), stats.total)
+        }
+
+    def _finish_step(self, now):
+        stats = self.runner.environment.stats
+        duration = now - self._measure_started
+        violations = []
+        for window in self._windows:
+            window.sample(stats, now)
+            violations.extend(window.check())
+        endpoints = {}
+        for name, (num_requests, failures, times) in self._snapshot(stats).items():
+            old_requests, old_failures, old_times = self._before.get(name, (0, 0, {}))
+            count = num_requests - old_requests
+            if count <= 0:
+                continue
+            interval = {bucket: value - old_times.get(bucket, 0) for bucket, value in times.items() if value > old_times.get(bucket, 0)}
+            endpoints[name] = {
+                "rps": count / duration,
+                "error_rate": (failures - old_failures) / count,
+                **{f"p{q:g}": calculate_response_time_percentile(interval, count, q / 100) for q in (50, 95, 99)}
+            }
+        rps = endpoints.get("Aggregated", {}).get("rps", 0)
+        sustainable = [step for step in self.steps if step["sustainable"] and step["users"] < self._users]
+        efficiency = None
+        if sustainable:
+            previous = max(sustainable, key=lambda step: step["users"])
+            expected = previous["rps"] * (self._users / previous["users"] - 1)
+            efficiency = (rps - previous["rps"]) / expected if expected > 0 else None
+        saturated = efficiency is not None and efficiency < self.min_efficiency
+        step = {
+            "users": self._users, "rps": rps, "endpoints": endpoints, "violations": violations,
+            "efficiency": efficiency, "sustainable": not violations and not saturated
+        }
+        self.steps.append(step)
+        logger.info(
+            "Ступень %s пользователей: %.1f запросов/с, p95 %s мс, ошибок %.2f%%%s%s",
+            self._users, rps, endpoints.get("Aggregated", {}).get("p95", "-"),
+            100 * endpoints.get("Aggregated", {}).get("error_rate", 0),
+            f", эффективность прироста {efficiency:.2f}" if efficiency is not None else "",
+            "" if step["sustainable"] else " - НЕУСТОЙЧИВО: " + ("; ".join(violations) or "насыщение")
+        )
+        self._next_users(step["sustainable"])
+        self._step_started = None
+        self._reached = None
+        self._windows = None
+
+    def _next_users(self, sustainable):
+        users = self._users
+        if self.mode == "step":
+            if not sustainable or users >= self.max_users:
+                self.finished = True
+            self._users = min(users + self.step_users, self.max_users)
+            return
+        if self._bounds is None:
+            if sustainable and users < self.max_users:
+                self._users = min(users * 2, self.max_users)
+                return
+            if sustainable:
+                self.finished = True
+                return
+            # Первая неустойчивая ступень: граница между последней устойчивой и ней
+            lower = max((step["users"] for step in self.steps if step["sustainable"]), default=0)
+            self._bounds = [lower, users]
+        elif sustainable:
+            self._bounds[0] = users
+        else:
+            self._bounds[1] = users
+        lower, upper = self._bounds
+        if upper - lower <= self.precision:
+            self.finished = True
+            return
+        self._users = (lower + upper) // 2
+
+    def report(self):
+        """Итог поиска в журнал и кривая задержка-нагрузка в CSV"""
+        self.finished = True
+        if not self.steps:
+            logger.warning("Поиск предельной нагрузки не завершил ни одной ступени")
+            return
+        best = max((step for step in self.steps if step["sustainable"]), key=lambda step: step["rps"], default=None)
+        curve = "\n  ".join(
+            f"{step['users']:>6} польз. {step['rps']:>9.1f} запр/с  "
+            f"p50 {step['endpoints'].get('Aggregated', {}).get('p50', '-')} "
+            f"p95 {step['endpoints'].get('Aggregated', {}).get('p95', '-')} "
+            f"p99 {step['endpoints'].get('Aggregated', {}).get('p99', '-')} мс"
+            f"{'' if step['sustainable'] else '  неустойчиво'}"
+            for step in sorted(self.steps, key=lambda step: step["users"])
+        )
+        logger.info("Кривая задержка-нагрузка:\n  %s", curve)
+        if best is None:
+            logger.error("Ни одна ступень не выдержала пороги, предел ниже %s пользователей", self.start_users)
+        else:
+            mix = "\n  ".join(
+                f"{name}: {values['rps']:.1f} запр/с" for name, values in sorted(best["endpoints"].items()) if name != "Aggregated"
+            )
+            limit = "" if any(not step["sustainable"] for step in self.steps) else " (предел не достигнут)"
+            logger.info(
+                "Максимальная устойчивая нагрузка%s: %.1f запросов/с при %s пользователях, по эндпоинтам:\n  %s",
+                limit, best["rps"], best["users"], mix
+            )
+        if self.output:
+            with open(self.output, "w", newline="", encoding="utf-8") as output:
+                writer = csv.writer(output)
+                writer.writerow(["users", "endpoint", "rps", "p50", "p95", "p99", "error_rate", "sustainable", "violations"])
+                for step in self.steps:
+                    for name, values in sorted(step["endpoints"].items()):
+                        writer.writerow([
+                            step["users"], name, f"{values['rps']:.3f}", values["p50"], values["p95"], values["p99"],
+                            f"{values['error_rate']:.5f}", int(step["sustainable"]), "; ".join(step["violations"])
+                        ])
+            logger.info("Кривая задержка-нагрузка записана в %s", self.output)
+
+def setup_replay(environment, index=0, count=1):
+    """Расписание воспроизведения access-лога для своей доли строк"""
+    if not REPLAY_LOG:
+        return
+    replay_state["log"] = AccessLogReplay(REPLAY_LOG, REPLAY_SPEEDUP, index, count)
+    logger.info("Воспроизведение %s: ускорение %s, доля %s из %s", REPLAY_LOG, REPLAY_SPEEDUP, index + 1, count)
+
+def _share_replay(environment):
+    """Мастер: доли лога по числу воркеров на старте теста.
+
+    Сообщение уходит из test_start, то есть раньше заданий на запуск
+    пользователей, поэтому воркер получает долю до первого запроса.
+    """
+    runner = environment.runner
+    workers = sorted(runner.clients.ready + runner.clients.running + runner.clients.spawning, key=lambda node: node.id)
+    for index, node in enumerate(workers):
+        runner.send_message("replay_share", {"index": index, "count": len(workers)}, client_id=node.id)
+    logger.info("Лог %s разделен между воркерами: %s", REPLAY_LOG, len(workers))
+
+def _await_replay(environment):
+    """Воркер: расписание строится по доле, присланной мастером"""
+    def on_replay_share(environment, msg, **kwargs):
+        setup_replay(environment, msg.data["index"], msg.data["count"])
+
+    environment.runner.register_message("replay_share", on_replay_share)
+
+@events.init.add_listener
+def on_locust_init(environment, **kwargs):
+    """Централизованная загрузка начальных данных"""
+    host = environment.host or API_HOST
+    configure_logging(environment.parsed_options)
+    logger.info("### Начало нагрузочного тестирования ###")
+    logger.info("Целевой сервер: %s", host)
+    if WORKLOAD_FILE:
+        logger.info("Профиль нагрузки: %s, этапов: %s", WORKLOAD_FILE, len(workload.stages))
+
+    slo_config = getattr(environment.parsed_options, "slo_config", None)
+    if slo_config and not isinstance(environment.runner, WorkerRunner):
+        slo_state["engine"] = SloEngine.from_file(slo_config)
+        logger.info("Загружено правил SLO: %s", len(slo_state["engine"].rules))
+
+    if getattr(environment.parsed_options, "hdr_log", None) and HdrHistogram is None:
+        raise RuntimeError("Для --hdr-log нужен пакет hdrh")
+    start_metrics(environment)
+
+    if isinstance(environment.runner, WorkerRunner):
+        _attach_pools(environment, host)
+        setup_payloads(environment)
+        if REPLAY_LOG:
+            _await_replay(environment)
+        return
+
+    seed_pools(host)
+    if isinstance(environment.runner, MasterRunner):
+        # Пулы публикуются до создания графа, чтобы не потерять запросы воркеров
+        _share_pools(environment)
+        setup_graph(host)
+    else:
+        setup_graph(host)
+        setup_payloads(environment)
+        setup_replay(environment)
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    engine = slo_state["engine"]
+    if engine:
+        violations = engine.evaluate(environment.stats)
+        if violations:
+            logger.error("SLO не выполнены (%s):\n  %s", len(violations), "\n  ".join(violations))
+            environment.process_exit_code = 1
+        else:
+            logger.info("Все SLO выполнены")
+    # Итоги после последних отчетов воркеров
+    finish_latency_recording()
+    finish_metrics(environment)
+    if not isinstance(environment.runner, WorkerRunner):
+        finish_graph(environment.host or API_HOST)
+        if business_counters["reviews_created"]:
+            logger.info("Создано отзывов: %s", business_counters["reviews_created"])
+        open_loop = sorted((key, count) for key, count in business_counters.items() if key.startswith("open_loop_"))
+        if open_loop:
+            logger.warning(
+                "Открытая модель: запросы, отброшенные или задержанные генератором:\n  %s",
+                "\n  ".join(f"{key}: {count}" for key, count in open_loop)
+            )
+    for pool in global_data.values():
+        pool.close()
+    if log_state["listener"]:
+        log_state["listener"].stop()
 
 @events.test_start.add_listener
 def on_test_start(environment, **kwargs):
     logger.info("### Тест начался ###")
+    if REPLAY_LOG and isinstance(environment.runner, MasterRunner):
+        _share_replay(environment)
+    start_latency_recording(environment)
+    start_contention(environment)
+    if metrics_state["exporter"]:
+        metrics_state["exporter"].start()
+    if slo_state["engine"]:
+        slo_state["engine"].start(environment)
 
 @events.test_stop.add_listener
 def on_test_stop(environment, **kwargs):
     logger.info("### Тест завершен ###")
-    if hasattr(environment, "reviews_created"):
-        logger.info(f"Создано отзывов: {environment.reviews_created}")
+    if slo_state["engine"]:
+        slo_state["engine"].stop()
+    shape = environment.shape_class
+    if isinstance(shape, CapacityShape) and not shape.finished:
+        # Прогон остановлен раньше (-t или вручную): итог по завершенным ступеням
+        shape.report()
+    finish_contention(environment)
+    for name, pool in global_data.items():
+        stats = pool.stats()
+        if stats["hits"] or stats["misses"] or stats["evicted"]:
+            logger.info("Пул %s: %s", name, stats)
+    replay = replay_state["log"]
+    if replay:
+        logger.info(
+            "Воспроизведено запросов: %s, опоздало более чем на %s с: %s (макс. %.2f с)",
+            replay.sent, REPLAY_LATE_THRESHOLD, replay.late, replay.max_lag
+        )
+        if replay.skipped:
+            logger.info("Пропущены строки лога без соответствия в UserBehavior: %s", dict(replay.skipped.most_common(10)))
+    rate_limit = log_state["rate_limit"]
+    if rate_limit and rate_limit.suppressed:
+        logger.warning(
+            "Подавлено повторяющихся сообщений: %s\n  %s",
+            sum(rate_limit.suppressed.values()), "\n  ".join(rate_limit.summary())
+        )
+
+class LatencyRecorder:
+    """HDR-гистограммы задержек (мкс) по шаблонам эндпоинтов.
+
+    Процесс копит гистограммы текущего интервала. Воркер с каждым отчетом
+    мастеру отправляет их в сжатом виде и обнуляет, мастер объединяет
+    полученное в свои интервальные гистограммы. Мастер (или единственный
+    процесс) каждые interval секунд дописывает интервал в журнал формата
+    HdrHistogram log 1.3 с тегом эндпоинта и добавляет его в итог за прогон.
+    """
+
+    def __init__(self, max_latency_ms, digits):
+        if HdrHistogram is None:
+            raise RuntimeError("Для HDR-гистограмм нужен пакет hdrh")
+        self.highest = int(max_latency_ms * 1000)
+        self.digits = digits
+        self.interval = {}
+        self.total = {}
+        self.log_file = None
+        self.started = None
+        self.interval_started = None
+
+    def _histogram(self):
+        return HdrHistogram(1, self.highest, self.digits)
+
+    def record(self, key, response_time):
+        histogram = self.interval.get(key)
+        if histogram is None:
+            histogram = self.interval[key] = self._histogram()
+        histogram.record_value(min(max(int(response_time * 1000), 1), self.highest))
+
+    def take_encoded(self):
+        """Сжатые гистограммы интервала для отчета мастеру, интервал обнуляется"""
+        encoded = {}
+        for key, histogram in self.interval.items():
+            if histogram.get_total_count():
+                encoded[key] = histogram.encode()
+                histogram.reset()
+        return encoded
+
+    def merge_encoded(self, encoded):
+        for key, payload in encoded.items():
+            histogram = self.interval.get(key)
+            if histogram is None:
+                histogram = self.interval[key] = self._histogram()
+            histogram.add(HdrHistogram.decode(payload))
+
+    def open_log(self, path):
+        self.started = self.interval_started = time.time()
+        self.log_file = open(path, "w", encoding="utf-8")
+        self.log_file.write(
+            "#[Histogram log format version 1.3]\n"
+            f"#[StartTime: {self.started:.3f} (seconds since epoch), {datetime.fromtimestamp(self.started).isoformat()}]\n"
+            '"StartTimestamp","Interval_Length","Interval_Max","Interval_Compressed_Histogram"\n'
+        )
+
+    def flush_interval(self):
+        """Запись интервала в журнал и перенос его в итоговые гистограммы"""
+        now = time.time()
+        for key, histogram in self.interval.items():
+            if not histogram.get_total_count():
+                continue
+            if self.log_file:
+                # В теге журнала не допускаются запятые и пробелы
+                tag = re.sub(r"[,\s]", "_", key)
+                self.log_file.write(
+                    f"Tag={tag},{self.interval_started - self.started:.3f},{now - self.interval_started:.3f},"
+                    f"{histogram.get_max_value() / 1e6:.6f},{histogram.encode().decode()}\n"
+                )
+            total = self.total.get(key)
+            if total is None:
+                total = self.total[key] = self._histogram()
+            total.add(histogram)
+            histogram.reset()
+        if self.log_file:
+            self.log_file.flush()
+        self.interval_started = now
+
+    def close(self):
+        self.flush_interval()
+        if self.log_file:
+            self.log_file.close()
+            self.log_file = None
+
+    def summary(self):
+        lines = []
+        for key in sorted(self.total):
+            histogram = self.total[key]
+            values = ", ".join(
+                f"p{percentile}={histogram.get_value_at_percentile(percentile) / 1000:.2f}"
+                for percentile in (50, 99, 99.9, 99.99)
+            )
+            lines.append(f"{key}: n={histogram.get_total_count()}, {values}, max={histogram.get_max_value() / 1000:.2f} мс")
+        return lines
 
-@events.request_success.add_listener
-def my_success_handler(request_type, name, response_time, response_length, environment, **kwargs):
-    """Кастомная метрика для подсчета созданных отзывов"""
-    if name == "/reviews" and request_type == "POST":
-        environment.reviews_created = getattr(environment, "reviews_created", 0) + 1
+# Успешные запросы, которые считаются бизнес-событиями
+BUSINESS_EVENTS = {
+    ("POST", "/reviews"): "reviews_created",
+    ("PUT", "/dishes/[id]/like/[id]"): "dish_likes",
+    ("PUT", "/reviews/[id]/like/[id]"): "review_likes",
+    ("PUT", "/users/[id]/friends/[id]"): "friendships_added",
+}
+
+# Код ответа в тексте ошибки запроса ("HTTP 404"), иначе ошибка без ответа
+ERROR_STATUS = re.compile(r"HTTP (\d{3})")
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+class MetricsExporter:
+    """Интервальные метрики прогона: страница OpenMetrics и колоночный файл.
+
+    Раз в interval секунд снимок статистики locust (уже агрегированной по
+    эндпоинтам, на мастере - по всем воркерам) сравнивается с предыдущим:
+    получаются частота запросов и перцентили за интервал, ошибки по кодам,
+    число пользователей и бизнес-счетчики. Страница для сбора метрик
+    формируется тут же, поэтому запрос к ней ничего не вычисляет, а на пути
+    обработки запросов нагрузки экспортер ничего не делает.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99, 0.999)
+
+    def __init__(self, environment, interval):
+        self.environment = environment
+        self.interval = interval
+        self.started = time.time()
+        self.previous = {}
+        self.page = b"# EOF\n"
+        self.series = {}
+        self.columns = {
+            "time": array("d"), "series": array("I"), "count": array("q"), "failures": array("q"),
+            "rate": array("d"), "p50": array("d"), "p95": array("d"), "p99": array("d"), "p999": array("d")
+        }
+        self._greenlet = None
+
+    def start(self):
+        self._greenlet = gevent.spawn(self._run)
+
+    def stop(self):
+        if self._greenlet:
+            self._greenlet.kill(block=False)
+            self._greenlet = None
+
+    def _run(self):
+        while True:
+            gevent.sleep(self.interval)
+            self.sample()
+
+    def _row(self, now, name, count, failures=0, rate=math.nan, quantiles=(math.nan,) * 4):
+        series = self.series.setdefault(name, len(self.series))
+        columns = self.columns
+        columns["time"].append(now - self.started)
+        columns["series"].append(series)
+        columns["count"].append(count)
+        columns["failures"].append(failures)
+        columns["rate"].append(rate)
+        for column, value in zip(("p50", "p95", "p99", "p999"), quantiles):
+            columns[column].append(value)
+
+    def sample(self):
+        now = time.time()
+        stats = self.environment.stats
+        lines = []
+        families = {
+            "requests": ("counter", []), "failures": ("counter", []), "request_rate": ("gauge", []),
+            "latency_ms": ("gauge", []), "errors": ("counter", []), "business_events": ("counter", [])
+        }
+        for entry in (*stats.entries.values(), stats.total):
+            method = entry.method or ""
+            key = (method, entry.name)
+            old_requests, old_times, old_time = self.previous.get(key, (0, {}, self.started))
+            num_requests = entry.num_requests - old_requests
+            response_times = {
+                bucket: count - old_times.get(bucket, 0)
+                for bucket, count in entry.response_times.items()
+                if count > old_times.get(bucket, 0)
+            }
+            quantiles = tuple(
+                calculate_response_time_percentile(response_times, num_requests, quantile) if num_requests else math.nan
+                for quantile in self.QUANTILES
+            )
+            rate = num_requests / max(now - old_time, 1e-9)
+            self.previous[key] = (entry.num_requests, dict(entry.response_times), now)
+            self._row(now, f"{method} {entry.name}".strip(), entry.num_requests, entry.num_failures, rate, quantiles)
+
+            labels = f'method="{_label(method)}",name="{_label(entry.name)}"'
+            families["requests"][1].append(f"restarate_requests_total{{{labels}}} {entry.num_requests}")
+            families["failures"][1].append(f"restarate_failures_total{{{labels}}} {entry.num_failures}")
+            families["request_rate"][1].append(f"restarate_request_rate{{{labels}}} {rate:.3f}")
+            for quantile, value in zip(self.QUANTILES, quantiles):
+                if num_requests:
+                    families["latency_ms"][1].append(f'restarate_latency_ms{{{labels},quantile="{quantile}"}} {value}')
+
+        codes = Counter()
+        for error in stats.errors.values():
+            match = ERROR_STATUS.search(str(error.error))
+            codes[(error.method, error.name, match[1] if match else "error")] += error.occurrences
+        for (method, name, code), count in sorted(codes.items()):
+            self._row(now, f"{method} {name} code={code}", count)
+            families["errors"][1].append(
+                f'restarate_errors_total{{method="{_label(method)}",name="{_label(name)}",code="{code}"}} {count}'
+            )
+
+        for counter, count in sorted(business_counters.items()):
+            self._row(now, f"business:{counter}", count)
+            families["business_events"][1].append(f'restarate_business_events_total{{counter="{_label(counter)}"}} {count}')
+
+        users = self.environment.runner.user_count if self.environment.runner else 0
+        self._row(now, "users", users)
+        for family, (kind, samples) in families.items():
+            lines.append(f"# TYPE restarate_{family} {kind}")
+            lines.extend(samples)
+        lines.append("# TYPE restarate_active_users gauge")
+        lines.append(f"restarate_active_users {users}")
+        lines.append("# EOF")
+        self.page = ("\n".join(lines) + "\n").encode()
+
+    def wsgi(self, environ, start_response):
+        start_response("200 OK", [("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")])
+        return [self.page]
+
+    def write(self, path):
+        metadata = {"started": self.started, "interval": self.interval, "host": self.environment.host}
+        series = sorted(self.series, key=self.series.get)
+        metrics_file.write_columns(path, metadata, series, self.columns)
+
+metrics_state = {"exporter": None, "server": None}
+
+def start_metrics(environment):
+    """Экспортер метрик на мастере или в локальном режиме (--metrics-port, --metrics-file)"""
+    options = environment.parsed_options
+    port = getattr(options, "metrics_port", 0)
+    path = getattr(options, "metrics_file", None)
+    if not (port or path) or isinstance(environment.runner, WorkerRunner):
+        return
+    exporter = MetricsExporter(environment, options.metrics_interval)
+    metrics_state["exporter"] = exporter
+    if port:
+        server = WSGIServer(("0.0.0.0", port), exporter.wsgi, log=None)
+        server.start()
+        metrics_state["server"] = server
+        logger.info("Метрики OpenMetrics: http://0.0.0.0:%s/metrics", port)
+
+def finish_metrics(environment):
+    exporter = metrics_state["exporter"]
+    if exporter is None:
+        return
+    exporter.stop()
+    exporter.sample()
+    path = getattr(environment.parsed_options, "metrics_file", None)
+    if path:
+        exporter.write(path)
+        logger.info("Временные ряды метрик записаны в %s", path)
+    if metrics_state["server"]:
+        metrics_state["server"].stop(timeout=1)
+
+latency_state = {"recorder": None, "writer": None}
+
+def start_latency_recording(environment):
+    """Включение HDR-гистограмм по опции --hdr-log (на воркерах она приходит от мастера)"""
+    options = environment.parsed_options
+    path = getattr(options, "hdr_log", None)
+    if not path or latency_state["recorder"]:
+        return
+    recorder = LatencyRecorder(options.hdr_max_latency, options.hdr_digits)
+    latency_state["recorder"] = recorder
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    recorder.open_log(path)
+
+    def write_intervals():
+        while True:
+            gevent.sleep(options.hdr_interval)
+            recorder.flush_interval()
+
+    latency_state["writer"] = gevent.spawn(write_intervals)
+    logger.info("HDR-гистограммы задержек пишутся в %s каждые %s с", path, options.hdr_interval)
+
+def finish_latency_recording():
+    recorder = latency_state["recorder"]
+    if recorder is None or recorder.log_file is None:
+        return
+    if latency_state["writer"]:
+        latency_state["writer"].kill(block=False)
+    recorder.close()
+    logger.info("Задержки по HDR-гистограммам (мс):\n  %s", "\n  ".join(recorder.summary()))
+
+@events.request.add_listener
+def on_request(request_type, name, response_time, response_length, exception=None, **kwargs):
+    """Бизнес-счетчики и HDR-гистограммы задержек по эндпоинтам"""
+    if exception is None:
+        counter = BUSINESS_EVENTS.get((request_type, name))
+        if counter:
+            business_counters[counter] += 1
+    recorder = latency_state["recorder"]
+    if recorder is not None:
+        recorder.record(f"{request_type} {name}", response_time)
+
+@events.report_to_master.add_listener
+def on_report_to_master(client_id, data):
+    """Воркер: бизнес-счетчики и гистограммы интервала уходят мастеру"""
+    data["business_counters"] = dict(business_counters)
+    business_counters.clear()
+    recorder = latency_state["recorder"]
+    if recorder is not None:
+        data["hdr"] = recorder.take_encoded()
+
+@events.worker_report.add_listener
+def on_worker_report(client_id, data):
+    business_counters.update(data.get("business_counters", {}))
+    recorder = latency_state["recorder"]
+    if recorder is not None and data.get("hdr"):
+        recorder.merge_encoded(data["hdr"])
+
+# Числовые сегменты пути, заменяемые в имени запроса на [id]
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def route_template(path):
+    """Шаблон маршрута для статистики: /reviews/5/like/7 -> /reviews/[id]/like/[id]"""
+    return ID_SEGMENT.sub("/[id]", path)
 
 class UserBehavior(TaskSet):
     def __init__(self, parent):
@@ -70,45 +2015,71 @@ class UserBehavior(TaskSet):
         self.user_id = None
         logger.info("Инициализация виртуального пользователя")
 
+    @contextmanager
+    def request(self, method, path, name=None, params=None, **kwargs):
+        """Запрос с catch_response, одинаковый для requests и fasthttp.
+
+        В статистику запрос попадает под шаблоном маршрута без параметров
+        (route_template), а ошибки - под кодом ответа или классом
+        исключения, а не под текстом с конкретным URL, поэтому число строк
+        статистики не зависит от количества затронутых ID. Параметры
+        запроса кодируются в URL (FastHttpSession не принимает params=),
+        таймаут для fasthttp задается на уровне пользователя.
+        """
+        if name is None:
+            name = route_template(path)
+        if params:
+            path = f"{path}?{urlencode(params)}"
+        if API_CLIENT == "requests":
+            kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+        with self.client.request(method, path, name=name, catch_response=True, **kwargs) as response:
+            yield response
+            if getattr(response, "_manual_result", None) is None:
+                error = getattr(response, "error", None)
+                if not response.status_code and error is not None:
+                    response.failure(type(error).__name__)
+                elif response.status_code >= 400:
+                    response.failure(f"HTTP {response.status_code}")
+
+    def get_next_task(self):
+        """Следующая задача по весам профиля нагрузки"""
+        return workload.tasks.sample()
+
     def on_start(self):
         """Регистрация нового пользователя"""
         try:
             logger.info("Начало регистрации пользователя")
-            self.user_data = {
-                "email": fake.email(),
-                "login": fake.user_name(),
-                "name": fake.name(),
-                "birthday": fake.date_of_birth().isoformat()
-            }
+            self.user_data = payloads.user()
             
             for attempt in range(2):  # Две попытки регистрации
-                with self.client.post("/users", json=self.user_data, catch_response=True, timeout=5) as response:
-                    if response.status_code in [200, 201] and response.json() and "id" in response.json():
-                        self.user_id = response.json()["id"]
-                        logger.info(f"Успешная регистрация пользователя ID: {self.user_id}")
+                with self.request("POST", "/users", json=self.user_data) as response:
+                    body = response_json(response) if response.status_code in [200, 201] else None
+                    if body and "id" in body:
+                        self.user_id = body["id"]
+                        logger.info("Успешная регистрация пользователя ID: %s", self.user_id)
                         break
                     else:
-                        logger.warning(f"Ошибка регистрации: {response.status_code}, попытка {attempt + 1}")
+                        logger.warning("Ошибка регистрации: %s, попытка %s", response.status_code, attempt + 1)
                 if attempt == 1:
                     logger.error("Не удалось зарегистрировать пользователя")
                     self.interrupt()
                     
         except Exception as e:
-            logger.error(f"Критическая ошибка в on_start: {str(e)}")
+            logger.error("Критическая ошибка в on_start: %s", e)
             self.interrupt()
 
     def on_stop(self):
         """Очистка данных пользователя"""
         if self.user_id:
             try:
-                logger.info(f"Удаление пользователя ID: {self.user_id}")
-                with self.client.delete(f"/users/{self.user_id}", catch_response=True, timeout=5) as response:
+                logger.info("Удаление пользователя ID: %s", self.user_id)
+                with self.request("DELETE", f"/users/{self.user_id}") as response:
                     if response.status_code in [200, 204]:
-                        logger.info(f"Пользователь ID: {self.user_id} удален")
+                        logger.info("Пользователь ID: %s удален", self.user_id)
                     else:
-                        logger.warning(f"Ошибка удаления пользователя: {response.status_code}")
+                        logger.warning("Ошибка удаления пользователя: %s", response.status_code)
             except Exception as e:
-                logger.error(f"Ошибка при удалении пользователя: {str(e)}")
+                logger.error("Ошибка при удалении пользователя: %s", e)
 
     @task(4)
     def interact_with_dishes(self):
@@ -118,156 +2089,712 @@ class UserBehavior(TaskSet):
                 logger.warning("Список блюд пуст, пропуск задачи interact_with_dishes")
                 return
                 
-            dish_id = random.choice(self.dish_ids)
-            logger.debug(f"Просмотр блюда ID: {dish_id}")
+            dish_id = workload.keys.pick("GET /dishes/[id]", self.dish_ids)
+            logger.debug("Просмотр блюда ID: %s", dish_id)
             
             # Просмотр блюда
-            with self.client.get(f"/dishes/{dish_id}", catch_response=True, timeout=5) as response:
+            with self.request("GET", f"/dishes/{dish_id}") as response:
+                self.dish_ids.record(dish_id, response.status_code != 404)
                 if response.status_code == 200:
-                    logger.info(f"Успешный просмотр блюда ID: {dish_id}")
+                    logger.info("Успешный просмотр блюда ID: %s", dish_id)
                 else:
-                    logger.warning(f"Ошибка просмотра блюда: {response.status_code}")
+                    logger.warning("Ошибка просмотра блюда: %s", response.status_code)
             
             # Лайк/дизлайк
-            if random.random() < 0.3:
-                logger.info(f"Лайк блюда ID: {dish_id}")
-                with self.client.put(f"/dishes/{dish_id}/like/{self.user_id}", catch_response=True, timeout=5) as response:
+            if random.random() < workload.flows["dish_like"]:
+                dish_id = workload.keys.pick("PUT /dishes/[id]/like/[id]", self.dish_ids, dish_id)
+                logger.info("Лайк блюда ID: %s", dish_id)
+                with self.request("PUT", f"/dishes/{dish_id}/like/{self.user_id}") as response:
                     if response.status_code != 200:
-                        logger.warning(f"Ошибка лайка блюда: {response.status_code}")
+                        logger.warning("Ошибка лайка блюда: %s", response.status_code)
             
-            elif random.random() < 0.1:
-                logger.info(f"Удаление лайка блюда ID: {dish_id}")
-                with self.client.delete(f"/dishes/{dish_id}/like/{self.user_id}", catch_response=True, timeout=5) as response:
+            elif random.random() < workload.flows["dish_unlike"]:
+                dish_id = workload.keys.pick("DELETE /dishes/[id]/like/[id]", self.dish_ids, dish_id)
+                logger.info("Удаление лайка блюда ID: %s", dish_id)
+                with self.request("DELETE", f"/dishes/{dish_id}/like/{self.user_id}") as response:
                     if response.status_code != 200:
-                        logger.warning(f"Ошибка удаления лайка блюда: {response.status_code}")
+                        logger.warning("Ошибка удаления лайка блюда: %s", response.status_code)
                     
         except Exception as e:
-            logger.error(f"Ошибка в interact_with_dishes: {str(e)}")
+            logger.error("Ошибка в interact_with_dishes: %s", e)
 
     @task(3)
     def manage_reviews(self):
         """Работа с отзывами"""
         try:
             # Написание нового отзыва
-            if self.dish_ids and random.random() < 0.2:
+            if self.dish_ids and random.random() < workload.flows["review_create"]:
                 review_data = {
-                    "content": fake.text(max_nb_chars=150),
-                    "isPositive": random.choice([True, False]),
+                    **payloads.reviews.next(),
                     "userId": self.user_id,
-                    "dishId": random.choice(self.dish_ids)
+                    "dishId": workload.keys.pick("POST /reviews", self.dish_ids)
                 }
-                logger.info(f"Создание нового отзыва для блюда ID: {review_data['dishId']}")
+                logger.info("Создание нового отзыва для блюда ID: %s", review_data['dishId'])
                 
-                with self.client.post("/reviews", json=review_data, catch_response=True, timeout=5) as response:
-                    if response.status_code == 201 and "reviewId" in response.json():
-                        self.review_ids.append(response.json()["reviewId"])
-                        logger.info(f"Создан отзыв ID: {response.json()['reviewId']}")
+                with self.request("POST", "/reviews", json=review_data) as response:
+                    body = response_json(response) if response.status_code in [200, 201] else None
+                    if body and "reviewId" in body:
+                        self.review_ids.append(body["reviewId"])
+                        logger.info("Создан отзыв ID: %s", body["reviewId"])
                     else:
-                        logger.warning(f"Ошибка создания отзыва: {response.status_code}")
+                        logger.warning("Ошибка создания отзыва: %s", response.status_code)
 
             # Взаимодействие с существующими отзывами
             if self.review_ids:
-                review_id = random.choice(self.review_ids)
-                logger.debug(f"Взаимодействие с отзывом ID: {review_id}")
+                review_id = workload.keys.pick("GET /reviews/[id]", self.review_ids)
+                logger.debug("Взаимодействие с отзывом ID: %s", review_id)
                 
                 # Лайк/дизлайк
-                if random.random() < 0.25:
-                    logger.info(f"Лайк отзыва ID: {review_id}")
-                    with self.client.put(f"/reviews/{review_id}/like/{self.user_id}", catch_response=True, timeout=5) as response:
+                if random.random() < workload.flows["review_like"]:
+                    target_id = workload.keys.pick("PUT /reviews/[id]/like/[id]", self.review_ids, review_id)
+                    logger.info("Лайк отзыва ID: %s", target_id)
+                    with self.request("PUT", f"/reviews/{target_id}/like/{self.user_id}") as response:
                         if response.status_code != 200:
-                            logger.warning(f"Ошибка лайка отзыва: {response.status_code}")
+                            logger.warning("Ошибка лайка отзыва: %s", response.status_code)
                 
-                elif random.random() < 0.1:
-                    logger.info(f"Удаление лайка отзыва ID: {review_id}")
-                    with self.client.delete(f"/reviews/{review_id}/like/{self.user_id}", catch_response=True, timeout=5) as response:
+                elif random.random() < workload.flows["review_unlike"]:
+                    target_id = workload.keys.pick("DELETE /reviews/[id]/like/[id]", self.review_ids, review_id)
+                    logger.info("Удаление лайка отзыва ID: %s", target_id)
+                    with self.request("DELETE", f"/reviews/{target_id}/like/{self.user_id}") as response:
                         if response.status_code != 200:
-                            logger.warning(f"Ошибка удаления лайка отзыва: {response.status_code}")
+                            logger.warning("Ошибка удаления лайка отзыва: %s", response.status_code)
 
                 # Просмотр отзыва
-                with self.client.get(f"/reviews/{review_id}", catch_response=True, timeout=5) as response:
+                with self.request("GET", f"/reviews/{review_id}") as response:
+                    self.review_ids.record(review_id, response.status_code != 404)
                     if response.status_code != 200:
-                        logger.warning(f"Ошибка просмотра отзыва: {response.status_code}")
+                        logger.warning("Ошибка просмотра отзыва: %s", response.status_code)
 
         except Exception as e:
-            logger.error(f"Ошибка в manage_reviews: {str(e)}")
+            logger.error("Ошибка в manage_reviews: %s", e)
 
     @task(2)
     def social_interactions(self):
         """Социальные взаимодействия"""
         try:
             logger.debug("Поиск друзей...")
-            with self.client.get(
+            with self.request(
+                "GET",
                 "/users",
-                params={"query": fake.word(), "by": "login"},
-                catch_response=True,
-                timeout=5
+                params={"query": payloads.words.next(), "by": "login"}
             ) as search_response:
                 if search_response.status_code == 200:
-                    candidates = [u["id"] for u in search_response.json() if u["id"] != self.user_id]
+                    candidates = [user_id for user_id in extract_ids(search_response, "id") if user_id != self.user_id]
                     if candidates:
                         friend_id = random.choice(candidates)
                         
                         # Добавление друга
-                        if random.random() < 0.15 and friend_id not in self.friend_ids:
-                            logger.info(f"Добавление друга ID: {friend_id}")
-                            with self.client.put(f"/users/{self.user_id}/friends/{friend_id}", catch_response=True, timeout=5) as response:
+                        if random.random() < workload.flows["friend_add"] and friend_id not in self.friend_ids:
+                            logger.info("Добавление друга ID: %s", friend_id)
+                            with self.request("PUT", f"/users/{self.user_id}/friends/{friend_id}") as response:
                                 if response.status_code == 200:
                                     self.friend_ids.append(friend_id)
                                 else:
-                                    logger.warning(f"Ошибка добавления друга: {response.status_code}")
+                                    logger.warning("Ошибка добавления друга: %s", response.status_code)
                         
                         # Удаление друга
-                        elif random.random() < 0.05 and self.friend_ids:
+                        elif random.random() < workload.flows["friend_remove"] and self.friend_ids:
                             remove_id = random.choice(self.friend_ids)
-                            logger.info(f"Удаление друга ID: {remove_id}")
-                            with self.client.delete(f"/users/{self.user_id}/friends/{remove_id}", catch_response=True, timeout=5) as response:
+                            logger.info("Удаление друга ID: %s", remove_id)
+                            with self.request("DELETE", f"/users/{self.user_id}/friends/{remove_id}") as response:
                                 if response.status_code == 200:
                                     self.friend_ids.remove(remove_id)
                                 else:
-                                    logger.warning(f"Ошибка удаления друга: {response.status_code}")
+                                    logger.warning("Ошибка удаления друга: %s", response.status_code)
 
             # Просмотр своих друзей
             if self.friend_ids:
                 logger.debug("Просмотр списка друзей")
-                with self.client.get(f"/users/{self.user_id}/friends", catch_response=True, timeout=5) as response:
+                with self.request("GET", f"/users/{self.user_id}/friends") as response:
                     if response.status_code != 200:
-                        logger.warning(f"Ошибка просмотра друзей: {response.status_code}")
+                        logger.warning("Ошибка просмотра друзей: %s", response.status_code)
 
         except Exception as e:
-            logger.error(f"Ошибка в social_interactions: {str(e)}")
+            logger.error("Ошибка в social_interactions: %s", e)
 
     @task(1)
     def user_profile_operations(self):
         """Операции с профилем"""
         try:
             # Обновление профиля
-            if random.random() < 0.1:
+            if random.random() < workload.flows["profile_update"]:
                 logger.info("Обновление профиля")
-                update_data = {
-                    "id": self.user_id,
-                    "name": fake.name(),
-                    "email": fake.email()
-                }
-                with self.client.put("/users", json=update_data, catch_response=True, timeout=5) as response:
+                update_data = {"id": self.user_id, **payloads.profile()}
+                with self.request("PUT", "/users", json=update_data) as response:
                     if response.status_code != 200:
-                        logger.warning(f"Ошибка обновления профиля: {response.status_code}")
+                        logger.warning("Ошибка обновления профиля: %s", response.status_code)
             
             # Просмотр рекомендаций
             logger.debug("Получение рекомендаций")
-            with self.client.get(f"/users/{self.user_id}/recommendations", catch_response=True, timeout=5) as response:
+            with self.request("GET", f"/users/{self.user_id}/recommendations") as response:
                 if response.status_code != 200:
-                    logger.warning(f"Ошибка получения рекомендаций: {response.status_code}")
+                    logger.warning("Ошибка получения рекомендаций: %s", response.status_code)
             
             # Просмотр ленты событий
             logger.debug("Просмотр ленты событий")
-            with self.client.get(f"/users/{self.user_id}/feed", catch_response=True, timeout=5) as response:
+            with self.request("GET", f"/users/{self.user_id}/feed") as response:
                 if response.status_code != 200:
-                    logger.warning(f"Ошибка просмотра ленты: {response.status_code}")
+                    logger.warning("Ошибка просмотра ленты: %s", response.status_code)
 
         except Exception as e:
-            logger.error(f"Ошибка в user_profile_operations: {str(e)}")
+            logger.error("Ошибка в user_profile_operations: %s", e)
+
+    def graph_interactions(self):
+        """Лента, друзья, общие друзья и рекомендации пользователей графа по корзинам числа друзей.
+
+        Задача включается секцией graph профиля; имя запроса содержит
+        корзину, чтобы задержки были видны отдельно для каждой степени.
+        """
+        try:
+            graph = graph_state["graph"]
+            if graph is None:
+                return
+            bucket, node = graph.pick()
+            user_id = graph.user_ids[node]
+            with self.request("GET", f"/users/{user_id}/feed", name=f"/users/[id]/feed[deg:{bucket}]") as response:
+                if response.status_code != 200:
+                    logger.warning("Ошибка просмотра ленты: %s", response.status_code)
+
+            if random.random() < workload.flows["graph_friends"]:
+                with self.request("GET", f"/users/{user_id}/friends", name=f"/users/[id]/friends[deg:{bucket}]") as response:
+                    if response.status_code != 200:
+                        logger.warning("Ошибка просмотра друзей: %s", response.status_code)
+
+            if random.random() < workload.flows["graph_common"]:
+                _, other = graph.pick(bucket)
+                with self.request(
+                    "GET",
+                    f"/users/{user_id}/friends/common/{graph.user_ids[other]}",
+                    name=f"/users/[id]/friends/common/[id][deg:{bucket}]"
+                ) as response:
+                    if response.status_code != 200:
+                        logger.warning("Ошибка получения общих друзей: %s", response.status_code)
+
+            if random.random() < workload.flows["graph_recommendations"]:
+                with self.request("GET", f"/users/{user_id}/recommendations", name=f"/users/[id]/recommendations[deg:{bucket}]") as response:
+                    if response.status_code != 200:
+                        logger.warning("Ошибка получения рекомендаций: %s", response.status_code)
+
+        except Exception as e:
+            logger.error("Ошибка в graph_interactions: %s", e)
+
+# Строка access-лога в формате common/combined: время запроса, метод и цель
+ACCESS_LOG_LINE = re.compile(r'\[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+)[^"]*"')
+
+def read_access_log(path):
+    """Потоковое чтение access-лога (в том числе .gz): (время, метод, цель запроса)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    last_text, last_time = None, None
+    with opener(path, "rt", encoding="utf-8", errors="replace") as log_file:
+        for line in log_file:
+            match = ACCESS_LOG_LINE.search(line)
+            if match is None:
+                continue
+            # Соседние строки обычно приходятся на одну секунду, время разбирается один раз
+            if match["time"] != last_text:
+                last_text = match["time"]
+                last_time = datetime.strptime(last_text, "%d/%b/%Y:%H:%M:%S %z").timestamp()
+            yield last_time, match["method"], match["target"]
+
+class AccessLogReplay:
+    """Общее для виртуальных пользователей процесса расписание запросов из лога.
+
+    Процесс с номером index из count берет каждую count-ю строку, так что
+    воркеры вместе воспроизводят лог целиком. Интервалы между запросами
+    сохраняются, деленные на speedup; отсчет начинается с первой выданной
+    строки.
+    """
+
+    def __init__(self, path, speedup=1.0, index=0, count=1):
+        self.entries = self._schedule(path, speedup, index, count)
+        self.started = None
+        self.finished = False
+        self.sent = 0
+        self.skipped = Counter()
+        self.late = 0
+        self.max_lag = 0.0
+
+    @staticmethod
+    def _schedule(path, speedup, index, count):
+        first = None
+        for number, (timestamp, method, target) in enumerate(read_access_log(path)):
+            if first is None:
+                first = timestamp
+            if number % count == index:
+                yield (timestamp - first) / speedup, method, target
+
+    def next(self):
+        """Следующий запрос и момент отправки (time.monotonic) или None в конце лога"""
+        entry = next(self.entries, None)
+        if entry is None:
+            return None
+        if self.started is None:
+            self.started = time.monotonic()
+        offset, method, target = entry
+        return self.started + offset, method, target
+
+    def record_lag(self, lag):
+        if lag > REPLAY_LATE_THRESHOLD:
+            self.late += 1
+            self.max_lag = max(self.max_lag, lag)
+
+replay_state = {"log": None}
+ID_VALUE = re.compile(r"/(\d+)(?=/|$)")
+
+def remap_id(source_id, pool):
+    """Устойчивое отображение ID из лога на локальный пул: горячие ключи остаются горячими"""
+    return pool[(source_id * 2654435761) % 4294967296 % len(pool)]
+
+class ReplayBehavior(UserBehavior):
+    """Воспроизведение access-лога вместо случайного выбора задач.
+
+    Каждый виртуальный пользователь берет следующую строку общего
+    расписания, ждет момента ее отправки и выполняет тот же запрос, что и
+    задачи UserBehavior, подставив локальные ID. Число пользователей
+    ограничивает одновременность: если все заняты, запросы опаздывают, и
+    это видно в итоговой сводке.
+    """
+
+    def wait_time(self):
+        return 0
+
+    def get_next_task(self):
+        return ReplayBehavior.replay_next
+
+    def on_start(self):
+        super().on_start()
+        if self.user_id:
+            active_users.append(self.user_id)
+
+    def on_stop(self):
+        if self.user_id in active_users:
+            active_users.remove(self.user_id)
+        super().on_stop()
+
+    def replay_next(self):
+        replay = replay_state["log"]
+        entry = replay.next()
+        if entry is None:
+            if not replay.finished:
+                replay.finished = True
+                logger.info("Лог воспроизведен полностью, отправлено запросов: %s", replay.sent)
+                # Остановка убивает greenlet-ы пользователей, поэтому выполняется в отдельном
+                gevent.spawn(self.user.environment.runner.quit)
+            raise StopUser()
+        due, method, target = entry
+        delay = due - time.monotonic()
+        if delay > 0:
+            gevent.sleep(delay)
+        else:
+            replay.record_lag(-delay)
+        self.replay_request(replay, method, target)
+
+    def replay_request(self, replay, method, target):
+        path = target.split("?", 1)[0]
+        template = route_template(path)
+        kinds = ENDPOINT_IDS.get((method, template))
+        if kinds is None:
+            replay.skipped[f"{method} {template}"] += 1
+            return
+        pools = {"dish": self.dish_ids, "review": self.review_ids, "user": active_users}
+        local_path = template
+        for kind, source_id in zip(kinds, ID_VALUE.findall(path)):
+            if not pools[kind]:
+                replay.skipped[f"{method} {template}"] += 1
+                return
+            local_path = local_path.replace("[id]", str(remap_id(int(source_id), pools[kind])), 1)
+        kwargs = endpoint_payload(method, template, self.user_id)
+        if kwargs is None:
+            replay.skipped[f"{method} {template}"] += 1
+            return
+        replay.sent += 1
+
+        with self.request(method, local_path, **kwargs) as response:
+            body = response_json(response) if method == "POST" and response.status_code in (200, 201) else None
+            if body and "reviewId" in body:
+                self.review_ids.append(body["reviewId"])
+
+class ContentionRun:
+    """Сценарий конкурентных лайков на одном процессе генератора.
+
+    Первый запущенный ContentionUser создает свежие блюда и отзывы (dishes,
+    reviews секции contention профиля), после чего все пользователи процесса
+    ставят и снимают лайки блюд и лайки/дизлайки отзывов только по ним.
+    Каждый пользователь хранит подтвержденное сервером состояние своих
+    голосов; запрос без ответа или с ошибкой 5xx делает пару
+    пользователь-цель неопределенной и расширяет допустимый диапазон.
+    После остановки пользователей likes и useful сверяются с ожидаемыми и с
+    порядком /dishes/popular (потерянные обновления), а задержки сводятся
+    по уровням числа пользователей (level_step). Цели у каждого процесса
+    свои, поэтому конкуренцию наращивают числом пользователей, а не воркеров.
+    """
+
+    def __init__(self, config, host):
+        self.host = host
+        self.dish_count = config.get("dishes", 3)
+        self.review_count = config.get("reviews", 3)
+        self.review_share = config.get("review_share", 0.5)
+        self.dislike = config.get("dislike", 0.3)
+        self.level_step = config.get("level_step", 10)
+        self.popular_count = config.get("popular_count", 100)
+        self.settle = config.get("settle", 1.0)
+        self.cleanup = config.get("cleanup", True)
+        self.dish_ids = []
+        self.review_ids = []
+        self.created_dishes = []
+        self.owner_id = None
+        self.users = []
+        # (цель, пользователь) -> подтвержденное состояние, None - неизвестно
+        self.dish_votes = {}
+        self.review_votes = {}
+        self.operations = Counter()
+        self.conflicts = 0
+        self.levels = {}
+        self.prepared = False
+        self._lock = Semaphore()
+
+    def prepare(self):
+        """Создание целей один раз на процесс, остальные пользователи ждут"""
+        with self._lock:
+            if self.prepared:
+                return
+            session = requests.Session()
+            try:
+                response = session.post(f"{self.host}/users", json=payloads.user(), timeout=SEED_TIMEOUT)
+                response.raise_for_status()
+                self.owner_id = response_json(response)["id"]
+                for index in range(max(self.dish_count, 1 if self.review_count else 0)):
+                    dish = {
+                        "name": f"Contention {os.getpid()}-{index}", "description": "Нагрузочный тест",
+                        "releaseDate": "2024-01-01", "weight": 100, "pricing": {"id": 1}, "categories": [], "authors": []
+                    }
+                    response = session.post(f"{self.host}/dishes", json=dish, timeout=SEED_TIMEOUT)
+                    response.raise_for_status()
+                    self.created_dishes.append(response_json(response)["id"])
+                self.dish_ids = self.created_dishes[:self.dish_count]
+                for index in range(self.review_count):
+                    review = {**payloads.reviews.next(), "userId": self.owner_id, "dishId": self.created_dishes[index % len(self.created_dishes)]}
+                    response = session.post(f"{self.host}/reviews", json=review, timeout=SEED_TIMEOUT)
+                    response.raise_for_status()
+                    self.review_ids.append(response_json(response)["reviewId"])
+            except Exception as e:
+                logger.error("Ошибка создания целей конкурентных лайков: %s", e)
+            finally:
+                session.close()
+                self.prepared = True
+            logger.info("Цели конкурентных лайков: блюда %s, отзывы %s", self.dish_ids, self.review_ids)
+
+    def record(self, users, response_time, ok):
+        level = users // self.level_step * self.level_step
+        entry = self.levels.get(level)
+        if entry is None:
+            entry = self.levels[level] = StatsEntry(None, str(level), "")
+        entry.log(response_time, 0)
+        if not ok:
+            entry.log_error(None)
+
+    def verify(self, session):
+        """Расхождения состояния сервера с подтвержденными операциями"""
+        problems = []
+        observed = {}
+        for dish_id in self.dish_ids:
+            states = [state for (target, _), state in self.dish_votes.items() if target == dish_id]
+            expected = sum(1 for state in states if state)
+            unknown = states.count(None)
+            likes = response_json(session.get(f"{self.host}/dishes/{dish_id}", timeout=SEED_TIMEOUT))["likes"]
+            observed[dish_id] = likes
+            if not expected <= likes <= expected + unknown:
+                problems.append(f"блюдо {dish_id}: likes={likes}, ожидалось {expected}" + (f"..{expected + unknown}" if unknown else ""))
+        for review_id in self.review_ids:
+            states = [state for (target, _), state in self.review_votes.items() if target == review_id]
+            expected = sum(state for state in states if state)
+            unknown = states.count(None)
+            useful = response_json(session.get(f"{self.host}/reviews/{review_id}", timeout=SEED_TIMEOUT))["useful"]
+            if abs(useful - expected) > unknown:
+                problems.append(f"отзыв {review_id}: useful={useful}, ожидалось {expected}" + (f"±{unknown}" if unknown else ""))
+        if self.dish_ids:
+            popular = response_json(session.get(f"{self.host}/dishes/popular", params={"count": self.popular_count}, timeout=SEED_TIMEOUT))
+            likes = [dish["likes"] for dish in popular]
+            if any(first < second for first, second in zip(likes, likes[1:])):
+                problems.append("/dishes/popular не упорядочен по убыванию likes")
+            listed = {dish["id"]: dish["likes"] for dish in popular}
+            lowest = likes[-1] if len(popular) >= self.popular_count else 0
+            for dish_id, count in observed.items():
+                if dish_id in listed and listed[dish_id] != count:
+                    problems.append(f"/dishes/popular: у блюда {dish_id} likes={listed[dish_id]}, в карточке {count}")
+                elif dish_id not in listed and count > lowest:
+                    problems.append(f"/dishes/popular: нет блюда {dish_id} с likes={count}")
+        if self.conflicts:
+            problems.append(f"неожиданных 409 при голосовании за отзыв: {self.conflicts}")
+        return problems
+
+    def summary(self):
+        lines = [
+            f"{level:>6}+ польз. {entry.num_requests:>9} запр. "
+            f"{entry.num_requests / max(entry.last_request_timestamp - entry.start_time, 1e-9):>9.1f} запр/с  p50 "
+            f"{entry.get_response_time_percentile(0.5)} p95 {entry.get_response_time_percentile(0.95)} "
+            f"p99 {entry.get_response_time_percentile(0.99)} max {entry.max_response_time:.0f} мс, ошибок {entry.num_failures}"
+            for level, entry in sorted(self.levels.items())
+        ]
+        return "\n  ".join(lines)
+
+    def remove(self, session):
+        """Удаление целей и пользователей сценария"""
+        paths = [f"/reviews/{review_id}" for review_id in self.review_ids]
+        paths += [f"/dishes/{dish_id}" for dish_id in self.created_dishes]
+        paths += [f"/users/{user_id}" for user_id in (*self.users, self.owner_id) if user_id]
+
+        def delete(path):
+            try:
+                session.delete(f"{self.host}{path}", timeout=SEED_TIMEOUT)
+            except Exception as e:
+                logger.warning("Ошибка удаления %s: %s", path, e)
+
+        Pool(SEED_CONCURRENCY).map(delete, paths)
+
+contention_state = {"run": None}
+
+def start_contention(environment):
+    if workload.contention and not isinstance(environment.runner, MasterRunner):
+        contention_state["run"] = ContentionRun(workload.contention, environment.host or API_HOST)
+
+def finish_contention(environment):
+    """Сверка и сводка сценария после остановки пользователей процесса"""
+    run = contention_state["run"]
+    contention_state["run"] = None
+    if run is None or not run.prepared:
+        return
+    gevent.sleep(run.settle)
+    session = requests.Session()
+    session.mount(run.host, HTTPAdapter(pool_connections=1, pool_maxsize=SEED_CONCURRENCY))
+    try:
+        logger.info(
+            "Конкурентные лайки по уровням числа пользователей:\n  %s\nУспешных операций: %s",
+            run.summary(), dict(run.operations)
+        )
+        problems = run.verify(session)
+        if problems:
+            logger.error("Потерянные обновления лайков (%s):\n  %s", len(problems), "\n  ".join(problems))
+            environment.process_exit_code = 1
+        else:
+            logger.info("Счетчики likes/useful и /dishes/popular совпадают с подтвержденными операциями")
+        if run.cleanup:
+            run.remove(session)
+    except Exception as e:
+        logger.error("Ошибка сверки конкурентных лайков: %s", e)
+        environment.process_exit_code = 1
+    finally:
+        session.close()
+
+class ContentionBehavior(UserBehavior):
+    """Пользователь сценария конкурентных лайков (см. ContentionRun)"""
+
+    def get_next_task(self):
+        return ContentionBehavior.storm
+
+    def on_start(self):
+        super().on_start()
+        run = contention_state["run"]
+        if run and self.user_id:
+            run.users.append(self.user_id)
+            run.prepare()
+
+    def on_stop(self):
+        # Пользователь удаляется после сверки: его голоса входят в ожидаемые значения
+        pass
+
+    def storm(self):
+        run = contention_state["run"]
+        if run is None or not self.user_id:
+            raise StopUser()
+        reviews = [review_id for review_id in run.review_ids if run.review_votes.get((review_id, self.user_id), 0) is not None]
+        if reviews and (not run.dish_ids or random.random() < run.review_share):
+            self.vote_review(run, random.choice(reviews))
+        elif run.dish_ids:
+            self.like_dish(run, random.choice(run.dish_ids))
+        else:
+            gevent.sleep(1)
+
+    def _send(self, run, method, path, name):
+        started = time.perf_counter()
+        with self.request(method, path, name=name) as response:
+            status = response.status_code
+        run.record(self.user.environment.runner.user_count, (time.perf_counter() - started) * 1000, status == 200)
+        return status
+
+    def like_dish(self, run, dish_id):
+        key = (dish_id, self.user_id)
+        liked = run.dish_votes.get(key, False)
+        # Неизвестное состояние снимается идемпотентным PUT
+        method = "DELETE" if liked else "PUT"
+        run.dish_votes[key] = None
+        status = self._send(run, method, f"/dishes/{dish_id}/like/{self.user_id}", "/dishes/[hot]/like/[id]")
+        if status == 200:
+            run.dish_votes[key] = method == "PUT"
+            run.operations[f"{method} dish like"] += 1
+        elif 400 <= status < 500:
+            run.dish_votes[key] = liked
+
+    def vote_review(self, run, review_id):
+        key = (review_id, self.user_id)
+        vote = run.review_votes.get(key, 0)
+        if vote:
+            method, kind, result = "DELETE", "like" if vote > 0 else "dislike", 0
+        else:
+            method = "PUT"
+            kind, result = ("dislike", -1) if random.random() < run.dislike else ("like", 1)
+        run.review_votes[key] = None
+        status = self._send(run, method, f"/reviews/{review_id}/{kind}/{self.user_id}", f"/reviews/[hot]/{kind}/[id]")
+        if status == 200:
+            run.review_votes[key] = result
+            run.operations[f"{method} review {kind}"] += 1
+        elif status == 409:
+            # Сервер видит голос, о котором подтвержденных операций нет
+            run.conflicts += 1
+        elif 400 <= status < 500:
+            run.review_votes[key] = vote
+
+class OpenLoopUser(FastHttpUser if API_CLIENT == "fasthttp" else HttpUser):
+    """Открытая модель нагрузки: запросы по расписанию прибытия, а не после ответов.
+
+    Для каждого эндпоинта из секции open_loop профиля запросы приходят с
+    постоянным интервалом (arrival: fixed) или пуассоновским потоком
+    (poisson) с частотой endpoints[...] запросов в секунду на экземпляр.
+    Каждый запрос выполняется в своем greenlet, а время ответа отсчитывается
+    от запланированного момента отправки, поэтому замедление сервера и
+    отставание генератора попадают в задержку (без coordinated omission).
+    Запрос отбрасывается, если уже выполняется max_in_flight запросов или
+    отправка опоздала больше чем на max_lag секунд; отброшенные и
+    опоздавшие больше чем на lag_threshold запросы выводятся в итогах.
+    Запросы идут через клиент движка API_CLIENT по адресу --host, как у
+    ApiUser; время ответа подменяется в request_meta до выхода из
+    catch_response.
+    Только открытая модель: locust -f load_testing_API.py OpenLoopUser -u N.
+    """
+
+    abstract = not workload.open_loop
+    host = API_HOST
+    wait_time = constant(0)
+    # Соединения FastHttpUser на экземпляр и таймауты, как у ApiUser
+    concurrency = workload.open_loop.get("max_in_flight", 100)
+    connection_timeout = REQUEST_TIMEOUT
+    network_timeout = REQUEST_TIMEOUT
+
+    def on_start(self):
+        max_in_flight = workload.open_loop.get("max_in_flight", 100)
+        if API_CLIENT == "requests":
+            self.client.mount(self.host, HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight))
+        self.in_flight = Pool(max_in_flight)
+        self.user_id = None
+        try:
+            with self.client.post("/users", json=payloads.user(), catch_response=True, **self._timeout()) as response:
+                body = response_json(response) if response.status_code in (200, 201) else None
+                if isinstance(body, dict) and "id" in body:
+                    self.user_id = body["id"]
+                    active_users.append(self.user_id)
+                else:
+                    response.failure(f"HTTP {response.status_code}")
+                    logger.warning("Ошибка регистрации пользователя открытой модели: %s", response.status_code)
+        except Exception as e:
+            logger.error("Ошибка регистрации пользователя открытой модели: %s", e)
+
+    def on_stop(self):
+        self.in_flight.kill(block=False)
+        if self.user_id in active_users:
+            active_users.remove(self.user_id)
+            try:
+                self.client.delete(f"/users/{self.user_id}", name="/users/[id]", **self._timeout())
+            except Exception as e:
+                logger.error("Ошибка при удалении пользователя: %s", e)
+
+    @staticmethod
+    def _timeout():
+        # Таймаут requests задается на запрос, у fasthttp - на уровне пользователя
+        return {"timeout": REQUEST_TIMEOUT} if API_CLIENT == "requests" else {}
+
+    @task
+    def schedule(self):
+        config = workload.open_loop
+        poisson = config.get("arrival", "poisson") == "poisson"
+        max_lag = config.get("max_lag", 1.0)
+        lag_threshold = config.get("lag_threshold", 0.01)
+        now = time.monotonic()
+        # Случайная фаза, чтобы экземпляры с fixed не отправляли запросы одновременно
+        arrivals = [(now + random.random() / rate, endpoint, rate) for endpoint, rate in config["endpoints"].items() if rate > 0]
+        heapq.heapify(arrivals)
+        while arrivals:
+            due, endpoint, rate = arrivals[0]
+            gap = random.expovariate(rate) if poisson else 1 / rate
+            heapq.heapreplace(arrivals, (due + gap, endpoint, rate))
+            delay = due - time.monotonic()
+            if delay > 0:
+                gevent.sleep(delay)
+            lag = time.monotonic() - due
+            if lag > max_lag or self.in_flight.full():
+                business_counters[f"open_loop_dropped {endpoint}"] += 1
+                continue
+            if lag > lag_threshold:
+                business_counters[f"open_loop_delayed {endpoint}"] += 1
+            self.in_flight.spawn(self.send, endpoint, due)
+
+    def _target(self, method, template, endpoint):
+        """Путь с подставленными ID: первый ID пользователя - свой, остальные из пулов"""
+        path = template
+        own_user = True
+        for kind in ENDPOINT_IDS[(method, template)]:
+            if kind == "user" and own_user:
+                value, own_user = self.user_id, False
+            else:
+                pool = active_users if kind == "user" else global_data[f"{kind}_ids"]
+                value = workload.keys.pick(endpoint, pool) if pool else None
+            if value is None:
+                return None
+            path = path.replace("[id]", str(value), 1)
+        return path
+
+    def send(self, endpoint, due):
+        method, template = endpoint.split(" ", 1)
+        path = self._target(method, template, endpoint)
+        kwargs = endpoint_payload(method, template, self.user_id) if path else None
+        if kwargs is None:
+            business_counters[f"open_loop_skipped {endpoint}"] += 1
+            return
+        try:
+            with self.client.request(method, path, name=template, catch_response=True, **self._timeout(), **kwargs) as response:
+                # Задержка от запланированного момента отправки, а не от фактического
+                response.request_meta["response_time"] = (time.monotonic() - due) * 1000
+                error = getattr(response, "error", None)
+                if not response.status_code and error is not None:
+                    response.failure(type(error).__name__)
+                elif response.status_code >= 400:
+                    response.failure(f"HTTP {response.status_code}")
+                elif method == "POST" and template == "/reviews":
+                    body = response_json(response)
+                    if isinstance(body, dict) and body.get("reviewId"):
+                        global_data["review_ids"].append(body["reviewId"])
+        except Exception as e:
+            logger.error("Ошибка запроса открытой модели %s: %s", endpoint, e)
+
+workload.compile(UserBehavior)
+
+class ApiUser(FastHttpUser if API_CLIENT == "fasthttp" else HttpUser):
+    tasks = [ReplayBehavior if REPLAY_LOG else UserBehavior]
+    host = API_HOST
+    wait_time = workload.wait_time
+    # Таймауты соединения для FastHttpUser
+    connection_timeout = REQUEST_TIMEOUT
+    network_timeout = REQUEST_TIMEOUT
+
+class ContentionUser(FastHttpUser if API_CLIENT == "fasthttp" else HttpUser):
+    """Конкурентные лайки по нескольким блюдам и отзывам (секция contention профиля).
+
+    Только этот сценарий: locust -f load_testing_API.py ContentionUser;
+    рост конкуренции задается -u/-r или этапами stages профиля.
+    """
 
-class ApiUser(HttpUser):
-    tasks = [UserBehavior]
-    host = os.getenv("API_HOST", "http://localhost:8080")
-    wait_time = between(0.5, 2.5)
\ No newline at end of file
+    abstract = not workload.contention
+    tasks = [ContentionBehavior]
+    host = API_HOST
+    wait_time = constant(workload.contention.get("wait", 0))
+    connection_timeout = REQUEST_TIMEOUT
+    network_timeout = REQUEST_TIMEOUT
@@ -0,0 +1,23 @@
+# Тесты вспомогательных компонентов нагрузочного сценария без сервера API:
+#     python -m pytest load_testing_tests.py
+# load_testing_API импортируется первым: locust выполняет monkey-patching gevent
+import load_testing_API
+
+from locust.env import Environment
+
+def latency_lines(exporter):
+    return [line for line in exporter.page.decode().splitlines() if line.startswith("restarate_latency_ms")]
+
+def test_idle_interval_writes_no_latency_samples():
+    environment = Environment(user_classes=[])
+    exporter = load_testing_API.MetricsExporter(environment, 1)
+    for response_time in (10, 20, 30):
+        environment.stats.log_request("GET", "/dishes/[id]", response_time, 100)
+
+    exporter.sample()
+    assert any('name="/dishes/[id]"' in line for line in latency_lines(exporter))
+
+    # Интервал без запросов: счетчики остаются, перцентилей (nan) нет
+    exporter.sample()
+    assert latency_lines(exporter) == []
+    assert 'restarate_requests_total{method="GET",name="/dishes/[id]"} 3' in exporter.page.decode()
@@ -0,0 +1,59 @@
+"""Компактный колоночный формат временных рядов нагрузочного прогона.
+
+Файл: строка-сигнатура RSTS1, строка JSON-заголовка (метаданные, имена
+рядов, описание колонок с типом array и длиной сжатых данных) и затем
+данные колонок подряд, каждая сжата zlib. Одна строка таблицы - значения
+одного ряда (эндпоинт, код ошибки, бизнес-счетчик) за один интервал.
+
+    python metrics_file.py run.rsts > run.csv
+"""
+import csv
+import json
+import sys
+import zlib
+from array import array
+
+MAGIC = b"RSTS1\n"
+
+def write_columns(path, metadata, series, columns):
+    """Запись колонок (имя -> array) и списка имен рядов"""
+    blobs = []
+    described = []
+    for name, values in columns.items():
+        blob = zlib.compress(values.tobytes(), 6)
+        blobs.append(blob)
+        described.append({"name": name, "type": values.typecode, "rows": len(values), "bytes": len(blob)})
+    header = {"metadata": metadata, "series": series, "columns": described}
+    with open(path, "wb") as output:
+        output.write(MAGIC)
+        output.write(json.dumps(header, ensure_ascii=False).encode() + b"\n")
+        for blob in blobs:
+            output.write(blob)
+
+def read_columns(path, names=None):
+    """Чтение заголовка и колонок (всех или только names), возвращает (заголовок, колонки)"""
+    columns = {}
+    with open(path, "rb") as source:
+        if source.readline() != MAGIC:
+            raise ValueError(f"{path}: не файл временных рядов RSTS1")
+        header = json.loads(source.readline())
+        for column in header["columns"]:
+            if names is not None and column["name"] not in names:
+                source.seek(column["bytes"], 1)
+                continue
+            values = array(column["type"])
+            values.frombytes(zlib.decompress(source.read(column["bytes"])))
+            columns[column["name"]] = values
+    return header, columns
+
+def main():
+    header, columns = read_columns(sys.argv[1])
+    names = [column["name"] for column in header["columns"]]
+    writer = csv.writer(sys.stdout)
+    writer.writerow(names)
+    series = header["series"]
+    for row in zip(*(columns[name] for name in names)):
+        writer.writerow(series[value] if name == "series" else value for name, value in zip(names, row))
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,324 @@
+import fcntl
+import gc
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 import requests
+from requests.adapters import HTTPAdapter
 import time
 
-BASE_DISH_URL = "http://localhost:8080/dishes"
-BASE_CATEGORY_URL = "http://localhost:8080/categories"
-BASE_USER_URL = "http://localhost:8080/users"
-BASE_PRICING_URL = "http://localhost:8080/pricing"
-BASE_AUTHORS_URL = "http://localhost:8080/authors"
-BASE_REVIEWS_URL = "http://localhost:8080/reviews"
+BASE_URL = os.getenv("RESTARATE_BASE_URL", "http://localhost:8080").rstrip("/")
+REQUEST_TIMEOUT = float(os.getenv("RESTARATE_TIMEOUT", "10"))
+POOL_SIZE = int(os.getenv("RESTARATE_POOL_SIZE", "16"))
+
+# Пространство имен тестовых данных. При параллельном запуске (pytest-xdist)
+# каждый воркер добавляет свой префикс к login/name/content, чтобы данные
+# воркеров не пересекались; при обычном запуске префикс пустой.
+XDIST_WORKER = os.getenv("PYTEST_XDIST_WORKER")
+NAMESPACE = os.getenv("RESTARATE_NAMESPACE", f"{XDIST_WORKER}_" if XDIST_WORKER else "")
+LOCK_FILE = os.path.join(tempfile.gettempdir(), "restarate_tests.lock")
+
+# Режим бенчмарков эндпоинтов: record - записать базовые значения, check - сравнить
+# и провалить тест при регрессии, warn - сравнить и предупредить; без значения
+# тесты test_bench_* пропускаются
+BENCH_MODE = os.getenv("RESTARATE_BENCH", "")
+BENCH_FILE = os.getenv(
+    "RESTARATE_BENCH_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "restarate_baseline.json")
+)
+BENCH_WARMUP = int(os.getenv("RESTARATE_BENCH_WARMUP", "10"))
+BENCH_REPEAT = int(os.getenv("RESTARATE_BENCH_REPEAT", "30"))
+BENCH_MIN_TIME = float(os.getenv("RESTARATE_BENCH_MIN_TIME", "0.5"))
+# Допустимый рост медианы и p95 относительно базового значения и порог шума в мс
+BENCH_TOLERANCE = float(os.getenv("RESTARATE_BENCH_TOLERANCE", "0.5"))
+BENCH_MIN_DELTA_MS = float(os.getenv("RESTARATE_BENCH_MIN_DELTA_MS", "2"))
+# Версия формата файла базовых значений и предел поправки калибровки
+BENCH_FORMAT = 1
+CALIBRATION_LIMIT = 3.0
+
+# Ключ идентификатора в ответе на создание для каждой коллекции
+COLLECTION_ID_KEYS = {
+    "/reviews": "reviewId",
+    "/dishes": "id",
+    "/users": "id",
+    "/authors": "id"
+}
+# Порядок удаления: сначала зависимые сущности
+TEARDOWN_STAGES = [
+    ("/reviews",),
+    ("/dishes",),
+    ("/users", "/authors")
+]
+
+class ApiSession(requests.Session):
+    """Keep-alive сессия с базовым адресом и таймаутом по умолчанию.
+
+    Запоминает идентификаторы сущностей, созданных POST-запросами, в created.
+    """
+
+    def __init__(self, base_url: str, timeout: float, pool_size: int):
+        super().__init__()
+        self.base_url = base_url
+        self.timeout = timeout
+        self.created = {path: [] for path in COLLECTION_ID_KEYS}
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self.hooks["response"].append(self.track_created)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, f"{self.base_url}{url}", **kwargs)
+
+    def track_created(self, response, *args, **kwargs):
+        # PUT без известного id API выполняет как создание, такие объекты тоже удаляются
+        if response.request.method not in ("POST", "PUT") or response.status_code not in (200, 201):
+            return
+        path = response.request.url[len(self.base_url):].split("?", 1)[0].rstrip("/")
+        if path not in self.created:
+            return
+        try:
+            body = response.json()
+        except ValueError:
+            return
+        key = COLLECTION_ID_KEYS[path]
+        if isinstance(body, dict) and key in body and body[key] not in self.created[path]:
+            self.created[path].append(body[key])
+
+class Resource:
+    """Типовые запросы к контроллеру: список, получение, создание, обновление, удаление"""
+
+    path = ""
+
+    def __init__(self, session: ApiSession):
+        self.session = session
+
+    def list(self, **params) -> requests.Response:
+        return self.session.get(self.path, params=params or None)
+
+    def get(self, item_id) -> requests.Response:
+        return self.session.get(f"{self.path}/{item_id}")
+
+    def create(self, data: dict) -> requests.Response:
+        return self.session.post(self.path, json=data)
+
+    def update(self, data: dict) -> requests.Response:
+        return self.session.put(self.path, json=data)
+
+    def delete(self, item_id) -> requests.Response:
+        return self.session.delete(f"{self.path}/{item_id}")
+
+class Dishes(Resource):
+    path = "/dishes"
+
+    def like(self, dish_id: int, user_id: int) -> requests.Response:
+        return self.session.put(f"{self.path}/{dish_id}/like/{user_id}")
+
+    def unlike(self, dish_id: int, user_id: int) -> requests.Response:
+        return self.session.delete(f"{self.path}/{dish_id}/like/{user_id}")
+
+    def popular(self, **params) -> requests.Response:
+        return self.session.get(f"{self.path}/popular", params=params or None)
+
+    def search(self, query: str, by: str) -> requests.Response:
+        return self.session.get(f"{self.path}/search", params={"query": query, "by": by})
+
+    def common(self, user_id: int, friend_id: int) -> requests.Response:
+        return self.session.get(f"{self.path}/common", params={"userId": user_id, "friendId": friend_id})
+
+    def by_author(self, author_id: int, **params) -> requests.Response:
+        return self.session.get(f"{self.path}/author/{author_id}", params=params or None)
+
+class Users(Resource):
+    path = "/users"
+
+    def add_friend(self, user_id: int, friend_id: int) -> requests.Response:
+        return self.session.put(f"{self.path}/{user_id}/friends/{friend_id}")
+
+    def remove_friend(self, user_id: int, friend_id: int) -> requests.Response:
+        return self.session.delete(f"{self.path}/{user_id}/friends/{friend_id}")
+
+    def friends(self, user_id: int) -> requests.Response:
+        return self.session.get(f"{self.path}/{user_id}/friends")
+
+    def common_friends(self, user_id: int, other_id: int) -> requests.Response:
+        return self.session.get(f"{self.path}/{user_id}/friends/common/{other_id}")
+
+    def recommendations(self, user_id: int) -> requests.Response:
+        return self.session.get(f"{self.path}/{user_id}/recommendations")
+
+    def feed(self, user_id: int) -> requests.Response:
+        return self.session.get(f"{self.path}/{user_id}/feed")
+
+class Categories(Resource):
+    path = "/categories"
+
+class Pricing(Resource):
+    path = "/pricing"
+
+class Authors(Resource):
+    path = "/authors"
+
+class Reviews(Resource):
+    path = "/reviews"
+
+    def like(self, review_id: int, user_id: int) -> requests.Response:
+        return self.session.put(f"{self.path}/{review_id}/like/{user_id}")
+
+    def unlike(self, review_id: int, user_id: int) -> requests.Response:
+        return self.session.delete(f"{self.path}/{review_id}/like/{user_id}")
+
+    def dislike(self, review_id: int, user_id: int) -> requests.Response:
+        return self.session.put(f"{self.path}/{review_id}/dislike/{user_id}")
+
+class ApiClient:
+    """Клиент API ресторана для функциональных тестов"""
+
+    def __init__(self, base_url: str = BASE_URL, timeout: float = REQUEST_TIMEOUT, pool_size: int = POOL_SIZE):
+        self.session = ApiSession(base_url, timeout, pool_size)
+        self.dishes = Dishes(self.session)
+        self.users = Users(self.session)
+        self.categories = Categories(self.session)
+        self.pricing = Pricing(self.session)
+        self.authors = Authors(self.session)
+        self.reviews = Reviews(self.session)
+        self.teardown_pool = ThreadPoolExecutor(max_workers=pool_size)
+
+    @property
+    def created(self) -> dict:
+        return self.session.created
+
+    def teardown(self):
+        """Удаление созданных сущностей: параллельно внутри этапа, этапы по порядку"""
+        for stage in TEARDOWN_STAGES:
+            targets = [f"{path}/{item_id}" for path in stage for item_id in self.created[path]]
+            list(self.teardown_pool.map(self.session.delete, targets))
+        for ids in self.created.values():
+            ids.clear()
+
+    def close(self):
+        self.teardown_pool.shutdown()
+        self.session.close()
+
+def ns(value):
+    """Значение с префиксом пространства имен текущего воркера"""
+    return f"{NAMESPACE}{value}"
+
+def exclusive(test):
+    """Тест зависит от общего состояния сервера и выполняется монопольно"""
+    test.exclusive = True
+    return test
+
+class Benchmark:
+    """Замер времени ответа эндпоинтов и сравнение с базовыми значениями.
+
+    Замер: BENCH_WARMUP прогревочных вызовов, затем не меньше BENCH_REPEAT
+    вызовов и BENCH_MIN_TIME секунд при выключенном сборщике мусора;
+    результат - медиана и p95 в мс. Калибровка - такой же замер GET
+    /pricing/1 в начале сессии: при сравнении базовые значения умножаются на
+    отношение текущей калибровки к записанной (не больше CALIBRATION_LIMIT),
+    поэтому общее замедление сети или машины CI не считается регрессией,
+    а замедление отдельного эндпоинта считается.
+    """
+
+    def __init__(self, api: ApiClient, mode: str, path: str):
+        if mode not in ("record", "check", "warn"):
+            raise ValueError(f"Неизвестный RESTARATE_BENCH: {mode}, допустимо record, check или warn")
+        self.mode = mode
+        self.path = path
+        self.results = {}
+        self.baseline = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as source:
+                self.baseline = json.load(source)
+            if self.baseline.get("format") != BENCH_FORMAT:
+                warnings.warn(f"Файл {path} другой версии формата, базовые значения не используются")
+                self.baseline = {}
+        self.calibration = self.measure(lambda: api.pricing.get(1))
+
+    def measure(self, call) -> dict:
+        for _ in range(BENCH_WARMUP):
+            response = call()
+            assert response.status_code < 400, f"Прогрев: HTTP {response.status_code}"
+        timings = []
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            while len(timings) < BENCH_REPEAT or (time.perf_counter() - started < BENCH_MIN_TIME and len(timings) < BENCH_REPEAT * 10):
+                call_started = time.perf_counter()
+                call()
+                timings.append((time.perf_counter() - call_started) * 1000)
+        finally:
+            if gc_enabled:
+                gc.enable()
+        timings.sort()
+        return {
+            "median_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(timings[min(int(len(timings) * 0.95), len(timings) - 1)], 3),
+            "calls": len(timings)
+        }
+
+    def run(self, name: str, call):
+        """Замер теста name и проверка регрессии в режимах check и warn"""
+        result = self.measure(call)
+        self.results[name] = result
+        if self.mode == "record":
+            return
+        baseline = self.baseline.get("benchmarks", {}).get(name)
+        if baseline is None:
+            warnings.warn(f"{name}: нет базового значения в {self.path}")
+            return
+        recorded = self.baseline.get("calibration", {}).get("median_ms")
+        scale = self.calibration["median_ms"] / recorded if recorded else 1.0
+        scale = min(max(scale, 1 / CALIBRATION_LIMIT), CALIBRATION_LIMIT)
+        regressions = []
+        for metric in ("median_ms", "p95_ms"):
+            allowed = baseline[metric] * scale * (1 + BENCH_TOLERANCE)
+            if result[metric] > allowed and result[metric] - baseline[metric] * scale > BENCH_MIN_DELTA_MS:
+                regressions.append(f"{metric} {result[metric]:.2f} > {allowed:.2f} (база {baseline[metric]:.2f}, калибровка x{scale:.2f})")
+        if regressions:
+            message = f"{name}: регрессия времени ответа: " + "; ".join(regressions)
+            if self.mode == "check":
+                pytest.fail(message)
+            warnings.warn(message)
+
+    def save(self):
+        """Запись результатов в файл базовых значений (слияние с уже записанными)"""
+        if self.mode != "record" or not self.results:
+            return
+        fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            data = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as source:
+                    data = json.load(source)
+            if data.get("format") != BENCH_FORMAT:
+                data = {}
+            benchmarks = {**data.get("benchmarks", {}), **self.results}
+            data = {
+                "format": BENCH_FORMAT,
+                "machine": f"{platform.node()} {platform.machine()} Python {platform.python_version()}",
+                "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "calibration": self.calibration,
+                "benchmarks": dict(sorted(benchmarks.items()))
+            }
+            with open(self.path, "w", encoding="utf-8") as output:
+                json.dump(data, output, ensure_ascii=False, indent=2)
+                output.write("\n")
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
 
 TEST_REVIEW = {
-    "content": "Отличное блюдо!",
+    "content": ns("Отличное блюдо!"),
     "isPositive": True,
     "userId": 1,
     "dishId": 1
@@ -18,13 +326,13 @@ TEST_REVIEW = {
 
 TEST_USER = {
     "email": "user@example.com",
-    "login": "test_user",
+    "login": ns("test_user"),
     "name": "Test User",
     "birthday": "1990-01-01"
 }
 
 TEST_DISH = {
-    "name": "Test Dish",
+    "name": ns("Test Dish"),
     "description": "Test Description",
     "releaseDate": "2023-01-01",
     "weight": 300,
@@ -42,199 +350,222 @@ EXPECTED_PRICING_CATEGORIES = {
 }
 
 if __name__ == "__main__":
-    # Явный запуск pytest при выполнении скрипта
-    retcode = pytest.main(["-v", __file__])
+    # Явный запуск pytest при выполнении скрипта, например с -n 4 для pytest-xdist
+    retcode = pytest.main(["-v", __file__, *sys.argv[1:]])
     if retcode != 0:
         raise RuntimeError(f"Тесты завершились с ошибкой (код {retcode})")
 
 @pytest.fixture(autouse=True)
-def cleanup():
-    yield
-    response = requests.get(BASE_DISH_URL)
-    for dish in response.json():
-        requests.delete(f"{BASE_DISH_URL}/{dish['id']}")
+def isolation(request):
+    # При параллельном запуске обычные тесты держат разделяемую блокировку,
+    # а помеченные @exclusive - монопольную, вместе с очисткой после них
+    if not XDIST_WORKER:
+        yield
+        return
+    mode = fcntl.LOCK_EX if getattr(request.function, "exclusive", False) else fcntl.LOCK_SH
+    fd = os.open(LOCK_FILE, os.O_RDWR | os.O_CREAT)
+    try:
+        fcntl.flock(fd, mode)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+@pytest.fixture(scope="session")
+def api():
+    client = ApiClient()
+    yield client
+    client.close()
 
-def test_create_and_get_dish():
+@pytest.fixture(autouse=True)
+def cleanup(api):
+    # Удаляются только созданные тестом сущности
+    yield
+    api.teardown()
+
+@pytest.fixture(scope="session")
+def benchmark_session(api):
+    if not BENCH_MODE:
+        pytest.skip("Бенчмарки включаются переменной RESTARATE_BENCH")
+    benchmark = Benchmark(api, BENCH_MODE, BENCH_FILE)
+    yield benchmark
+    benchmark.save()
+
+@pytest.fixture
+def bench(request, benchmark_session):
+    # Результат сохраняется под именем теста
+    return lambda call: benchmark_session.run(request.node.name, call)
+
+def test_create_and_get_dish(api):
     print("\n=== Запуск test_create_and_get_dish ===")
     # Тест создания и получения блюда
-    response = requests.post(BASE_DISH_URL, json=TEST_DISH)
+    response = api.dishes.create(TEST_DISH)
     assert response.status_code == 200
     dish_id = response.json()["id"]
     
     # Проверка получения по ID
-    get_response = requests.get(f"{BASE_DISH_URL}/{dish_id}")
+    get_response = api.dishes.get(dish_id)
     assert get_response.status_code == 200
-    assert get_response.json()["name"] == "Test Dish"
+    assert get_response.json()["name"] == TEST_DISH["name"]
 
-def test_update_dish():
+def test_update_dish(api):
     # Тест обновления блюда
-    created = requests.post(BASE_DISH_URL, json=TEST_DISH).json()
+    created = api.dishes.create(TEST_DISH).json()
     
-    updated_data = {**TEST_DISH, "name": "Updated Dish"}
-    update_response = requests.put(BASE_DISH_URL, json=updated_data)
+    updated_data = {**TEST_DISH, "name": ns("Updated Dish")}
+    update_response = api.dishes.update(updated_data)
     assert update_response.status_code == 200
-    assert update_response.json()["name"] == "Updated Dish"
+    assert update_response.json()["name"] == ns("Updated Dish")
 
-def test_like_dislike_mechanism():
+@exclusive
+def test_like_dislike_mechanism(api):
     # Тест системы лайков/дизлайков
-    dish = requests.post(BASE_DISH_URL, json=TEST_DISH).json()
+    dish = api.dishes.create(TEST_DISH).json()
     user_id = 123
     
     # Добавление лайка
-    like_response = requests.put(f"{BASE_DISH_URL}/{dish['id']}/like/{user_id}")
+    like_response = api.dishes.like(dish['id'], user_id)
     assert like_response.status_code == 200
     
-    # Проверка популярных блюд
-    popular = requests.get(f"{BASE_DISH_URL}/popular?count=1").json()
-    assert len(popular) == 1
+    # Проверка популярных блюд: учитывается только свое блюдо, на сервере могут быть чужие
+    popular = api.dishes.popular(count=1000).json()
+    assert len([d for d in popular if d["id"] == dish["id"]]) == 1
     
     # Удаление лайка
-    requests.delete(f"{BASE_DISH_URL}/{dish['id']}/like/{user_id}")
-    popular_after = requests.get(f"{BASE_DISH_URL}/popular?count=1").json()
-    assert len(popular_after) == 0
+    api.dishes.unlike(dish['id'], user_id)
+    popular_after = api.dishes.popular(count=1000).json()
+    assert len([d for d in popular_after if d["id"] == dish["id"]]) == 0
 
-def test_search_functionality():
+def test_search_functionality(api):
     # Тест поиска блюд
     test_dishes = [
-        {**TEST_DISH, "name": "Борщ Украинский"},
-        {**TEST_DISH, "name": "Салат Цезарь"}
+        {**TEST_DISH, "name": ns("Борщ Украинский")},
+        {**TEST_DISH, "name": ns("Салат Цезарь")}
     ]
     for dish in test_dishes:
-        requests.post(BASE_DISH_URL, json=dish)
+        api.dishes.create(dish)
     
     # Поиск по названию
-    search_response = requests.get(
-        f"{BASE_DISH_URL}/search?query=цезарь&by=title"
-    )
+    search_response = api.dishes.search("цезарь", "title")
     assert search_response.status_code == 200
     assert any("Цезарь" in d["name"] for d in search_response.json())
 
-def test_author_dishes():
+@exclusive
+def test_author_dishes(api):
     # Тест получения блюд автора
     author_id = 1
     for _ in range(3):
-        requests.post(BASE_DISH_URL, json={**TEST_DISH, "authors": [{"id": author_id}]})
+        api.dishes.create({**TEST_DISH, "authors": [{"id": author_id}]})
     
-    response = requests.get(f"{BASE_DISH_URL}/author/{author_id}?sortBy=name")
+    response = api.dishes.by_author(author_id, sortBy="name")
     assert response.status_code == 200
-    assert len(response.json()) == 3
+    assert len([d for d in response.json() if d["id"] in api.created["/dishes"]]) == 3
 
-def test_validation():
+def test_validation(api):
     # Тест валидации входных данных
     invalid_dish = {**TEST_DISH}
     invalid_dish["weight"] = -100  # Неправильный вес
     
-    response = requests.post(BASE_DISH_URL, json=invalid_dish)
+    response = api.dishes.create(invalid_dish)
     assert response.status_code == 400
     assert "positive" in response.text.lower()
 
-def test_delete_dish():
+def test_delete_dish(api):
     # Тест удаления блюда
-    created = requests.post(BASE_DISH_URL, json=TEST_DISH).json()
+    created = api.dishes.create(TEST_DISH).json()
     
-    delete_response = requests.delete(f"{BASE_DISH_URL}/{created['id']}")
+    delete_response = api.dishes.delete(created['id'])
     assert delete_response.status_code == 200
     
-    get_response = requests.get(f"{BASE_DISH_URL}/{created['id']}")
+    get_response = api.dishes.get(created['id'])
     assert get_response.status_code == 404
 
-def test_common_dishes():
+def test_common_dishes(api):
     # Тест общих популярных блюд
     user_id = 1
     friend_id = 2
     
     # Создание тестовых данных
-    dish1 = requests.post(BASE_DISH_URL, json=TEST_DISH).json()
-    dish2 = requests.post(BASE_DISH_URL, json={**TEST_DISH, "name": "Dish 2"}).json()
+    dish1 = api.dishes.create(TEST_DISH).json()
+    dish2 = api.dishes.create({**TEST_DISH, "name": ns("Dish 2")}).json()
     
     # Добавление лайков
-    requests.put(f"{BASE_DISH_URL}/{dish1['id']}/like/{user_id}")
-    requests.put(f"{BASE_DISH_URL}/{dish1['id']}/like/{friend_id}")
-    requests.put(f"{BASE_DISH_URL}/{dish2['id']}/like/{user_id}")
+    api.dishes.like(dish1['id'], user_id)
+    api.dishes.like(dish1['id'], friend_id)
+    api.dishes.like(dish2['id'], user_id)
     
-    response = requests.get(f"{BASE_DISH_URL}/common?userId={user_id}&friendId={friend_id}")
+    response = api.dishes.common(user_id, friend_id)
     assert response.status_code == 200
     assert len(response.json()) >= 1
 
-def test_pagination_and_filters():
+def test_pagination_and_filters(api):
     # Тест пагинации и фильтров
+    # В популярные попадают только блюда с лайками
     for i in range(15):
-        requests.post(BASE_DISH_URL, json={**TEST_DISH, "name": f"Dish {i}"})
+        dish = api.dishes.create({**TEST_DISH, "name": ns(f"Dish {i}")}).json()
+        api.dishes.like(dish["id"], 1)
     
     # Проверка пагинации
-    response = requests.get(f"{BASE_DISH_URL}/popular?count=5")
+    response = api.dishes.popular(count=5)
     assert response.status_code == 200
     assert len(response.json()) == 5
     
     # Проверка фильтра по году
-    response = requests.get(f"{BASE_DISH_URL}/popular?year=2023")
+    response = api.dishes.popular(year=2023)
     assert response.status_code == 200
     assert len(response.json()) > 0
 
 # Тесты для контроллера UserController
-@pytest.fixture(autouse=True)
-def user_cleanup():
-    yield
-    # Очистка пользователей после каждого теста
-    response = requests.get(BASE_USER_URL)
-    if response.status_code == 200:
-        for user in response.json():
-            requests.delete(f"{BASE_USER_URL}/{user['id']}")
-
-def test_create_and_get_user():
+def test_create_and_get_user(api):
     # Тест создания пользователя
-    response = requests.post(BASE_USER_URL, json=TEST_USER)
+    response = api.users.create(TEST_USER)
     assert response.status_code == 200
     user_id = response.json()["id"]
     
     # Проверка получения пользователя
-    get_response = requests.get(f"{BASE_USER_URL}/{user_id}")
+    get_response = api.users.get(user_id)
     assert get_response.status_code == 200
-    assert get_response.json()["login"] == "test_user"
+    assert get_response.json()["login"] == TEST_USER["login"]
 
-def test_friend_management():
+def test_friend_management(api):
     # Тест системы друзей
-    user1 = requests.post(BASE_USER_URL, json=TEST_USER).json()
-    user2 = requests.post(BASE_USER_URL, json={
+    user1 = api.users.create(TEST_USER).json()
+    user2 = api.users.create({
         **TEST_USER, 
-        "login": "friend_user"
+        "login": ns("friend_user")
     }).json()
     
     # Добавление друга
-    add_response = requests.put(
-        f"{BASE_USER_URL}/{user1['id']}/friends/{user2['id']}"
-    )
+    add_response = api.users.add_friend(user1['id'], user2['id'])
     assert add_response.status_code == 200
     
     # Проверка списка друзей
-    friends = requests.get(f"{BASE_USER_URL}/{user1['id']}/friends").json()
+    friends = api.users.friends(user1['id']).json()
     assert len(friends) == 1
     assert friends[0]["id"] == user2["id"]
     
     # Удаление друга
-    requests.delete(f"{BASE_USER_URL}/{user1['id']}/friends/{user2['id']}")
-    friends_after = requests.get(f"{BASE_USER_URL}/{user1['id']}/friends").json()
+    api.users.remove_friend(user1['id'], user2['id'])
+    friends_after = api.users.friends(user1['id']).json()
     assert len(friends_after) == 0
 
-def test_common_friends():
+def test_common_friends(api):
     # Тест общих друзей
-    user1 = requests.post(BASE_USER_URL, json=TEST_USER).json()
-    user2 = requests.post(BASE_USER_URL, json={**TEST_USER, "login": "user2"}).json()
-    common_friend = requests.post(BASE_USER_URL, json={**TEST_USER, "login": "common"}).json()
+    user1 = api.users.create(TEST_USER).json()
+    user2 = api.users.create({**TEST_USER, "login": ns("user2")}).json()
+    common_friend = api.users.create({**TEST_USER, "login": ns("common")}).json()
     
     # Добавление общего друга
-    requests.put(f"{BASE_USER_URL}/{user1['id']}/friends/{common_friend['id']}")
-    requests.put(f"{BASE_USER_URL}/{user2['id']}/friends/{common_friend['id']}")
+    api.users.add_friend(user1['id'], common_friend['id'])
+    api.users.add_friend(user2['id'], common_friend['id'])
     
     # Проверка общих друзей
-    response = requests.get(
-        f"{BASE_USER_URL}/{user1['id']}/friends/common/{user2['id']}"
-    )
+    response = api.users.common_friends(user1['id'], user2['id'])
     assert response.status_code == 200
     assert len(response.json()) == 1
     assert response.json()[0]["id"] == common_friend["id"]
 
-def test_user_validation():
+def test_user_validation(api):
     # Тест валидации данных
     invalid_user = {
         "email": "invalid-email",
@@ -242,41 +573,41 @@ def test_user_validation():
         "birthday": "2050-01-01"
     }
     
-    response = requests.post(BASE_USER_URL, json=invalid_user)
+    response = api.users.create(invalid_user)
     assert response.status_code == 400
     assert "email" in response.text.lower()
     assert "past" in response.text.lower()
 
-def test_user_recommendations():
+def test_user_recommendations(api):
     # Тест рекомендаций
-    user = requests.post(BASE_USER_URL, json=TEST_USER).json()
-    response = requests.get(f"{BASE_USER_URL}/{user['id']}/recommendations")
+    user = api.users.create(TEST_USER).json()
+    response = api.users.recommendations(user['id'])
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
-def test_user_feed():
+def test_user_feed(api):
     # Тест ленты событий
-    user = requests.post(BASE_USER_URL, json=TEST_USER).json()
-    response = requests.get(f"{BASE_USER_URL}/{user['id']}/feed")
+    user = api.users.create(TEST_USER).json()
+    response = api.users.feed(user['id'])
     assert response.status_code == 200
     assert isinstance(response.json(), list)
 
-def test_user_update():
+def test_user_update(api):
     # Тест обновления данных
-    user = requests.post(BASE_USER_URL, json=TEST_USER).json()
+    user = api.users.create(TEST_USER).json()
     updated_data = {**user, "name": "Updated Name"}
     
-    response = requests.put(BASE_USER_URL, json=updated_data)
+    response = api.users.update(updated_data)
     assert response.status_code == 200
     assert response.json()["name"] == "Updated Name"
 
-def test_user_deletion():
+def test_user_deletion(api):
     # Тест удаления пользователя
-    user = requests.post(BASE_USER_URL, json=TEST_USER).json()
-    delete_response = requests.delete(f"{BASE_USER_URL}/{user['id']}")
+    user = api.users.create(TEST_USER).json()
+    delete_response = api.users.delete(user['id'])
     assert delete_response.status_code == 200
     
-    get_response = requests.get(f"{BASE_USER_URL}/{user['id']}")
+    get_response = api.users.get(user['id'])
     assert get_response.status_code == 404
 
 #Тесты для контроллера CategoryController
@@ -285,17 +616,17 @@ def category_cleanup():
     yield
     # Очистка тестовых данных при необходимости
 
-def test_get_all_categories():
-    response = requests.get(BASE_CATEGORY_URL)
+def test_get_all_categories(api):
+    response = api.categories.list()
     assert response.status_code == 200
     assert isinstance(response.json(), list)
     if len(response.json()) > 0:
         assert "id" in response.json()[0]
         assert "name" in response.json()[0]
 
-def test_get_category_by_id():
+def test_get_category_by_id(api):
     # Предполагаем, что категория с ID=1 существует
-    response = requests.get(f"{BASE_CATEGORY_URL}/1")
+    response = api.categories.get(1)
     
     if response.status_code == 200:
         category = response.json()
@@ -305,18 +636,18 @@ def test_get_category_by_id():
     elif response.status_code == 404:
         pytest.skip("Категория с ID=1 не найдена")
 
-def test_nonexistent_category():
-    response = requests.get(f"{BASE_CATEGORY_URL}/99999")
+def test_nonexistent_category(api):
+    response = api.categories.get(99999)
     assert response.status_code == 404
 
-def test_category_validation():
+def test_category_validation(api):
     # Тест валидации для несуществующей категории
-    invalid_id_response = requests.get(f"{BASE_CATEGORY_URL}/invalid_id")
+    invalid_id_response = api.categories.get("invalid_id")
     assert invalid_id_response.status_code == 400
 
-def test_category_structure():
+def test_category_structure(api):
     # Проверка структуры ответа
-    response = requests.get(BASE_CATEGORY_URL)
+    response = api.categories.list()
     if len(response.json()) > 0:
         category = response.json()[0]
         assert set(category.keys()) == {"id", "name"}
@@ -324,8 +655,8 @@ def test_category_structure():
         assert isinstance(category["name"], str)
 
 #Тесты для контроллера PricingController
-def test_get_all_pricing_categories():
-    response = requests.get(BASE_PRICING_URL)
+def test_get_all_pricing_categories(api):
+    response = api.pricing.list()
     assert response.status_code == 200
     
     categories = response.json()
@@ -336,22 +667,22 @@ def test_get_all_pricing_categories():
         assert category["id"] in EXPECTED_PRICING_CATEGORIES
         assert category["name"] == EXPECTED_PRICING_CATEGORIES[category["id"]]
 
-def test_get_valid_pricing_category():
+def test_get_valid_pricing_category(api):
     for category_id in EXPECTED_PRICING_CATEGORIES:
-        response = requests.get(f"{BASE_PRICING_URL}/{category_id}")
+        response = api.pricing.get(category_id)
         assert response.status_code == 200
         category = response.json()
         assert category["id"] == category_id
         assert category["name"] == EXPECTED_PRICING_CATEGORIES[category_id]
 
-def test_nonexistent_pricing_categories():
+def test_nonexistent_pricing_categories(api):
     invalid_ids = [0, 6, 999]
     for category_id in invalid_ids:
-        response = requests.get(f"{BASE_PRICING_URL}/{category_id}")
+        response = api.pricing.get(category_id)
         assert response.status_code == 404
 
-def test_pricing_category_order():
-    response = requests.get(BASE_PRICING_URL)
+def test_pricing_category_order(api):
+    response = api.pricing.list()
     categories = response.json()
     
     # Проверка порядка категорий по ID
@@ -362,7 +693,7 @@ def test_pricing_category_order():
     names = [c["name"] for c in categories]
     assert names == ["$", "$$", "$$$", "$$$$", "$$$$$"]
 
-def test_invalid_id_formats():
+def test_invalid_id_formats(api):
     test_cases = [
         ("invalid", 400),
         ("1.5", 400),
@@ -372,65 +703,58 @@ def test_invalid_id_formats():
     ]
     
     for test_id, expected_status in test_cases:
-        response = requests.get(f"{BASE_PRICING_URL}/{test_id}")
+        response = api.pricing.get(test_id)
         assert response.status_code == expected_status
 
 
 #Тесты для AuthorController
-@pytest.fixture(autouse=True)
-def author_cleanup():
-    yield
-    # Очистка тестовых данных
-    response = requests.get(BASE_AUTHORS_URL)
-    for author in response.json():
-        requests.delete(f"{BASE_AUTHORS_URL}/{author['id']}")
-
-def test_create_author():
-    author_data = {"name": "Иван Петров"}
-    response = requests.post(BASE_AUTHORS_URL, json=author_data)
+def test_create_author(api):
+    author_data = {"name": ns("Иван Петров")}
+    response = api.authors.create(author_data)
     assert response.status_code == 200
     created = response.json()
     assert "id" in created
-    assert created["name"] == "Иван Петров"
+    assert created["name"] == ns("Иван Петров")
 
-def test_get_all_authors():
+def test_get_all_authors(api):
     # Создаём 3 тестовых автора
     for name in ["Автор 1", "Автор 2", "Автор 3"]:
-        requests.post(BASE_AUTHORS_URL, json={"name": name})
+        api.authors.create({"name": ns(name)})
     
-    response = requests.get(BASE_AUTHORS_URL)
+    response = api.authors.list()
     assert response.status_code == 200
-    assert len(response.json()) == 3
+    assert len([a for a in response.json() if a["id"] in api.created["/authors"]]) == 3
 
-def test_get_author_by_id():
+def test_get_author_by_id(api):
     # Создаём и получаем автора
-    author = requests.post(BASE_AUTHORS_URL, json={"name": "Тестовый автор"}).json()
+    author = api.authors.create({"name": ns("Тестовый автор")}).json()
     
-    response = requests.get(f"{BASE_AUTHORS_URL}/{author['id']}")
+    response = api.authors.get(author['id'])
     assert response.status_code == 200
-    assert response.json()["name"] == "Тестовый автор"
+    assert response.json()["name"] == ns("Тестовый автор")
 
-def test_update_author():
+def test_update_author(api):
     # Создание и обновление
-    author = requests.post(BASE_AUTHORS_URL, json={"name": "Старое имя"}).json()
-    updated = {**author, "name": "Новое имя"}
+    author = api.authors.create({"name": ns("Старое имя")}).json()
+    updated = {**author, "name": ns("Новое имя")}
     
-    response = requests.put(BASE_AUTHORS_URL, json=updated)
+    response = api.authors.update(updated)
     assert response.status_code == 200
-    assert response.json()["name"] == "Новое имя"
+    assert response.json()["name"] == ns("Новое имя")
 
-def test_delete_author():
-    author = requests.post(BASE_AUTHORS_URL, json={"name": "Удаляемый автор"}).json()
+def test_delete_author(api):
+    author = api.authors.create({"name": ns("Удаляемый автор")}).json()
     
     # Удаление
-    delete_response = requests.delete(f"{BASE_AUTHORS_URL}/{author['id']}")
+    delete_response = api.authors.delete(author['id'])
     assert delete_response.status_code == 200
     
     # Проверка существования
-    get_response = requests.get(f"{BASE_AUTHORS_URL}/{author['id']}")
+    get_response = api.authors.get(author['id'])
     assert get_response.status_code == 404
 
-def test_author_validation():
+@exclusive
+def test_author_validation(api):
     # Тест валидации имени
     tests = [
         ({"name": ""}, 400),        # Пустое имя
@@ -441,116 +765,102 @@ def test_author_validation():
     ]
     
     for data, expected_status in tests:
-        response = requests.post(BASE_AUTHORS_URL, json=data)
+        response = api.authors.create(data)
         assert response.status_code == expected_status
 
-def test_nonexistent_author_operations():
+def test_nonexistent_author_operations(api):
     # Тест операций с несуществующим автором
-    response = requests.get(f"{BASE_AUTHORS_URL}/999999")
+    response = api.authors.get(999999)
     assert response.status_code == 404
     
-    response = requests.delete(f"{BASE_AUTHORS_URL}/999999")
+    response = api.authors.delete(999999)
     assert response.status_code == 404
     
-    response = requests.put(BASE_AUTHORS_URL, json={"id": 999999, "name": "Test"})
+    response = api.authors.update({"id": 999999, "name": "Test"})
     assert response.status_code == 404
 
-def test_author_unique_constraint():
+def test_author_unique_constraint(api):
     # Тест уникальности имени (если предусмотрено)
-    requests.post(BASE_AUTHORS_URL, json={"name": "Уникальный автор"})
+    api.authors.create({"name": ns("Уникальный автор")})
     
-    response = requests.post(BASE_AUTHORS_URL, json={"name": "Уникальный автор"})
+    response = api.authors.create({"name": ns("Уникальный автор")})
     # Если уникальность требуется:
     # assert response.status_code == 409
     # Если разрешены дубли:
     assert response.status_code == 200
 
 #Тесты для ReviewController
-@pytest.fixture(autouse=True)
-def review_cleanup():
-    yield
-    # Очистка тестовых данных
-    response = requests.get(BASE_REVIEWS_URL)
-    for review in response.json():
-        requests.delete(f"{BASE_REVIEWS_URL}/{review['reviewId']}")
-
-def test_create_and_get_review():
+def test_create_and_get_review(api):
     # Создание отзыва
-    response = requests.post(BASE_REVIEWS_URL, json=TEST_REVIEW)
+    response = api.reviews.create(TEST_REVIEW)
     assert response.status_code == 200
     review_id = response.json()["reviewId"]
     
     # Получение по ID
-    get_response = requests.get(f"{BASE_REVIEWS_URL}/{review_id}")
+    get_response = api.reviews.get(review_id)
     assert get_response.status_code == 200
-    assert get_response.json()["content"] == "Отличное блюдо!"
+    assert get_response.json()["content"] == TEST_REVIEW["content"]
 
-def test_update_review():
+def test_update_review(api):
     # Создание и обновление
-    review = requests.post(BASE_REVIEWS_URL, json=TEST_REVIEW).json()
-    updated = {**review, "content": "Обновленный отзыв"}
+    review = api.reviews.create(TEST_REVIEW).json()
+    updated = {**review, "content": ns("Обновленный отзыв")}
     
-    response = requests.put(BASE_REVIEWS_URL, json=updated)
+    response = api.reviews.update(updated)
     assert response.status_code == 200
-    assert response.json()["content"] == "Обновленный отзыв"
+    assert response.json()["content"] == ns("Обновленный отзыв")
 
-def test_delete_review():
+def test_delete_review(api):
     # Создание и удаление
-    review = requests.post(BASE_REVIEWS_URL, json=TEST_REVIEW).json()
+    review = api.reviews.create(TEST_REVIEW).json()
     
-    delete_response = requests.delete(f"{BASE_REVIEWS_URL}/{review['reviewId']}")
+    delete_response = api.reviews.delete(review['reviewId'])
     assert delete_response.status_code == 200
     
-    get_response = requests.get(f"{BASE_REVIEWS_URL}/{review['reviewId']}")
+    get_response = api.reviews.get(review['reviewId'])
     assert get_response.status_code == 404
 
-def test_review_list():
+@exclusive
+def test_review_list(api):
     # Тест пагинации и фильтрации
     for i in range(15):
-        requests.post(BASE_REVIEWS_URL, json={
+        api.reviews.create({
             **TEST_REVIEW,
             "dishId": 1 if i < 10 else 2
         })
     
     # Проверка фильтра по dishId
-    filtered = requests.get(f"{BASE_REVIEWS_URL}?dishId=1&count=5").json()
+    filtered = api.reviews.list(dishId=1, count=5).json()
     assert len(filtered) == 5
     assert all(r["dishId"] == 1 for r in filtered)
     
-    # Проверка пагинации
-    all_reviews = requests.get(f"{BASE_REVIEWS_URL}?count=20").json()
-    assert len(all_reviews) == 15
+    # Проверка пагинации: считаются только свои отзывы, на сервере могут быть чужие
+    all_reviews = api.reviews.list().json()
+    assert len([r for r in all_reviews if r["reviewId"] in api.created["/reviews"]]) == 15
+    assert len(api.reviews.list(count=20).json()) == min(20, len(all_reviews))
 
-def test_like_dislike_flow():
+def test_like_dislike_flow(api):
     # Полный цикл работы с лайками
-    review = requests.post(BASE_REVIEWS_URL, json=TEST_REVIEW).json()
+    review = api.reviews.create(TEST_REVIEW).json()
     user_id = 123
     
     # Добавление лайка
-    like_response = requests.put(
-        f"{BASE_REVIEWS_URL}/{review['reviewId']}/like/{user_id}"
-    )
+    like_response = api.reviews.like(review['reviewId'], user_id)
     assert like_response.status_code == 200
     
     # Проверка полезности
-    updated_review = requests.get(
-        f"{BASE_REVIEWS_URL}/{review['reviewId']}"
-    ).json()
+    updated_review = api.reviews.get(review['reviewId']).json()
     assert updated_review["useful"] == 1
     
     # Удаление лайка
-    delete_like_response = requests.delete(
-        f"{BASE_REVIEWS_URL}/{review['reviewId']}/like/{user_id}"
-    )
+    delete_like_response = api.reviews.unlike(review['reviewId'], user_id)
     assert delete_like_response.status_code == 200
     
     # Проверка после удаления
-    updated_review = requests.get(
-        f"{BASE_REVIEWS_URL}/{review['reviewId']}"
-    ).json()
+    updated_review = api.reviews.get(review['reviewId']).json()
     assert updated_review["useful"] == 0
 
-def test_review_validation():
+def test_review_validation(api):
     # Тест валидации данных
     tests = [
         ({**TEST_REVIEW, "content": ""}, 400),  # Пустой контент
@@ -561,40 +871,90 @@ def test_review_validation():
     ]
     
     for data, expected_status in tests:
-        response = requests.post(BASE_REVIEWS_URL, json=data)
+        response = api.reviews.create(data)
         assert response.status_code == expected_status
 
-def test_duplicate_likes():
+def test_duplicate_likes(api):
     # Проверка повторных лайков
-    review = requests.post(BASE_REVIEWS_URL, json=TEST_REVIEW).json()
+    review = api.reviews.create(TEST_REVIEW).json()
     user_id = 456
     
     # Двойной лайк
-    requests.put(f"{BASE_REVIEWS_URL}/{review['reviewId']}/like/{user_id}")
-    response = requests.put(
-        f"{BASE_REVIEWS_URL}/{review['reviewId']}/like/{user_id}"
-    )
+    api.reviews.like(review['reviewId'], user_id)
+    response = api.reviews.like(review['reviewId'], user_id)
     assert response.status_code == 409  # Конфликт
 
-def test_cross_operations():
+def test_cross_operations(api):
     # Тест взаимного влияния лайков/дизлайков
-    review = requests.post(BASE_REVIEWS_URL, json=TEST_REVIEW).json()
+    review = api.reviews.create(TEST_REVIEW).json()
     user_id = 789
     
     # Добавление лайка
-    requests.put(f"{BASE_REVIEWS_URL}/{review['reviewId']}/like/{user_id}")
+    api.reviews.like(review['reviewId'], user_id)
     
     # Попытка добавить дизлайк
-    response = requests.put(
-        f"{BASE_REVIEWS_URL}/{review['reviewId']}/dislike/{user_id}"
-    )
+    response = api.reviews.dislike(review['reviewId'], user_id)
     assert response.status_code == 409  # Конфликт
 
-def test_review_structure():
+def test_review_structure(api):
     # Проверка структуры ответа
-    review = requests.post(BASE_REVIEWS_URL, json=TEST_REVIEW).json()
+    review = api.reviews.create(TEST_REVIEW).json()
     expected_keys = {
         "reviewId", "content", "isPositive",
         "userId", "dishId", "useful"
     }
-    assert set(review.keys()) == expected_keys
\ No newline at end of file
+    assert set(review.keys()) == expected_keys
+
+# Бенчмарки эндпоинтов (RESTARATE_BENCH), выполняются монопольно ради стабильных замеров
+@exclusive
+def test_bench_get_dish(api, bench):
+    dish = api.dishes.create(TEST_DISH).json()
+    bench(lambda: api.dishes.get(dish["id"]))
+
+@exclusive
+def test_bench_dish_search(api, bench):
+    for i in range(20):
+        api.dishes.create({**TEST_DISH, "name": ns(f"Бенчмарк {i}")})
+    bench(lambda: api.dishes.search(ns("Бенчмарк"), "title"))
+
+@exclusive
+def test_bench_popular(api, bench):
+    bench(lambda: api.dishes.popular(count=10))
+
+@exclusive
+def test_bench_common_dishes(api, bench):
+    user = api.users.create(TEST_USER).json()
+    friend = api.users.create({**TEST_USER, "login": ns("bench_friend")}).json()
+    for i in range(10):
+        dish = api.dishes.create({**TEST_DISH, "name": ns(f"Общее {i}")}).json()
+        api.dishes.like(dish["id"], user["id"])
+        api.dishes.like(dish["id"], friend["id"])
+    bench(lambda: api.dishes.common(user["id"], friend["id"]))
+
+@exclusive
+def test_bench_common_friends(api, bench):
+    user = api.users.create(TEST_USER).json()
+    other = api.users.create({**TEST_USER, "login": ns("bench_other")}).json()
+    for i in range(10):
+        friend = api.users.create({**TEST_USER, "login": ns(f"bench_common_{i}")}).json()
+        api.users.add_friend(user["id"], friend["id"])
+        api.users.add_friend(other["id"], friend["id"])
+    bench(lambda: api.users.common_friends(user["id"], other["id"]))
+
+@exclusive
+def test_bench_recommendations(api, bench):
+    user = api.users.create(TEST_USER).json()
+    bench(lambda: api.users.recommendations(user["id"]))
+
+@exclusive
+def test_bench_user_feed(api, bench):
+    user = api.users.create(TEST_USER).json()
+    friend = api.users.create({**TEST_USER, "login": ns("bench_feed")}).json()
+    api.users.add_friend(user["id"], friend["id"])
+    dish = api.dishes.create(TEST_DISH).json()
+    api.dishes.like(dish["id"], friend["id"])
+    bench(lambda: api.users.feed(user["id"]))
+
+@exclusive
+def test_bench_review_list(api, bench):
+    bench(lambda: api.reviews.list(count=10))
@@ -0,0 +1,769 @@
+"""Заглушка API ресторана для офлайн-бенчмарков и функциональных тестов.
+
+Реализует эндпоинты, которые используют load_testing_API.py и
+restarate_tests.py: /dishes, /users, /reviews, /categories, /pricing и
+/authors. Данные хранятся в памяти с индексами (лайки, блюда автора,
+друзья, отзывы по блюду). Сервер написан на asyncio.Protocol с
+минимальным разбором HTTP/1.1 keep-alive, чтобы на одном ядре держать
+десятки тысяч запросов в секунду и не быть узким местом при измерении
+накладных расходов генератора нагрузки.
+
+    python stub_server.py --port 8080 --seed-dishes 1000 --seed-reviews 10000
+    python stub_server.py --latency exp:5 --route-latency "GET /users/[id]/feed=lognormal:50:0.5" --error-rate 0.001
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import deque
+from datetime import date
+from urllib.parse import unquote_plus
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+if orjson is not None:
+    dumps = orjson.dumps
+    loads = orjson.loads
+else:
+    def dumps(value):
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+    loads = json.loads
+
+# Числовые сегменты пути, заменяемые в шаблоне маршрута на [id]
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+REASONS = {200: b"OK", 400: b"Bad Request", 404: b"Not Found", 405: b"Method Not Allowed", 409: b"Conflict", 500: b"Internal Server Error", 503: b"Service Unavailable"}
+
+PRICING = {1: "$", 2: "$$", 3: "$$$", 4: "$$$$", 5: "$$$$$"}
+CATEGORIES = {1: "Супы", 2: "Салаты", 3: "Горячее", 4: "Десерты", 5: "Напитки", 6: "Закуски"}
+
+EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def parse_id(value):
+    """Положительный целый идентификатор из сегмента пути, иначе 400"""
+    if not value.isdigit():
+        raise ApiError(400, f"Invalid id: {value}")
+    return int(value)
+
+def parse_query(query):
+    params = {}
+    if query:
+        for pair in query.split("&"):
+            key, _, value = pair.partition("=")
+            params[key] = value
+    return params
+
+def parse_delay(spec):
+    """Генератор задержки в секундах по спецификации fixed:5, exp:5, uniform:1:10, lognormal:5:0.5 (мс)"""
+    kind, *args = spec.split(":")
+    args = [float(arg) for arg in args]
+    if kind == "fixed":
+        return lambda: args[0] / 1000
+    if kind == "exp":
+        return lambda: random.expovariate(1 / args[0]) / 1000
+    if kind == "uniform":
+        return lambda: random.uniform(args[0], args[1]) / 1000
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(args[0]), args[1]) / 1000
+    raise ValueError(f"Неизвестное распределение задержки: {spec}")
+
+class RestaurantStore:
+    """Данные API в памяти с индексами для выборок без полного перебора"""
+
+    def __init__(self):
+        self.dishes = {}
+        self.users = {}
+        self.reviews = {}
+        self.authors = {}
+        self.dish_likes = {}            # dish_id -> set(user_id)
+        self.user_likes = {}            # user_id -> set(dish_id)
+        self.author_dishes = {}         # author_id -> set(dish_id)
+        self.friends = {}               # user_id -> set(friend_id)
+        self.dish_reviews = {}          # dish_id -> list(review_id)
+        self.review_votes = {}          # review_id -> {user_id: +1 | -1}
+        self.feeds = {}                 # user_id -> list(event)
+        self._ids = {"dish": 0, "user": 0, "review": 0, "author": 0, "event": 0}
+
+    def _next_id(self, kind):
+        self._ids[kind] += 1
+        return self._ids[kind]
+
+    def _event(self, user_id, event_type, operation, entity_id):
+        self.feeds.setdefault(user_id, []).append({
+            "eventId": self._next_id("event"),
+            "timestamp": int(time.time() * 1000),
+            "userId": user_id,
+            "eventType": event_type,
+            "operation": operation,
+            "entityId": entity_id
+        })
+
+    @staticmethod
+    def _page(items, params):
+        count = params.get("count")
+        if count is None:
+            return items
+        count = int(count)
+        start = int(params.get("page", 0)) * count
+        return items[start:start + count]
+
+    # Блюда
+
+    def _validate_dish(self, data):
+        if not isinstance(data, dict) or not str(data.get("name", "")).strip():
+            raise ApiError(400, "name must not be blank")
+        weight = data.get("weight")
+        if not isinstance(weight, (int, float)) or weight <= 0:
+            raise ApiError(400, "weight must be positive")
+        pricing = (data.get("pricing") or {}).get("id")
+        if pricing not in PRICING:
+            raise ApiError(404, f"Pricing {pricing} not found")
+        return {
+            "name": data["name"],
+            "description": data.get("description", ""),
+            "releaseDate": data.get("releaseDate"),
+            "weight": weight,
+            "pricing": {"id": pricing, "name": PRICING[pricing]},
+            "categories": [
+                {"id": c["id"], "name": CATEGORIES[c["id"]]}
+                for c in data.get("categories") or () if c.get("id") in CATEGORIES
+            ],
+            "authors": [
+                {"id": a["id"], "name": self.authors[a["id"]]["name"] if a.get("id") in self.authors else ""}
+                for a in data.get("authors") or () if "id" in a
+            ]
+        }
+
+    def _index_dish(self, dish, add):
+        for author in dish["authors"]:
+            dishes = self.author_dishes.setdefault(author["id"], set())
+            if add:
+                dishes.add(dish["id"])
+            else:
+                dishes.discard(dish["id"])
+
+    def create_dish(self, data):
+        dish = self._validate_dish(data)
+        dish["id"] = self._next_id("dish")
+        dish["likes"] = 0
+        self.dishes[dish["id"]] = dish
+        self.dish_likes[dish["id"]] = set()
+        self._index_dish(dish, True)
+        return dish
+
+    def update_dish(self, data):
+        dish_id = data.get("id") if isinstance(data, dict) else None
+        if dish_id not in self.dishes:
+            # Как и реальный API, обновление без известного id создает блюдо
+            return self.create_dish(data)
+        old = self.dishes[dish_id]
+        dish = self._validate_dish(data)
+        dish["id"] = dish_id
+        dish["likes"] = old["likes"]
+        self._index_dish(old, False)
+        self._index_dish(dish, True)
+        self.dishes[dish_id] = dish
+        return dish
+
+    def get_dish(self, dish_id):
+        if dish_id not in self.dishes:
+            raise ApiError(404, f"Dish {dish_id} not found")
+        return self.dishes[dish_id]
+
+    def delete_dish(self, dish_id):
+        dish = self.get_dish(dish_id)
+        self._index_dish(dish, False)
+        for user_id in self.dish_likes.pop(dish_id, ()):
+            self.user_likes.get(user_id, set()).discard(dish_id)
+        for review_id in self.dish_reviews.pop(dish_id, ()):
+            self.reviews.pop(review_id, None)
+        del self.dishes[dish_id]
+        return dish
+
+    def like_dish(self, dish_id, user_id, add):
+        dish = self.get_dish(dish_id)
+        likes = self.dish_likes[dish_id]
+        if add and user_id not in likes:
+            likes.add(user_id)
+            self.user_likes.setdefault(user_id, set()).add(dish_id)
+            self._event(user_id, "LIKE", "ADD", dish_id)
+        elif not add and user_id in likes:
+            likes.discard(user_id)
+            self.user_likes.get(user_id, set()).discard(dish_id)
+            self._event(user_id, "LIKE", "REMOVE", dish_id)
+        dish["likes"] = len(likes)
+        return dish
+
+    def popular(self, params):
+        count = int(params.get("count", 10))
+        # Как и настоящий эндпоинт, популярными считаются только блюда с лайками
+        dishes = [d for d in self.dishes.values() if d["likes"] > 0]
+        year = params.get("year")
+        if year:
+            dishes = [d for d in dishes if (d["releaseDate"] or "").startswith(year)]
+        category = params.get("categoryId")
+        if category:
+            category = int(category)
+            dishes = [d for d in dishes if any(c["id"] == category for c in d["categories"])]
+        return heapq.nlargest(count, dishes, key=lambda d: (d["likes"], -d["id"]))
+
+    def search(self, params):
+        query = params.get("query", "").lower()
+        by = params.get("by", "title").split(",")
+        found = []
+        for dish in self.dishes.values():
+            if ("title" in by and query in dish["name"].lower()) or (
+                "author" in by and any(query in a["name"].lower() for a in dish["authors"])
+            ):
+                found.append(dish)
+        return sorted(found, key=lambda d: -d["likes"])
+
+    def common(self, params):
+        first = self.user_likes.get(int(params.get("userId", 0)), set())
+        second = self.user_likes.get(int(params.get("friendId", 0)), set())
+        return sorted((self.dishes[i] for i in first & second), key=lambda d: -d["likes"])
+
+    def author_dishes_list(self, author_id, params):
+        dishes = [self.dishes[i] for i in self.author_dishes.get(author_id, ())]
+        sort_by = params.get("sortBy", "year")
+        if sort_by == "likes":
+            dishes.sort(key=lambda d: -d["likes"])
+        elif sort_by == "name":
+            dishes.sort(key=lambda d: d["name"])
+        else:
+            dishes.sort(key=lambda d: d["releaseDate"] or "")
+        return dishes
+
+    # Пользователи
+
+    def _validate_user(self, data):
+        if not isinstance(data, dict):
+            raise ApiError(400, "invalid body")
+        errors = []
+        if not EMAIL.match(str(data.get("email", ""))):
+            errors.append("email must be a well-formed email address")
+        login = str(data.get("login", ""))
+        if not login.strip() or " " in login:
+            errors.append("login must not be blank or contain spaces")
+        birthday = data.get("birthday")
+        if not birthday or birthday >= date.today().isoformat():
+            errors.append("birthday must be a date in the past")
+        if errors:
+            raise ApiError(400, "; ".join(errors))
+        return {
+            "email": data["email"],
+            "login": login,
+            "name": data.get("name") or login,
+            "birthday": birthday
+        }
+
+    def create_user(self, data):
+        user = self._validate_user(data)
+        user["id"] = self._next_id("user")
+        self.users[user["id"]] = user
+        self.friends[user["id"]] = set()
+        return user
+
+    def update_user(self, data):
+        user_id = data.get("id") if isinstance(data, dict) else None
+        old = self.get_user(user_id)
+        user = self._validate_user({**old, **data})
+        user["id"] = user_id
+        self.users[user_id] = user
+        return user
+
+    def get_user(self, user_id):
+        if user_id not in self.users:
+            raise ApiError(404, f"User {user_id} not found")
+        return self.users[user_id]
+
+    def delete_user(self, user_id):
+        user = self.get_user(user_id)
+        for friends in self.friends.values():
+            friends.discard(user_id)
+        self.friends.pop(user_id, None)
+        for dish_id in self.user_likes.pop(user_id, ()):
+            self.dish_likes[dish_id].discard(user_id)
+            self.dishes[dish_id]["likes"] = len(self.dish_likes[dish_id])
+        self.feeds.pop(user_id, None)
+        del self.users[user_id]
+        return user
+
+    def list_users(self, params):
+        users = list(self.users.values())
+        query = params.get("query")
+        if query:
+            query = query.lower()
+            field = "name" if params.get("by") == "name" else "login"
+            users = [u for u in users if query in u[field].lower()]
+        return self._page(users, params)
+
+    def set_friend(self, user_id, friend_id, add):
+        self.get_user(user_id)
+        self.get_user(friend_id)
+        friends = self.friends[user_id]
+        if add and friend_id not in friends:
+            friends.add(friend_id)
+            self._event(user_id, "FRIEND", "ADD", friend_id)
+        elif not add and friend_id in friends:
+            friends.discard(friend_id)
+            self._event(user_id, "FRIEND", "REMOVE", friend_id)
+        return self.users[user_id]
+
+    def list_friends(self, user_id):
+        self.get_user(user_id)
+        return [self.users[i] for i in sorted(self.friends[user_id])]
+
+    def common_friends(self, user_id, other_id):
+        self.get_user(user_id)
+        self.get_user(other_id)
+        return [self.users[i] for i in sorted(self.friends[user_id] & self.friends[other_id])]
+
+    def recommendations(self, user_id):
+        """Блюда, которые лайкнул самый похожий по лайкам пользователь"""
+        self.get_user(user_id)
+        own = self.user_likes.get(user_id, set())
+        best, best_overlap = None, 0
+        for dish_id in own:
+            for other in self.dish_likes.get(dish_id, ()):
+                if other == user_id:
+                    continue
+                overlap = len(own & self.user_likes[other])
+                if overlap > best_overlap:
+                    best, best_overlap = other, overlap
+        if best is None:
+            return []
+        return [self.dishes[i] for i in sorted(self.user_likes[best] - own)]
+
+    def feed(self, user_id):
+        self.get_user(user_id)
+        return self.feeds.get(user_id, [])
+
+    # Отзывы
+
+    def _validate_review(self, data):
+        if not isinstance(data, dict):
+            raise ApiError(400, "invalid body")
+        content = data.get("content")
+        if not isinstance(content, str) or not content.strip() or len(content) > 200:
+            raise ApiError(400, "content must not be blank and at most 200 characters")
+        if not isinstance(data.get("isPositive"), bool):
+            raise ApiError(400, "isPositive must be boolean")
+        for key in ("userId", "dishId"):
+            if not isinstance(data.get(key), int) or data[key] <= 0:
+                raise ApiError(400, f"{key} must be positive")
+        return {"content": content, "isPositive": data["isPositive"], "userId": data["userId"], "dishId": data["dishId"]}
+
+    def create_review(self, data):
+        review = self._validate_review(data)
+        review["reviewId"] = self._next_id("review")
+        review["useful"] = 0
+        self.reviews[review["reviewId"]] = review
+        self.dish_reviews.setdefault(review["dishId"], []).append(review["reviewId"])
+        self.review_votes[review["reviewId"]] = {}
+        self._event(review["userId"], "REVIEW", "ADD", review["reviewId"])
+        return review
+
+    def update_review(self, data):
+        review = self.get_review(data.get("reviewId") if isinstance(data, dict) else None)
+        content = data.get("content")
+        if not isinstance(content, str) or not content.strip() or len(content) > 200:
+            raise ApiError(400, "content must not be blank and at most 200 characters")
+        review["content"] = content
+        if isinstance(data.get("isPositive"), bool):
+            review["isPositive"] = data["isPositive"]
+        self._event(review["userId"], "REVIEW", "UPDATE", review["reviewId"])
+        return review
+
+    def get_review(self, review_id):
+        if review_id not in self.reviews:
+            raise ApiError(404, f"Review {review_id} not found")
+        return self.reviews[review_id]
+
+    def delete_review(self, review_id):
+        review = self.get_review(review_id)
+        reviews = self.dish_reviews.get(review["dishId"])
+        if reviews:
+            reviews.remove(review_id)
+        self.review_votes.pop(review_id, None)
+        del self.reviews[review_id]
+        self._event(review["userId"], "REVIEW", "REMOVE", review_id)
+        return review
+
+    def list_reviews(self, params):
+        dish_id = params.get("dishId")
+        if dish_id:
+            reviews = [self.reviews[i] for i in self.dish_reviews.get(int(dish_id), ())]
+        else:
+            reviews = list(self.reviews.values())
+        reviews.sort(key=lambda r: -r["useful"])
+        return self._page(reviews, params)
+
+    def vote_review(self, review_id, user_id, vote, add):
+        review = self.get_review(review_id)
+        votes = self.review_votes[review_id]
+        current = votes.get(user_id)
+        if add:
+            if current is not None:
+                raise ApiError(409, "User already rated this review")
+            votes[user_id] = vote
+            review["useful"] += vote
+        elif current == vote:
+            del votes[user_id]
+            review["useful"] -= vote
+        return review
+
+    # Авторы
+
+    def _validate_author(self, data):
+        if not isinstance(data, dict) or not isinstance(data.get("name"), str) or not data["name"].strip():
+            raise ApiError(400, "name must not be blank")
+        return {"name": data["name"]}
+
+    def create_author(self, data):
+        author = self._validate_author(data)
+        author["id"] = self._next_id("author")
+        self.authors[author["id"]] = author
+        return author
+
+    def update_author(self, data):
+        author_id = data.get("id") if isinstance(data, dict) else None
+        author = self.get_author(author_id)
+        author.update(self._validate_author(data))
+        return author
+
+    def get_author(self, author_id):
+        if author_id not in self.authors:
+            raise ApiError(404, f"Author {author_id} not found")
+        return self.authors[author_id]
+
+    def delete_author(self, author_id):
+        author = self.get_author(author_id)
+        self.author_dishes.pop(author_id, None)
+        del self.authors[author_id]
+        return author
+
+    def seed(self, dishes=0, users=0, reviews=0, likes=0, seed=0):
+        """Начальное заполнение детерминированными данными"""
+        rng = random.Random(seed)
+        if not self.authors:
+            for number in range(1, 11):
+                self.create_author({"name": f"Автор {number}"})
+        for number in range(dishes):
+            self.create_dish({
+                "name": f"Блюдо {number}",
+                "description": "Описание",
+                "releaseDate": f"{rng.randint(2000, 2024)}-01-01",
+                "weight": rng.randint(100, 800),
+                "pricing": {"id": rng.randint(1, 5)},
+                "categories": [{"id": rng.randint(1, 6)}],
+                "authors": [{"id": rng.randint(1, 10)}]
+            })
+        for number in range(users):
+            self.create_user({"email": f"user{number}@example.com", "login": f"user{number}", "name": f"User {number}", "birthday": "1990-01-01"})
+        dish_ids, user_ids = list(self.dishes), list(self.users) or [1]
+        for _ in range(reviews if dish_ids else 0):
+            self.create_review({
+                "content": "Отзыв", "isPositive": rng.random() < 0.5,
+                "userId": rng.choice(user_ids), "dishId": rng.choice(dish_ids)
+            })
+        for _ in range(likes if dish_ids and self.users else 0):
+            self.like_dish(rng.choice(dish_ids), rng.choice(user_ids), True)
+
+class Router:
+    """Сопоставление метода и пути с операциями RestaurantStore"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def dispatch(self, method, path, params, body):
+        parts = path.strip("/").split("/")
+        handler = getattr(self, f"_{parts[0]}", None)
+        if handler is None:
+            raise ApiError(404, f"Unknown path {path}")
+        return handler(method, parts[1:], params, body)
+
+    def _dishes(self, method, parts, params, body):
+        store = self.store
+        if not parts:
+            if method == "GET":
+                return store._page(list(store.dishes.values()), params)
+            if method == "POST":
+                return store.create_dish(body)
+            if method == "PUT":
+                return store.update_dish(body)
+        elif parts[0] == "popular" and method == "GET":
+            return store.popular(params)
+        elif parts[0] == "search" and method == "GET":
+            return store.search(params)
+        elif parts[0] == "common" and method == "GET":
+            return store.common(params)
+        elif parts[0] == "author" and len(parts) == 2 and method == "GET":
+            return store.author_dishes_list(parse_id(parts[1]), params)
+        elif len(parts) == 1:
+            if method == "GET":
+                return store.get_dish(parse_id(parts[0]))
+            if method == "DELETE":
+                return store.delete_dish(parse_id(parts[0]))
+        elif len(parts) == 3 and parts[1] == "like" and method in ("PUT", "DELETE"):
+            return store.like_dish(parse_id(parts[0]), parse_id(parts[2]), method == "PUT")
+        raise ApiError(405, f"{method} /dishes/{'/'.join(parts)} not supported")
+
+    def _users(self, method, parts, params, body):
+        store = self.store
+        if not parts:
+            if method == "GET":
+                return store.list_users(params)
+            if method == "POST":
+                return store.create_user(body)
+            if method == "PUT":
+                return store.update_user(body)
+        elif len(parts) == 1:
+            if method == "GET":
+                return store.get_user(parse_id(parts[0]))
+            if method == "DELETE":
+                return store.delete_user(parse_id(parts[0]))
+        elif parts[1] == "friends":
+            user_id = parse_id(parts[0])
+            if len(parts) == 2 and method == "GET":
+                return store.list_friends(user_id)
+            if len(parts) == 3 and method in ("PUT", "DELETE"):
+                return store.set_friend(user_id, parse_id(parts[2]), method == "PUT")
+            if len(parts) == 4 and parts[2] == "common" and method == "GET":
+                return store.common_friends(user_id, parse_id(parts[3]))
+        elif len(parts) == 2 and parts[1] == "recommendations" and method == "GET":
+            return store.recommendations(parse_id(parts[0]))
+        elif len(parts) == 2 and parts[1] == "feed" and method == "GET":
+            return store.feed(parse_id(parts[0]))
+        raise ApiError(405, f"{method} /users/{'/'.join(parts)} not supported")
+
+    def _reviews(self, method, parts, params, body):
+        store = self.store
+        if not parts:
+            if method == "GET":
+                return store.list_reviews(params)
+            if method == "POST":
+                return store.create_review(body)
+            if method == "PUT":
+                return store.update_review(body)
+        elif len(parts) == 1:
+            if method == "GET":
+                return store.get_review(parse_id(parts[0]))
+            if method == "DELETE":
+                return store.delete_review(parse_id(parts[0]))
+        elif len(parts) == 3 and parts[1] in ("like", "dislike") and method in ("PUT", "DELETE"):
+            vote = 1 if parts[1] == "like" else -1
+            return store.vote_review(parse_id(parts[0]), parse_id(parts[2]), vote, method == "PUT")
+        raise ApiError(405, f"{method} /reviews/{'/'.join(parts)} not supported")
+
+    def _authors(self, method, parts, params, body):
+        store = self.store
+        if not parts:
+            if method == "GET":
+                return list(store.authors.values())
+            if method == "POST":
+                return store.create_author(body)
+            if method == "PUT":
+                return store.update_author(body)
+        elif len(parts) == 1:
+            if method == "GET":
+                return store.get_author(parse_id(parts[0]))
+            if method == "DELETE":
+                return store.delete_author(parse_id(parts[0]))
+        raise ApiError(405, f"{method} /authors/{'/'.join(parts)} not supported")
+
+    def _reference(self, table, method, parts):
+        if method != "GET" or len(parts) > 1:
+            raise ApiError(405, f"{method} not supported")
+        if not parts:
+            return [{"id": key, "name": name} for key, name in table.items()]
+        item_id = parse_id(parts[0])
+        if item_id not in table:
+            raise ApiError(404, f"{item_id} not found")
+        return {"id": item_id, "name": table[item_id]}
+
+    def _categories(self, method, parts, params, body):
+        return self._reference(CATEGORIES, method, parts)
+
+    def _pricing(self, method, parts, params, body):
+        return self._reference(PRICING, method, parts)
+
+class FaultInjector:
+    """Задержки и ошибки: общие и для отдельных шаблонов маршрутов"""
+
+    def __init__(self, latency=None, route_latency=(), error_rate=0.0, error_status=500):
+        self.latency = parse_delay(latency) if latency else None
+        self.route_latency = {}
+        for rule in route_latency:
+            route, _, spec = rule.rpartition("=")
+            self.route_latency[route] = parse_delay(spec)
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self, method, path):
+        if self.route_latency:
+            delay = self.route_latency.get(f"{method} {ID_SEGMENT.sub('/[id]', path)}")
+            if delay:
+                return delay()
+        return self.latency() if self.latency else 0
+
+    def fail(self):
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+class HttpProtocol(asyncio.Protocol):
+    """Разбор HTTP/1.1 keep-alive запросов и ответы в том же порядке"""
+
+    def __init__(self, router, faults):
+        self.router = router
+        self.faults = faults
+        self.transport = None
+        self.buffer = b""
+        self.pending = deque()
+        self.loop = asyncio.get_event_loop()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        buffer = self.buffer + data if self.buffer else data
+        while True:
+            end = buffer.find(b"\r\n\r\n")
+            if end < 0:
+                break
+            head = buffer[:end]
+            length = 0
+            keep_alive = True
+            marker = head.find(b"\r\n")
+            for line in head[marker + 2:].split(b"\r\n"):
+                name, _, value = line.partition(b":")
+                name = name.lower()
+                if name == b"content-length":
+                    length = int(value)
+                elif name == b"connection" and value.strip().lower() == b"close":
+                    keep_alive = False
+            if len(buffer) < end + 4 + length:
+                break
+            body = buffer[end + 4:end + 4 + length]
+            buffer = buffer[end + 4 + length:]
+            method, target, _ = head[:marker].decode("latin-1").split(" ", 2)
+            self.handle(method, target, body, keep_alive)
+        self.buffer = buffer
+
+    def handle(self, method, target, body, keep_alive):
+        path, _, query = target.partition("?")
+        if "%" in query or "+" in query:
+            params = {k: unquote_plus(v) for k, v in parse_query(query).items()}
+        else:
+            params = parse_query(query)
+        if self.faults.fail():
+            status, payload = self.faults.error_status, {"error": "injected failure"}
+        else:
+            try:
+                payload = self.router.dispatch(method, path, params, loads(body) if body else None)
+                status = 200
+            except ApiError as error:
+                status, payload = error.status, {"error": error.message}
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                status, payload = 400, {"error": str(error)}
+        response = self.render(status, payload, keep_alive)
+        delay = self.faults.delay(method, path)
+        if delay <= 0 and not self.pending:
+            self.write(response, keep_alive)
+            return
+        # Задержанный ответ не должен обогнать следующий конвейерный ответ:
+        # ответы ждут своей очереди в порядке запросов соединения
+        slot = [response, keep_alive, delay <= 0]
+        self.pending.append(slot)
+        if delay > 0:
+            self.loop.call_later(delay, self.release, slot)
+
+    def release(self, slot):
+        slot[2] = True
+        while self.pending and self.pending[0][2]:
+            response, keep_alive, _ = self.pending.popleft()
+            self.write(response, keep_alive)
+
+    @staticmethod
+    def render(status, payload, keep_alive):
+        body = dumps(payload)
+        return b"".join((
+            b"HTTP/1.1 ", str(status).encode(), b" ", REASONS.get(status, b"Error"),
+            b"\r\nContent-Type: application/json\r\nContent-Length: ", str(len(body)).encode(),
+            b"\r\nConnection: keep-alive\r\n\r\n" if keep_alive else b"\r\nConnection: close\r\n\r\n",
+            body
+        ))
+
+    def write(self, response, keep_alive):
+        if self.transport.is_closing():
+            return
+        self.transport.write(response)
+        if not keep_alive:
+            self.transport.close()
+
+async def serve(host, port, store, faults):
+    loop = asyncio.get_running_loop()
+    router = Router(store)
+    return await loop.create_server(lambda: HttpProtocol(router, faults), host, port, reuse_address=True, backlog=1024)
+
+def serve_in_thread(host="127.0.0.1", port=0, store=None, faults=None):
+    """Запуск заглушки в фоновом потоке, возвращает базовый адрес"""
+    store = store or RestaurantStore()
+    faults = faults or FaultInjector()
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(serve(host, port, store, faults))
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return f"http://{host}:{server.sockets[0].getsockname()[1]}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--seed-dishes", type=int, default=0)
+    parser.add_argument("--seed-users", type=int, default=0)
+    parser.add_argument("--seed-reviews", type=int, default=0)
+    parser.add_argument("--seed-likes", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", help="Задержка всех ответов: fixed:MS, exp:MEAN, uniform:MIN:MAX, lognormal:MEDIAN:SIGMA")
+    parser.add_argument("--route-latency", action="append", default=[], help="Задержка маршрута: 'GET /users/[id]/feed=exp:50'")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ответов с ошибкой")
+    parser.add_argument("--error-status", type=int, default=500)
+    args = parser.parse_args()
+
+    store = RestaurantStore()
+    store.seed(args.seed_dishes, args.seed_users, args.seed_reviews, args.seed_likes, args.seed)
+    faults = FaultInjector(args.latency, args.route_latency, args.error_rate, args.error_status)
+    if uvloop is not None:
+        uvloop.install()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(serve(args.host, args.port, store, faults))
+    print(
+        f"Заглушка API на http://{args.host}:{args.port}: {len(store.dishes)} блюд, "
+        f"{len(store.users)} пользователей, {len(store.reviews)} отзывов", flush=True
+    )
+    try:
+        loop.run_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()